@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class PricesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'prices'
+
+    def ready(self):
+        # Registra los receptores que mantienen sincronizadas las estructuras derivadas
+        from . import signals  # noqa: F401
+
+        # Instala el contador de consultas de RequestMetricsMiddleware en cada
+        # conexión que se abra, incluidas las del calentamiento
+        from . import middleware  # noqa: F401
+
+        # Precarga y calentamiento opcionales antes de atender peticiones (PRICES_WARMUP)
+        from .warmup import warm_up_on_startup
+        warm_up_on_startup()
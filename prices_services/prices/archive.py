@@ -0,0 +1,233 @@
+import heapq
+import threading
+import time
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .changes import delete_change, record_changes
+from .lookup import history_rows, price_candidates, resolve_prices_from_orm
+from .models import ArchivedPrice, Price, PriceArchiveHorizon, PriceSegment
+from .sharding import archive_database, price_databases, shard_for_brand
+from .signals import prices_bulk_changed
+from .snapshot import snapshot_prices
+from .timeline import build_segments, clip_segments, priority_key
+
+# Columnas de Price que se copian al archivo
+ARCHIVED_FIELDS = (
+    'product_id', 'brand_id', 'price_list', 'start_date', 'end_date',
+    'price_minor', 'price_exponent', 'curr', 'priority',
+)
+
+# Fila única del horizonte del archivo (creada por la migración 0011)
+HORIZON_ROW = 1
+
+
+def retention_horizon(now=None):
+    """Fecha antes de la cual termina lo que se archiva: ahora menos PRICES_ARCHIVE_RETENTION_DAYS días."""
+    days = getattr(settings, 'PRICES_ARCHIVE_RETENTION_DAYS', 365)
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+class PriceArchive:
+    """
+    Consultas históricas sobre Price más el archivo de precios vencidos.
+
+    Solo las fechas anteriores al horizonte del archivo pueden necesitar filas
+    archivadas: para ellas el ganador se elige entre el primer candidato de
+    Price y el del archivo, con las reglas de WINNER_ORDERING. El horizonte se
+    lee de la base de datos como mucho cada PRICES_ARCHIVE_CHECK_INTERVAL
+    segundos; el proceso que archiva lo adelanta antes de mover ninguna fila.
+    """
+
+    def __init__(self):
+        # (horizonte, instante monotónico de la lectura) o None si no se ha leído
+        self._state = None
+        self._stats_lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def fresh(self):
+        """Si el horizonte leído sigue vigente (comprobarlo no consulta la base de datos)."""
+        state = self._state
+        interval = getattr(settings, 'PRICES_ARCHIVE_CHECK_INTERVAL', 1.0)
+        return state is not None and time.monotonic() - state[1] < interval
+
+    def horizon(self):
+        """Fecha antes de la cual puede haber filas archivadas, o None si no se ha archivado nada."""
+        if not self.fresh():
+            horizon = PriceArchiveHorizon.objects.using(archive_database()).values_list(
+                'archived_before', flat=True,
+            ).get(pk=HORIZON_ROW)
+            self._state = (horizon, time.monotonic())
+        return self._state[0]
+
+    def covers(self, application_date):
+        """Si la consulta de esa fecha tiene que leer también el archivo."""
+        horizon = self.horizon()
+        return horizon is not None and application_date < horizon
+
+    def advance(self, before):
+        """Adelanta el horizonte hasta `before` (nunca lo retrasa)."""
+        using = archive_database()
+        with transaction.atomic(using=using):
+            row = PriceArchiveHorizon.objects.using(using).select_for_update().get(pk=HORIZON_ROW)
+            if row.archived_before is None or row.archived_before < before:
+                row.archived_before = before
+                row.save(using=using, update_fields=['archived_before'])
+        self.clear()
+
+    def candidates(self, product_id, brand_id, application_date):
+        """Precios archivados vigentes en la fecha, el ganador primero."""
+        return price_candidates(
+            product_id, brand_id, application_date,
+            queryset=ArchivedPrice.objects.using(archive_database()),
+        )
+
+    def resolve(self, product_id, brand_id, application_date):
+        """Precio ganador en una fecha anterior al horizonte, entre Price y el archivo."""
+        return self.winner(
+            price_candidates(product_id, brand_id, application_date).first(),
+            self.candidates(product_id, brand_id, application_date).first(),
+        )
+
+    async def aresolve(self, product_id, brand_id, application_date):
+        """Versión asíncrona de `resolve` basada en el ORM asíncrono de Django."""
+        return self.winner(
+            await price_candidates(product_id, brand_id, application_date).afirst(),
+            await self.candidates(product_id, brand_id, application_date).afirst(),
+        )
+
+    def resolve_batch(self, queries, prices):
+        """
+        Completa los resultados de `lookup.resolve_prices` para `queries`: en
+        las consultas anteriores al horizonte el ganador se elige entre el de
+        Price y el del archivo, que se resuelven juntas por lotes.
+        """
+        positions = [position for position, (_, _, application_date) in enumerate(queries) if self.covers(application_date)]
+        if not positions:
+            return prices
+        archived = resolve_prices_from_orm(
+            [queries[position] for position in positions], model=ArchivedPrice, using=archive_database(),
+        )
+        prices = list(prices)
+        for position, archived_price in zip(positions, archived):
+            prices[position] = self.winner(prices[position], archived_price)
+        return prices
+
+    def snapshot(self, brand_id, application_date, chunk_size=2000):
+        """Como `snapshot.snapshot_prices`, con el ganador de cada producto entre Price y el archivo."""
+        current = snapshot_prices(brand_id, application_date, chunk_size=chunk_size)
+        archived = snapshot_prices(
+            brand_id, application_date, chunk_size=chunk_size,
+            queryset=ArchivedPrice.objects.using(archive_database()),
+        )
+        # Los dos recorridos van en orden de product_id: se mezclan sin cargarlos
+        rows = heapq.merge(
+            ((row.product_id, False, row) for row in current),
+            ((row.product_id, True, row) for row in archived),
+            key=lambda item: item[:2],
+        )
+        for _, candidates in groupby(rows, key=lambda item: item[0]):
+            by_table = {from_archive: row for _, from_archive, row in candidates}
+            yield self.winner(by_table.get(False), by_table.get(True))
+
+    def winner(self, price, archived):
+        # Los ids de las dos tablas no son comparables: a igualdad de prioridad,
+        # inicio y fin gana la fila de Price
+        from_archive = archived is not None and (price is None or priority_key(archived)[:3] < priority_key(price)[:3])
+        with self._stats_lock:
+            self.lookups += 1
+            self.hits += int(from_archive)
+        return archived if from_archive else price
+
+    def history(self, product_id, brand_id, date_from, date_to):
+        """Como `lookup.price_history`, con las filas archivadas que se solapan con la ventana."""
+        rows = list(history_rows(Price.objects.using(shard_for_brand(brand_id)), product_id, brand_id, date_from, date_to))
+        rows.extend(history_rows(ArchivedPrice.objects.using(archive_database()), product_id, brand_id, date_from, date_to))
+        return clip_segments(build_segments(rows), date_from, date_to)
+
+    def clear(self):
+        """Olvida el horizonte leído; se vuelve a leer en la siguiente consulta."""
+        self._state = None
+
+    def stats(self):
+        with self._stats_lock:
+            return {'lookups': self.lookups, 'hits': self.hits}
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.lookups = 0
+            self.hits = 0
+
+
+def expired_rows(alias, before):
+    """Filas de Price del shard que terminan antes de `before`."""
+    return Price.objects.using(alias).filter(end_date__lt=before)
+
+
+def archive_expired(before, batch_size=1000, pause=0.0, progress=None):
+    """
+    Mueve a ArchivedPrice, por lotes, las filas de Price de todos los shards
+    que terminan antes de `before`. Devuelve el número de filas archivadas.
+
+    El horizonte se adelanta antes de mover nada, así que las consultas de
+    fechas anteriores ya leen las dos tablas mientras las filas se mueven.
+    Cada lote es una transacción corta sobre su shard: se bloquean solo sus
+    filas, se copian al archivo, se borran con sus segmentos sin señales por
+    fila, se registran los borrados y se avisa con `prices_bulk_changed`. Cada
+    shard se recorre una sola vez en orden de id; `pause` deja segundos entre
+    lotes para no acaparar la base de datos.
+    """
+    price_archive.advance(before)
+    archived = 0
+    for alias in price_databases():
+        last_pk = 0
+        while True:
+            moved = archive_batch(alias, before, last_pk, batch_size)
+            if not moved:
+                break
+            last_pk = moved[-1].pk
+            archived += len(moved)
+            if progress:
+                progress(alias, archived)
+            if pause:
+                time.sleep(pause)
+    return archived
+
+
+def archive_batch(alias, before, after_pk, batch_size):
+    """Archiva las siguientes `batch_size` filas vencidas del shard con id mayor que `after_pk`."""
+    using = archive_database()
+    with transaction.atomic(using=alias):
+        batch = list(
+            expired_rows(alias, before).filter(pk__gt=after_pk).order_by('pk').select_for_update()[:batch_size]
+        )
+        if not batch:
+            return batch
+
+        # Si el archivo está en otra base de datos se confirma antes que el
+        # borrado: un fallo entre medias deja la fila en las dos tablas (las
+        # consultas dan lo mismo) y repetir el lote no la duplica
+        with transaction.atomic(using=using):
+            ArchivedPrice.objects.using(using).bulk_create(
+                [ArchivedPrice(**{field: getattr(row, field) for field in ARCHIVED_FIELDS}) for row in batch],
+                ignore_conflicts=True,
+            )
+
+        pks = [row.pk for row in batch]
+        placeholders = ', '.join(['%s'] * len(pks))
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {PriceSegment._meta.db_table} WHERE source_id IN ({placeholders})', pks)
+            cursor.execute(f'DELETE FROM {Price._meta.db_table} WHERE id IN ({placeholders})', pks)
+        record_changes(delete_change(row.unique_key()) for row in batch)
+
+    prices_bulk_changed.send(sender=Price, keys={(row.product_id, row.brand_id) for row in batch})
+    return batch
+
+
+# Instancia compartida por el proceso
+price_archive = PriceArchive()
@@ -0,0 +1,302 @@
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from statistics import mean
+
+import django
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import columnar
+from .archive import archive_expired, price_archive
+from .columnar import price_store
+from .index import price_index
+from .lookup import resolve_price_from_orm, resolve_price_from_timeline, resolve_prices
+from .materialize import rebuild_all_segments
+from .mmap_snapshot import MappedPriceSnapshot, write_snapshot
+from .models import ArchivedPrice, Price, PriceSegment
+from .sharding import archive_database, prices_by_shard, price_databases
+from .synthetic import DEFAULT_START, create_synthetic_prices, generate_prices, generate_queries
+from .utils import chunked
+
+# Caminos de consulta medidos: nombre -> gestor de contexto que prepara el camino
+# y devuelve (función que resuelve un bloque de consultas, tamaño del bloque)
+PATHS = {}
+
+
+def benchmark_path(name):
+    """Registra un camino de consulta en la batería de benchmarks."""
+    def register(function):
+        PATHS[name] = contextmanager(function)
+        return function
+    return register
+
+
+@benchmark_path('lookup-orm')
+def lookup_orm():
+    yield (lambda queries: resolve_price_from_orm(*queries[0])), 1
+
+
+@benchmark_path('lookup-timeline')
+def lookup_timeline():
+    yield (lambda queries: resolve_price_from_timeline(*queries[0])), 1
+
+
+@benchmark_path('lookup-index')
+def lookup_index():
+    price_index.load()
+    yield (lambda queries: price_index.lookup(*queries[0])), 1
+
+
+@benchmark_path('lookup-snapshot')
+def lookup_snapshot():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'prices.snapshot')
+        write_snapshot(path)
+        snapshot = MappedPriceSnapshot(path)
+        yield (lambda queries: snapshot.lookup(*queries[0])), 1
+
+
+@benchmark_path('batch-orm')
+def batch_orm():
+    with override_settings(PRICES_LOOKUP_BACKEND='orm'):
+        yield resolve_prices, 100
+
+
+# El almacén columnar solo se mide si NumPy está instalado
+if columnar.np is not None:
+
+    @benchmark_path('batch-columnar')
+    def batch_columnar():
+        price_store.load()
+        with override_settings(PRICES_LOOKUP_BACKEND='columnar'):
+            yield resolve_prices, 100
+
+    @benchmark_path('vector-columnar')
+    def vector_columnar():
+        # Camino vectorizado puro: arrays de consultas de entrada y de columnas de salida
+        price_store.load()
+
+        def lookup(queries):
+            product_ids, brand_ids, dates = zip(*queries)
+            price_store.lookup_arrays(product_ids, brand_ids, list(dates))
+
+        yield lookup, 1000
+
+
+def price_view(backend):
+    """PriceView completa (middleware, vista y renderizado) con el backend dado."""
+    client = Client()
+    url = reverse('price-view')
+
+    def request(queries):
+        product_id, brand_id, application_date = queries[0]
+        client.get(url, {
+            'product_id': product_id,
+            'brand_id': brand_id,
+            'application_date': application_date.isoformat(),
+        })
+
+    # Las consultas sin precio son 404 esperados: no se registran como avisos
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    try:
+        with override_settings(PRICES_LOOKUP_BACKEND=backend, ALLOWED_HOSTS=['testserver']):
+            yield request, 1
+    finally:
+        request_logger.setLevel(level)
+
+
+@benchmark_path('view-orm')
+def view_orm():
+    yield from price_view('orm')
+
+
+@benchmark_path('view-timeline')
+def view_timeline():
+    yield from price_view('timeline')
+
+
+@benchmark_path('view-index')
+def view_index():
+    price_index.load()
+    yield from price_view('index')
+
+
+def percentile(values, fraction):
+    """Percentil por el método del rango más cercano sobre valores ordenados."""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def measure(function, queries, chunk, warmup):
+    """Mide la latencia de cada llamada y el rendimiento en consultas por segundo."""
+    blocks = [queries[offset:offset + chunk] for offset in range(0, len(queries), chunk)]
+    for block in blocks[:warmup]:
+        function(block)
+
+    latencies = []
+    started = time.perf_counter()
+    for block in blocks:
+        call_started = time.perf_counter_ns()
+        function(block)
+        latencies.append((time.perf_counter_ns() - call_started) / 1000)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'calls': len(blocks),
+        'queries_per_call': chunk,
+        'p50_us': round(percentile(latencies, 0.50), 1),
+        'p99_us': round(percentile(latencies, 0.99), 1),
+        'mean_us': round(mean(latencies), 1),
+        'queries_per_s': round(len(queries) / elapsed, 1),
+    }
+
+
+def clear_prices():
+    """Vacía Price y PriceSegment en cada shard sin enviar señales por fila (dentro de la transacción del benchmark)."""
+    for alias in price_databases():
+        with connections[alias].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {PriceSegment._meta.db_table}')
+            cursor.execute(f'DELETE FROM {Price._meta.db_table}')
+
+
+def clear_archive():
+    """Vacía ArchivedPrice sin señales (dentro de la transacción del benchmark)."""
+    with connections[archive_database()].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {ArchivedPrice._meta.db_table}')
+
+
+def create_history(keys, years, seed=0, batch_size=5000):
+    """
+    Añade `years` años de precios ya vencidos antes de DEFAULT_START a las
+    claves de `create_synthetic_prices`, con listas de precios propias de cada
+    año. Devuelve el número de filas.
+    """
+    total = 0
+    for year in range(1, years + 1):
+        prices = generate_prices(keys, seed=seed + year, start=DEFAULT_START - timedelta(days=365 * year))
+        for batch in chunked(prices, batch_size):
+            for price in batch:
+                price.price_list += 100 * year
+            for alias, shard_prices in prices_by_shard(batch).items():
+                Price.objects.using(alias).bulk_create(shard_prices)
+            total += len(batch)
+    rebuild_all_segments()
+    return total
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, paths=None, queries=2000, seed=0, warmup=50, progress=None):
+    """
+    Ejecuta la batería para cada tamaño (número de claves) y camino de consulta.
+
+    Los datos se generan dentro de una transacción por shard que se deshace al
+    terminar cada tamaño, así que las bases de datos quedan como estaban.
+    """
+    paths = list(paths or PATHS)
+    results = []
+    for size in sizes:
+        with ExitStack() as stack:
+            for alias in price_databases():
+                stack.enter_context(transaction.atomic(using=alias))
+            clear_prices()
+            rows = create_synthetic_prices(size, seed=seed)
+            size_queries = generate_queries(size, queries, seed=seed)
+            for name in paths:
+                with PATHS[name]() as (function, chunk):
+                    result = {'keys': size, 'rows': rows, 'path': name, **measure(function, size_queries, chunk, warmup)}
+                results.append(result)
+                if progress:
+                    progress(result)
+            for alias in price_databases():
+                transaction.set_rollback(True, using=alias)
+        price_index.clear()
+        price_store.clear()
+
+    return {'meta': benchmark_meta(seed, queries), 'results': results}
+
+
+def run_archive_benchmark(keys, history_years=(0, 1, 3), queries=2000, seed=0, warmup=50, progress=None):
+    """
+    Mide cómo afecta el tamaño de la tabla caliente a las consultas de PriceView.
+
+    Para cada número de años de historial vencido se generan un año de precios
+    vigentes de `keys` claves más ese historial, y se miden la consulta ORM y
+    PriceView sobre fechas del año vigente con el historial en Price y después
+    de archivarlo, y PriceView sobre fechas del historial leyendo del archivo.
+    Como en `run_benchmarks`, todo se deshace al terminar cada caso.
+    """
+    databases = price_databases() + [archive_database()]
+    results = []
+    for years in history_years:
+        with ExitStack() as stack:
+            for alias in dict.fromkeys(databases):
+                stack.enter_context(transaction.atomic(using=alias))
+            clear_prices()
+            clear_archive()
+            rows = create_synthetic_prices(keys, seed=seed)
+            history = create_history(keys, years, seed=seed)
+            current_queries = generate_queries(keys, queries, seed=seed)
+            base = {'keys': keys, 'history_years': years, 'rows': rows + history}
+
+            def run(stage, path, hot_rows, path_queries, **settings):
+                with override_settings(**settings), PATHS[path]() as (function, chunk):
+                    result = {**base, 'stage': stage, 'hot_rows': hot_rows, 'path': path,
+                              **measure(function, path_queries, chunk, warmup)}
+                results.append(result)
+                if progress:
+                    progress(result)
+
+            for path in ('lookup-orm', 'view-orm'):
+                run('hot', path, rows + history, current_queries)
+
+            started = time.perf_counter()
+            archived = archive_expired(DEFAULT_START)
+            base['archive_seconds'] = round(time.perf_counter() - started, 3)
+            base['archived_rows'] = archived
+            for path in ('lookup-orm', 'view-orm'):
+                run('archived', path, rows, current_queries, PRICES_ARCHIVE_LOOKUPS=True)
+            if years:
+                history_queries = generate_queries(
+                    keys, queries, seed=seed, start=DEFAULT_START - timedelta(days=365 * years), days=365 * years,
+                )
+                run('historical', 'view-orm', rows, history_queries, PRICES_ARCHIVE_LOOKUPS=True)
+
+            for alias in dict.fromkeys(databases):
+                transaction.set_rollback(True, using=alias)
+        price_archive.clear()
+        price_index.clear()
+        price_store.clear()
+
+    return {'meta': benchmark_meta(seed, queries), 'results': results}
+
+
+def benchmark_meta(seed, queries):
+    """Datos del entorno que acompañan a los resultados para compararlos entre commits."""
+    return {
+        'revision': git_revision(),
+        'created': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+        'seed': seed,
+        'queries': queries,
+    }
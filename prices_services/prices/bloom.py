@@ -0,0 +1,190 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+
+from .changes import CHANGES_DATABASE, current_revision
+from .models import Price, PriceChange
+from .sharding import price_databases
+
+MASK64 = (1 << 64) - 1
+
+
+def mix64(value):
+    """Mezcla un entero de 64 bits (finalizador de splitmix64): hash rápido y bien distribuido."""
+    value = (value + 0x9E3779B97F4A7C15) & MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK64
+    return value ^ (value >> 31)
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom de claves (product_id, brand_id): `in` da False solo si la
+    clave seguro que no se ha añadido y True si probablemente sí, con una tasa
+    de falsos positivos de `error_rate` mientras no se superen `capacity` claves.
+
+    Las `hashes` posiciones de cada clave salen de un único hash de 64 bits
+    (doble hashing de Kirsch-Mitzenmacher con sus dos mitades).
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, product_id, brand_id):
+        digest = mix64((product_id << 32) | brand_id)
+        first, step = digest & 0xFFFFFFFF, (digest >> 32) | 1
+        size = self.size
+        return [(first + index * step) % size for index in range(self.hashes)]
+
+    def add(self, product_id, brand_id):
+        positions = self._positions(product_id, brand_id)
+        bits = self.bits
+        # Los bits solo se encienden: las lecturas no necesitan el cerrojo
+        with self._lock:
+            new = False
+            for position in positions:
+                mask = 1 << (position & 7)
+                if not bits[position >> 3] & mask:
+                    bits[position >> 3] |= mask
+                    new = True
+            # Solo cuentan las claves nuevas (las que ya estaban no encienden ningún bit)
+            if new:
+                self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(*key))
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+    def estimated_error_rate(self):
+        """Tasa de falsos positivos esperada con las claves añadidas hasta ahora."""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class PriceKeyBloom:
+    """
+    Filtro de las claves (product_id, brand_id) que tienen algún precio, para
+    responder 404 sin consultar la base de datos a las que seguro que no tienen.
+
+    Se construye recorriendo la tabla en cada shard y las escrituras del propio
+    proceso lo actualizan por señales. Las de otros procesos se incorporan
+    leyendo el registro de cambios desde la revisión con la que se construyó,
+    como mucho cada PRICES_KEY_BLOOM_CHECK_INTERVAL segundos. Los borrados no
+    se quitan (un filtro de Bloom no lo permite): dejan falsos positivos que
+    resuelve la consulta normal, hasta que el filtro se reconstruye al superar
+    su capacidad.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._revision = 0
+        self._checked = 0.0
+        self._stats_lock = threading.Lock()
+        self.checks = 0
+        self.negatives = 0
+
+    def might_contain(self, product_id, brand_id):
+        """False si la clave seguro que no tiene precios (puede consultar la base de datos para ponerse al día)."""
+        return self.contains(self.current(), product_id, brand_id)
+
+    def contains(self, bloom, product_id, brand_id):
+        found = (product_id, brand_id) in bloom
+        with self._stats_lock:
+            self.checks += 1
+            if not found:
+                self.negatives += 1
+        return found
+
+    def current(self):
+        """Filtro al día con los cambios registrados, construyéndolo si hace falta."""
+        bloom = self.fresh()
+        if bloom is not None:
+            return bloom
+
+        with self._lock:
+            bloom = self._filter
+            if bloom is None or bloom.count > bloom.capacity:
+                bloom = self._build()
+            else:
+                self._catch_up(bloom)
+            self._checked = time.monotonic()
+            return bloom
+
+    def fresh(self):
+        """Filtro vigente si no toca leer el registro de cambios, o None (no consulta la base de datos)."""
+        interval = getattr(settings, 'PRICES_KEY_BLOOM_CHECK_INTERVAL', 1.0)
+        if self._filter is not None and time.monotonic() - self._checked < interval:
+            return self._filter
+        return None
+
+    def add(self, keys):
+        """Añade claves escritas por este proceso (no hace nada si el filtro no está construido)."""
+        bloom = self._filter
+        if bloom is not None:
+            for product_id, brand_id in keys:
+                bloom.add(product_id, brand_id)
+
+    def clear(self):
+        """Descarta el filtro; se reconstruirá en la siguiente consulta."""
+        with self._lock:
+            self._filter = None
+            self._revision = 0
+            self._checked = 0.0
+
+    def stats(self):
+        bloom = self._filter
+        with self._stats_lock:
+            stats = {'checks': self.checks, 'negatives': self.negatives}
+        stats.update({
+            'keys': bloom.count if bloom is not None else 0,
+            'bytes': bloom.nbytes if bloom is not None else 0,
+            'error_rate': bloom.estimated_error_rate() if bloom is not None else 0.0,
+        })
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.checks = 0
+            self.negatives = 0
+
+    def _build(self):
+        # La revisión se lee antes de recorrer la tabla: los cambios que se
+        # confirmen durante el recorrido se vuelven a aplicar al ponerse al día
+        revision = current_revision()
+        keys = set()
+        for alias in price_databases():
+            keys.update(Price.objects.using(alias).values_list('product_id', 'brand_id').distinct().iterator())
+
+        capacity = max(getattr(settings, 'PRICES_KEY_BLOOM_CAPACITY', 1_000_000), 2 * len(keys))
+        bloom = BloomFilter(capacity, getattr(settings, 'PRICES_KEY_BLOOM_ERROR_RATE', 0.01))
+        for product_id, brand_id in keys:
+            bloom.add(product_id, brand_id)
+        self._filter, self._revision = bloom, revision
+        return bloom
+
+    def _catch_up(self, bloom):
+        revision = current_revision()
+        if revision == self._revision:
+            return
+        changes = PriceChange.objects.using(CHANGES_DATABASE).filter(
+            revision__gt=self._revision, revision__lte=revision, op=PriceChange.UPSERT,
+        ).values_list('product_id', 'brand_id')
+        for product_id, brand_id in changes.iterator(chunk_size=2000):
+            bloom.add(product_id, brand_id)
+        self._revision = revision
+
+
+# Instancia compartida por el proceso
+price_key_bloom = PriceKeyBloom()
@@ -0,0 +1,110 @@
+import math
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+# Respuesta resuelta de PriceView: la fila ganadora, el intervalo [start, end)
+# en el que es válida y el precio en unidades menores de su moneda (la de
+# destino si `converted`). `start`/`end` son None si no se resolvió el segmento
+# completo. `body` es el cuerpo JSON ya codificado o None si aún no se ha
+# necesitado (las entradas de la caché lo guardan siempre).
+PriceEntry = namedtuple(
+    'PriceEntry',
+    ['start', 'end', 'row', 'curr', 'price_minor', 'price_exponent', 'converted', 'body'],
+    defaults=[False, None],
+)
+
+
+class PriceResponseCache:
+    """
+    Caché de respuestas de PriceView sobre el framework de caché de Django.
+
+    Cada entrada guarda, por (product_id, brand_id), la respuesta del segmento
+    vigente ahora mismo y caduca exactamente cuando ese segmento termina, es
+    decir, cuando vence el precio ganador o empieza otro de mayor prioridad.
+    Las escrituras en Price la invalidan por clave a través de señales.
+
+    Cada clave tiene además un contador de generación que la invalidación
+    incrementa. Una entrada se guarda con la generación leída antes de
+    consultar la base de datos y solo se sirve mientras siga siendo la
+    vigente: si una escritura se confirma mientras se resolvía, la respuesta
+    resuelta con los datos anteriores no llega a servirse.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'PRICES_CACHE_ENABLED', False)
+
+    @property
+    def backend(self):
+        return caches[getattr(settings, 'PRICES_CACHE_ALIAS', 'default')]
+
+    @staticmethod
+    def cache_key(product_id, brand_id):
+        # v4: la entrada guarda la fila ganadora en lugar de los datos de la
+        # respuesta; las de v3 ((generación, entrada) con los datos) no son compatibles
+        return f"price:v4:{product_id}:{brand_id}"
+
+    @staticmethod
+    def generation_key(product_id, brand_id):
+        return f"price:generation:{product_id}:{brand_id}"
+
+    def get(self, product_id, brand_id, application_date):
+        """
+        Devuelve (entrada, generación): la entrada si su segmento contiene la
+        fecha y sigue en la generación vigente (o None) y la generación con la
+        que guardar la respuesta si hay que resolverla.
+        """
+        cache_key, generation_key = self.cache_key(product_id, brand_id), self.generation_key(product_id, brand_id)
+        values = self.backend.get_many([cache_key, generation_key])
+        generation = values.get(generation_key, 0)
+        stored = values.get(cache_key)
+        hit = stored is not None and stored[0] == generation and stored[1].start <= application_date < stored[1].end
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return (stored[1] if hit else None), generation
+
+    def set(self, product_id, brand_id, entry, generation):
+        """Guarda la entrada, resuelta en `generation`, si su segmento está vigente ahora mismo, hasta que termine."""
+        now = timezone.now()
+        if not entry.start <= now < entry.end:
+            return
+        timeout = math.ceil((entry.end - now).total_seconds())
+        self.backend.set(self.cache_key(product_id, brand_id), (generation, entry), timeout=timeout)
+
+    def invalidate(self, keys):
+        """Elimina las entradas de las claves (product_id, brand_id) dadas y cambia su generación."""
+        backend = self.backend
+        for key in keys:
+            generation_key = self.generation_key(*key)
+            try:
+                backend.incr(generation_key)
+            except ValueError:
+                # Primera invalidación de la clave (o el contador se desalojó)
+                if not backend.add(generation_key, 1, timeout=None):
+                    backend.incr(generation_key)
+        backend.delete_many([self.cache_key(*key) for key in keys])
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+# Instancia compartida por el proceso
+price_cache = PriceResponseCache()
@@ -0,0 +1,105 @@
+import json
+
+from django.db import transaction
+from django.db.models import F
+
+from .currencies import minor_to_float
+from .encoding import json_datetime
+from .models import PriceChange, PriceRevision
+
+# El registro de cambios vive en la base de datos por defecto aunque los
+# precios estén repartidos en shards, para tener una única secuencia de revisiones
+CHANGES_DATABASE = 'default'
+
+# Fila única del contador de revisiones (creada por la migración 0008)
+REVISION_COUNTER = 1
+
+
+def upsert_change(price):
+    """Cambio (sin guardar) que registra los valores escritos de una fila de Price."""
+    return PriceChange(
+        op=PriceChange.UPSERT,
+        product_id=price.product_id,
+        brand_id=price.brand_id,
+        price_list=price.price_list,
+        start_date=price.start_date,
+        end_date=price.end_date,
+        price_minor=price.price_minor,
+        price_exponent=price.price_exponent,
+        curr=price.curr,
+        priority=price.priority,
+    )
+
+
+def delete_change(unique_key):
+    """Cambio (sin guardar) que registra el borrado de la fila con clave (product_id, brand_id, price_list)."""
+    product_id, brand_id, price_list = unique_key
+    return PriceChange(op=PriceChange.DELETE, product_id=product_id, brand_id=brand_id, price_list=price_list)
+
+
+def record_changes(changes, batch_size=2000):
+    """
+    Guarda los cambios con revisiones consecutivas y devuelve la última.
+
+    El contador se incrementa con un único UPDATE que bloquea su fila hasta el
+    final de la transacción: si quien llama ya está dentro de una transacción
+    sobre la base de datos del registro (escrituras en el shard por defecto),
+    los cambios se confirman junto con las filas de Price y dos escrituras
+    concurrentes obtienen las revisiones en el orden en que se confirman.
+    Para otros shards los cambios se confirman antes que la transacción del
+    shard y, si esta falla después, quedan como cambios sin efecto.
+    """
+    changes = list(changes)
+    if not changes:
+        return current_revision()
+
+    with transaction.atomic(using=CHANGES_DATABASE):
+        counter = PriceRevision.objects.using(CHANGES_DATABASE).filter(pk=REVISION_COUNTER)
+        counter.update(revision=F('revision') + len(changes))
+        last = counter.values_list('revision', flat=True).get()
+        for revision, change in enumerate(changes, start=last - len(changes) + 1):
+            change.revision = revision
+        PriceChange.objects.using(CHANGES_DATABASE).bulk_create(changes, batch_size=batch_size)
+    return last
+
+
+def current_revision():
+    """Última revisión asignada (0 si no hay cambios)."""
+    return PriceRevision.objects.using(CHANGES_DATABASE).values_list('revision', flat=True).get(pk=REVISION_COUNTER)
+
+
+def changes_since(revision, until=None, limit=None, chunk_size=2000):
+    """Cambios posteriores a `revision` (y hasta `until`, incluida) en orden de revisión, en streaming."""
+    changes = PriceChange.objects.using(CHANGES_DATABASE).filter(revision__gt=revision)
+    if until is not None:
+        changes = changes.filter(revision__lte=until)
+    changes = changes.order_by('revision')
+    if limit is not None:
+        changes = changes[:limit]
+    return changes.iterator(chunk_size=chunk_size)
+
+
+def change_payload(change):
+    """Representación de un cambio: la revisión, la operación, la clave y, en las altas, los valores."""
+    payload = {
+        "revision": change.revision,
+        "op": change.op,
+        "product_id": change.product_id,
+        "brand_id": change.brand_id,
+        "price_list": change.price_list,
+    }
+    if change.op == PriceChange.UPSERT:
+        payload.update({
+            "start_date": json_datetime(change.start_date),
+            "end_date": json_datetime(change.end_date),
+            "price": minor_to_float(change.price_minor, change.price_exponent),
+            "curr": change.curr,
+            "priority": change.priority,
+        })
+    return payload
+
+
+def change_lines(revision, until=None, limit=None):
+    """Líneas NDJSON de los cambios posteriores a `revision`."""
+    for change in changes_since(revision, until=until, limit=limit):
+        yield json.dumps(change_payload(change), separators=(',', ':')).encode() + b'\n'
@@ -0,0 +1,250 @@
+import threading
+import time
+from collections import namedtuple
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .changes import current_revision
+from .models import MAX_KEY_ID, Price
+from .sharding import ordered_rows
+from .timeline import ResolvedPrice, Segment, build_segments, epoch_us, from_epoch_us
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: solo lo necesita este almacén
+    np = None
+
+# Resultado vectorizado de `lookup_arrays`: un array por columna, alineado con
+# las consultas. Donde `found` es False el resto de columnas no tiene sentido.
+ColumnarLookup = namedtuple(
+    'ColumnarLookup',
+    ['found', 'position', 'price_minor', 'price_exponent', 'price_list', 'priority', 'start', 'end'],
+)
+
+
+def key_codes(product_ids, brand_ids):
+    """
+    Codifica (product_id, brand_id) en un int64 ordenable (ambos caben en 31
+    bits). Devuelve los códigos y la máscara de las claves dentro de rango: las
+    demás no existen y su código no debe coincidir con el de otra clave.
+    """
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    brand_ids = np.asarray(brand_ids, dtype=np.int64)
+    valid = (product_ids >= 0) & (product_ids <= MAX_KEY_ID) & (brand_ids >= 0) & (brand_ids <= MAX_KEY_ID)
+    return np.where(valid, (product_ids << 32) | brand_ids, -1), valid
+
+
+def to_epoch_us(timestamps):
+    """Convierte fechas con zona horaria, datetime64 o enteros a microsegundos desde epoch (int64)."""
+    array = np.asarray(timestamps)
+    if array.dtype.kind == 'M':
+        return array.astype('datetime64[us]').astype(np.int64)
+    if array.dtype == object:
+        return np.fromiter((epoch_us(value) for value in array), dtype=np.int64, count=len(array))
+    return array.astype(np.int64)
+
+
+class ColumnarPriceStore:
+    """
+    Almacén columnar de los precios en arrays de NumPy, pensado para resolver
+    millones de consultas de una vez (por ejemplo, repreciados masivos).
+
+    Guarda los segmentos no solapados de todas las claves (el mismo aplanado
+    que PriceIndex) como columnas: inicio y fin en microsegundos desde epoch,
+    prioridad, precio en unidades mínimas, price_list... ordenadas por clave y
+    por inicio. Cada segmento lleva además una clave compuesta
+    `rango de clave * (T + 1) + rango de su inicio`, donde T es el número de
+    inicios distintos, estrictamente creciente en ese orden: un único
+    `searchsorted` sobre ella resuelve un array completo de consultas.
+
+    Cualquier escritura en Price lo descarta entero (se recarga en la siguiente
+    consulta), así que conviene para cargas de lectura masiva. Las del propio
+    proceso llegan por señales; las de otros procesos se detectan comparando la
+    revisión del registro de cambios con la de la carga, como mucho cada
+    PRICES_COLUMNAR_CHECK_INTERVAL segundos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns = None
+        self._revision = None   # revisión del registro de cambios al cargar
+        self._checked = 0.0
+        self.loaded = False
+
+    def load(self):
+        """Carga (o recarga) el almacén completo desde el modelo Price."""
+        if np is None:
+            raise ImproperlyConfigured("The columnar price store requires NumPy.")
+
+        # La revisión se lee antes de recorrer la tabla: un cambio confirmado
+        # durante el recorrido hará que se recargue en la siguiente comprobación
+        revision = current_revision()
+        keys, key_offsets = [], [0]
+        columns = {name: [] for name in (
+            'start', 'end', 'pk', 'price_list', 'row_start', 'row_end', 'price_minor', 'price_exponent', 'curr', 'priority',
+        )}
+        rows = ordered_rows(Price.objects.all(), chunk_size=5000)
+        for key, group in groupby(rows, key=attrgetter('product_id', 'brand_id')):
+            segments = build_segments(group)
+            keys.append(key)
+            key_offsets.append(key_offsets[-1] + len(segments))
+            for segment in segments:
+                row = segment.row
+                columns['start'].append(epoch_us(segment.start))
+                columns['end'].append(epoch_us(segment.end))
+                columns['pk'].append(row.pk)
+                columns['price_list'].append(row.price_list)
+                columns['row_start'].append(epoch_us(row.start_date))
+                columns['row_end'].append(epoch_us(row.end_date))
+                columns['price_minor'].append(row.price_minor)
+                columns['price_exponent'].append(row.price_exponent)
+                columns['curr'].append(row.curr)
+                columns['priority'].append(row.priority)
+
+        arrays = {name: np.array(values, dtype=np.int64) for name, values in columns.items() if name != 'curr'}
+        arrays['curr'] = np.array(columns['curr'], dtype='U3')
+        arrays['keys'], valid = key_codes([key[0] for key in keys], [key[1] for key in keys])
+        if not valid.all():
+            raise ValueError("Price keys out of range for the columnar store.")
+
+        # Rango de la clave de cada segmento y clave compuesta (clave, inicio)
+        counts = np.diff(np.array(key_offsets, dtype=np.int64))
+        key_rank = np.repeat(np.arange(len(keys), dtype=np.int64), counts)
+        starts = np.unique(arrays['start'])
+        arrays['key_rank'] = key_rank
+        arrays['starts'] = starts
+        arrays['composite'] = key_rank * (len(starts) + 1) + np.searchsorted(starts, arrays['start']) + 1
+
+        with self._lock:
+            self._columns = arrays
+            self.loaded = True
+            self._revision, self._checked = revision, time.monotonic()
+        return arrays
+
+    def clear(self):
+        """Vacía el almacén; se volverá a cargar en la siguiente consulta."""
+        with self._lock:
+            self._columns = None
+            self.loaded = False
+            self._revision = None
+            self._checked = 0.0
+
+    def invalidate(self, keys):
+        """Descarta el almacén tras una escritura en las claves dadas."""
+        if self.loaded and keys:
+            self.clear()
+
+    def lookup_arrays(self, product_ids, brand_ids, timestamps):
+        """
+        Resuelve un array de consultas de forma vectorizada. `timestamps` puede
+        ser datetime64, enteros en microsegundos desde epoch o fechas con zona
+        horaria. Devuelve un ColumnarLookup con una posición por consulta.
+        """
+        return self._lookup(self.current(), product_ids, brand_ids, timestamps)
+
+    def _lookup(self, columns, product_ids, brand_ids, timestamps):
+        codes, valid = key_codes(product_ids, brand_ids)
+        when = to_epoch_us(timestamps)
+        starts, keys = columns['starts'], columns['keys']
+        if not len(keys):
+            missing = np.full(len(codes), -1, dtype=np.int64)
+            return ColumnarLookup(missing >= 0, *[missing] * (len(ColumnarLookup._fields) - 1))
+
+        # Rango de la clave de cada consulta (las claves inexistentes se descartan al final)
+        rank = np.minimum(np.searchsorted(keys, codes), len(keys) - 1)
+
+        # Último segmento de la clave que empieza no después de la fecha
+        start_rank = np.searchsorted(starts, when, side='right')
+        position = np.searchsorted(columns['composite'], rank * (len(starts) + 1) + start_rank, side='right') - 1
+        safe = np.maximum(position, 0)
+        found = (
+            valid
+            & (keys[rank] == codes)
+            & (position >= 0)
+            & (columns['key_rank'][safe] == rank)
+            & (when < columns['end'][safe])
+        )
+
+        return ColumnarLookup(
+            found=found,
+            position=np.where(found, position, -1),
+            price_minor=columns['price_minor'][safe],
+            price_exponent=columns['price_exponent'][safe],
+            price_list=columns['price_list'][safe],
+            priority=columns['priority'][safe],
+            start=columns['start'][safe],
+            end=columns['end'][safe],
+        )
+
+    def segments(self, queries):
+        """
+        Resuelve una lista de consultas `(product_id, brand_id, application_date)`
+        y devuelve, alineado con ella, el Segment que contiene cada fecha o None.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        product_ids, brand_ids, dates = zip(*queries)
+        columns = self.current()
+        result = self._lookup(columns, product_ids, brand_ids, list(dates))
+        return [
+            self._segment(columns, int(position), product_id, brand_id) if position >= 0 else None
+            for position, product_id, brand_id in zip(result.position.tolist(), product_ids, brand_ids)
+        ]
+
+    def lookup(self, product_id, brand_id, application_date):
+        """Devuelve el precio ganador para la fecha dada o None si no hay ninguno."""
+        segment = self.segment(product_id, brand_id, application_date)
+        return segment.row if segment is not None else None
+
+    def segment(self, product_id, brand_id, application_date):
+        """Devuelve el segmento que contiene la fecha dada o None."""
+        return self.segments([(product_id, brand_id, application_date)])[0]
+
+    def current(self):
+        """
+        Columnas al día con el registro de cambios, cargándolas (o
+        recargándolas si otro proceso ha escrito) si hace falta. Se usa una
+        única referencia a las columnas durante toda la consulta.
+        """
+        columns = self.fresh()
+        if columns is not None:
+            return columns
+        columns, revision = self._columns, self._revision
+        if columns is None or current_revision() != revision:
+            return self.load()
+        with self._lock:
+            if self._revision == revision:
+                self._checked = time.monotonic()
+        return columns
+
+    def fresh(self):
+        """Columnas vigentes si no toca leer el registro de cambios, o None (no consulta la base de datos)."""
+        interval = getattr(settings, 'PRICES_COLUMNAR_CHECK_INTERVAL', 1.0)
+        columns = self._columns
+        if columns is not None and time.monotonic() - self._checked < interval:
+            return columns
+        return None
+
+    @staticmethod
+    def _segment(columns, position, product_id, brand_id):
+        row = ResolvedPrice(
+            pk=int(columns['pk'][position]),
+            product_id=product_id,
+            brand_id=brand_id,
+            price_list=int(columns['price_list'][position]),
+            start_date=from_epoch_us(columns['row_start'][position]),
+            end_date=from_epoch_us(columns['row_end'][position]),
+            price_minor=int(columns['price_minor'][position]),
+            price_exponent=int(columns['price_exponent'][position]),
+            curr=str(columns['curr'][position]),
+            priority=int(columns['priority'][position]),
+        )
+        return Segment(from_epoch_us(columns['start'][position]), from_epoch_us(columns['end'][position]), row)
+
+
+# Instancia compartida por el proceso
+price_store = ColumnarPriceStore()
@@ -0,0 +1,66 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+
+# Decimales de la unidad menor de cada moneda según ISO 4217 que no usan 2
+CURRENCY_EXPONENTS = {
+    'BHD': 3, 'IQD': 3, 'JOD': 3, 'KWD': 3, 'LYD': 3, 'OMR': 3, 'TND': 3,
+    'BIF': 0, 'CLP': 0, 'DJF': 0, 'GNF': 0, 'ISK': 0, 'JPY': 0, 'KMF': 0, 'KRW': 0,
+    'PYG': 0, 'RWF': 0, 'UGX': 0, 'UYI': 0, 'VND': 0, 'VUV': 0, 'XAF': 0, 'XOF': 0, 'XPF': 0,
+}
+DEFAULT_EXPONENT = 2
+
+# Potencias de 10 por exponente, para pasar de unidades menores a float sin Decimal
+POWERS_OF_TEN = tuple(10 ** exponent for exponent in range(19))
+
+
+def currency_exponent(currency):
+    """Decimales de la unidad menor de la moneda (2 si no está en la tabla)."""
+    return CURRENCY_EXPONENTS.get(currency, DEFAULT_EXPONENT)
+
+
+def to_minor(value, exponent):
+    """
+    Convierte un importe (Decimal, cadena, entero o float) en (unidades menores,
+    exponente) sin perder precisión: con `exponent` decimales o, si el importe
+    tiene más, con los que tenga.
+    """
+    try:
+        amount = value if isinstance(value, Decimal) else Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise ValidationError(f"'{value}' is not a valid price.")
+    if not amount.is_finite():
+        raise ValidationError(f"'{value}' is not a valid price.")
+    exponent = max(exponent, -amount.normalize().as_tuple().exponent)
+    return int(amount.scaleb(exponent)), exponent
+
+
+def from_minor(minor, exponent):
+    """Importe Decimal a partir de unidades menores: solo para las respuestas y la validación."""
+    return Decimal(minor).scaleb(-exponent)
+
+
+def minor_to_float(minor, exponent):
+    """Importe como float correctamente redondeado (igual que `float(from_minor(...))`)."""
+    return minor / POWERS_OF_TEN[exponent]
+
+
+class MinorUnitPrice:
+    """
+    Atributo `price` (Decimal) de los modelos que guardan el importe como
+    `price_minor` (entero en unidades menores) y `price_exponent` (decimales).
+    Asignar `price` calcula ambos campos con los decimales de la moneda `curr`.
+    """
+
+    @property
+    def price(self):
+        if self.price_minor is None:
+            return None
+        return from_minor(self.price_minor, self.price_exponent)
+
+    @price.setter
+    def price(self, value):
+        if value is None:
+            self.price_minor = self.price_exponent = None
+        else:
+            self.price_minor, self.price_exponent = to_minor(value, currency_exponent(self.curr))
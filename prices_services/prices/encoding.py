@@ -0,0 +1,79 @@
+from .currencies import minor_to_float
+
+# Esquema fijo de la respuesta de precio, en el orden de `price_payload` y con
+# los separadores compactos de JSONRenderer
+PRICE_FIELDS_JSON = (
+    '{{"product_id":{product_id},"brand_id":{brand_id},"price_list":{price_list},'
+    '"start_date":"{start_date}","end_date":"{end_date}","price":{price}'
+)
+PRICE_JSON = PRICE_FIELDS_JSON + '}}'
+
+# Respuesta con el precio convertido a otra moneda: se añade "curr" al final
+CONVERTED_PRICE_JSON = PRICE_FIELDS_JSON + ',"curr":"{curr}"}}'
+
+
+def json_datetime(value):
+    """Fecha en el formato de JSONRenderer: ISO 8601 con 'Z' en lugar de '+00:00'."""
+    representation = value.isoformat()
+    if representation.endswith('+00:00'):
+        representation = representation[:-6] + 'Z'
+    return representation
+
+
+def price_payload(price):
+    """Formato de la respuesta para un precio resuelto."""
+    return {
+        "product_id": price.product_id,
+        "brand_id": price.brand_id,
+        "price_list": price.price_list,
+        "start_date": price.start_date,
+        "end_date": price.end_date,
+        "price": price.price,
+    }
+
+
+def encode_price(row):
+    """
+    Codifica la respuesta de un precio (Price o PriceSegment) sin pasar por el
+    codificador JSON genérico. Produce los mismos bytes que
+    `JSONRenderer().render(price_payload(row))`: enteros, fechas como
+    `json_datetime` y el precio como float, calculado directamente desde las
+    unidades menores (mismo valor que `float` del Decimal).
+    """
+    return PRICE_JSON.format(
+        product_id=int(row.product_id),
+        brand_id=int(row.brand_id),
+        price_list=int(row.price_list),
+        start_date=json_datetime(row.start_date),
+        end_date=json_datetime(row.end_date),
+        price=repr(minor_to_float(row.price_minor, row.price_exponent)),
+    ).encode()
+
+
+def encode_converted_payload(payload):
+    """Codifica un `price_payload` con el precio convertido y su moneda en "curr", igual que JSONRenderer."""
+    return CONVERTED_PRICE_JSON.format(
+        product_id=int(payload['product_id']),
+        brand_id=int(payload['brand_id']),
+        price_list=int(payload['price_list']),
+        start_date=json_datetime(payload['start_date']),
+        end_date=json_datetime(payload['end_date']),
+        price=repr(float(payload['price'])),
+        curr=payload['curr'],
+    ).encode()
+
+
+def encoded_price(row):
+    """
+    Bytes de la respuesta de `row`, codificados una sola vez por instancia: las
+    filas que conserva el índice en memoria se codifican en la primera consulta
+    y se reutilizan en las siguientes de cualquiera de sus segmentos.
+    """
+    attributes = getattr(row, '__dict__', None)
+    if attributes is None:
+        # Filas inmutables sin atributos propios (ResolvedPrice)
+        return encode_price(row)
+    body = attributes.get('_encoded_price')
+    if body is None:
+        body = attributes['_encoded_price'] = encode_price(row)
+    return body
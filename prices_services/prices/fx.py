@@ -0,0 +1,167 @@
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .columnar import np
+from .currencies import POWERS_OF_TEN, currency_exponent
+from .models import FxRate, FxRatesVersion
+
+# Fila única con la versión de la tabla de tipos (creada por la migración 0009)
+VERSION_ROW = 1
+
+
+class UnknownCurrency(ValueError):
+    """No hay tipo de cambio para la moneda."""
+
+    def __init__(self, currency):
+        super().__init__(f"No exchange rate for {currency}")
+        self.currency = currency
+
+
+class FxTable:
+    """
+    Tipos de cambio de una versión de la tabla FxRate, en memoria e inmutables.
+
+    La conversión trabaja con unidades menores: multiplica el entero de origen
+    por un factor float por (moneda, exponente, moneda destino), que incluye el
+    cambio de decimales, y redondea a las unidades menores de la moneda destino.
+    La versión escalar (`convert`) y la vectorizada (`convert_many`) hacen la
+    misma operación, así que ambas dan exactamente el mismo resultado.
+    """
+
+    def __init__(self, version, rates):
+        self.version = version
+        self.rates = dict(rates)
+        self._factors = {}
+        self._scales = {}
+
+    def __contains__(self, currency):
+        return currency in self.rates
+
+    def factor(self, source, target):
+        """Factor por el que se multiplica un importe en `source` para expresarlo en `target`."""
+        try:
+            return self._factors[source, target]
+        except KeyError:
+            pass
+        if source == target:
+            factor = 1.0
+        else:
+            for currency in (source, target):
+                if currency not in self.rates:
+                    raise UnknownCurrency(currency)
+            factor = float(self.rates[target] / self.rates[source])
+        self._factors[source, target] = factor
+        return factor
+
+    def scale(self, source, exponent, target):
+        """
+        Factor por el que se multiplican unidades menores de `source` con
+        `exponent` decimales para obtener unidades menores de `target`.
+        """
+        try:
+            return self._scales[source, exponent, target]
+        except KeyError:
+            pass
+        factor = self.factor(source, target)
+        shift = currency_exponent(target) - exponent
+        scale = factor * POWERS_OF_TEN[shift] if shift >= 0 else factor / POWERS_OF_TEN[-shift]
+        self._scales[source, exponent, target] = scale
+        return scale
+
+    def convert(self, price_minor, price_exponent, source, target):
+        """Convierte un importe en unidades menores de `source` a unidades menores de `target`."""
+        return round(price_minor * self.scale(source, price_exponent, target))
+
+    def convert_many(self, minors, exponents, currencies, target):
+        """
+        Convierte a `target` listas alineadas de unidades menores, exponentes y
+        monedas de origen. Devuelve una lista alineada de unidades menores de
+        `target` o None si la moneda de origen no tiene tipo de cambio. Con
+        NumPy el cálculo es una sola operación sobre arrays.
+        """
+        scales = []
+        for exponent, currency in zip(exponents, currencies):
+            try:
+                scales.append(self.scale(currency, exponent, target))
+            except UnknownCurrency:
+                scales.append(None)
+        minors = list(minors)
+
+        if np is not None and minors:
+            known = [scale is not None for scale in scales]
+            values = np.array([scale if scale is not None else 0.0 for scale in scales], dtype=np.float64)
+            converted = np.rint(np.array(minors, dtype=np.int64) * values).astype(np.int64).tolist()
+            return [minor if found else None for minor, found in zip(converted, known)]
+        return [round(minor * scale) if scale is not None else None for minor, scale in zip(minors, scales)]
+
+
+class FxRateCache:
+    """
+    Tabla de tipos de cambio del proceso.
+
+    Como mucho cada PRICES_FX_CHECK_INTERVAL segundos se consulta la versión de
+    la tabla (una fila) y, solo si ha cambiado, se recargan los tipos; el resto
+    de peticiones convierten sin ninguna consulta. Las escrituras del propio
+    proceso la descartan al momento por señales.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._table = None
+        self._checked = 0.0
+
+    def current(self):
+        """Devuelve la tabla vigente, recargándola si la versión ha cambiado."""
+        table = self.fresh()
+        if table is not None:
+            return table
+
+        with self._lock:
+            version = FxRatesVersion.objects.values_list('version', flat=True).get(pk=VERSION_ROW)
+            table = self._table
+            if table is None or table.version != version:
+                table = self._table = FxTable(version, FxRate.objects.values_list('currency', 'rate'))
+            self._checked = time.monotonic()
+            return table
+
+    def fresh(self):
+        """Tabla vigente si no toca comprobar la versión, o None (no consulta la base de datos)."""
+        interval = getattr(settings, 'PRICES_FX_CHECK_INTERVAL', 5.0)
+        if self._table is not None and time.monotonic() - self._checked < interval:
+            return self._table
+        return None
+
+    def clear(self):
+        """Descarta la tabla; se volverá a leer en la siguiente conversión."""
+        with self._lock:
+            self._table = None
+            self._checked = 0.0
+
+
+def bump_version():
+    """Marca la tabla de tipos como modificada para que los procesos la recarguen."""
+    FxRatesVersion.objects.filter(pk=VERSION_ROW).update(version=F('version') + 1)
+
+
+def set_rates(rates):
+    """Inserta o actualiza varios tipos {moneda: tipo} en una transacción, con un único cambio de versión."""
+    now = timezone.now()
+    with transaction.atomic():
+        FxRate.objects.bulk_create(
+            [FxRate(currency=currency, rate=Decimal(rate), updated_at=now) for currency, rate in rates.items()],
+            update_conflicts=True,
+            unique_fields=['currency'],
+            update_fields=['rate', 'updated_at'],
+        )
+        bump_version()
+    fx_rates.clear()
+
+
+# Instancia compartida por el proceso
+fx_rates = FxRateCache()
@@ -0,0 +1,173 @@
+import threading
+import time
+from bisect import bisect_right
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
+
+from .changes import CHANGES_DATABASE, current_revision
+from .models import Price, PriceChange
+from .sharding import keys_by_shard, ordered_rows
+from .timeline import build_segments
+from .utils import chunked, key_filter
+
+
+class PriceIndex:
+    """
+    Índice en memoria de los precios, agrupado por (product_id, brand_id).
+
+    Cada clave guarda sus segmentos no solapados ordenados por inicio, de modo
+    que resolver un precio es una búsqueda binaria sin acceso a la base de datos.
+
+    Con PRICES_INDEX_LAZY no se carga la tabla completa: cada clave se lee de
+    la base de datos la primera vez que se consulta (también las que no tienen
+    precios) y se conserva para las siguientes.
+
+    Las escrituras del propio proceso lo actualizan por señales. Las de otros
+    procesos se incorporan leyendo el registro de cambios desde la revisión
+    con la que se cargó, como mucho cada PRICES_INDEX_CHECK_INTERVAL segundos:
+    las claves cambiadas se reconstruyen (o, en modo perezoso, se descartan).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catch_up_lock = threading.Lock()
+        self._keys = {}         # (product_id, brand_id) -> (inicios, segmentos)
+        self._revision = None   # revisión del registro de cambios ya aplicada
+        self._checked = 0.0
+        self.loaded = False
+
+    def load(self):
+        """Carga (o recarga) el índice completo desde el modelo Price."""
+        # La revisión se lee antes de recorrer la tabla: los cambios que se
+        # confirmen durante el recorrido se vuelven a aplicar al ponerse al día
+        revision = current_revision()
+        keys = {}
+        rows = ordered_rows(Price.objects.all())
+        for key, group in groupby(rows, key=attrgetter('product_id', 'brand_id')):
+            keys[key] = self._entry(list(group))
+
+        with self._lock:
+            self._keys = keys
+            self.loaded = True
+            self._revision, self._checked = revision, time.monotonic()
+
+    def clear(self):
+        """Vacía el índice; se volverá a cargar en la siguiente consulta."""
+        with self._lock:
+            self._keys = {}
+            self.loaded = False
+            self._revision = None
+            self._checked = 0.0
+
+    def lookup(self, product_id, brand_id, application_date):
+        """Devuelve el precio ganador para la fecha dada o None si no hay ninguno."""
+        segment = self.segment(product_id, brand_id, application_date)
+        return segment.row if segment is not None else None
+
+    def segment(self, product_id, brand_id, application_date):
+        """Devuelve el segmento que contiene la fecha dada o None."""
+        entry = self._entry_for(product_id, brand_id)
+        if entry is None:
+            return None
+
+        starts, segments = entry
+        position = bisect_right(starts, application_date) - 1
+        if position < 0:
+            return None
+
+        segment = segments[position]
+        if application_date >= segment.end:
+            return None
+        return segment
+
+    def load_keys(self, keys, chunk_size=200):
+        """
+        Carga en modo perezoso las claves que aún no están en el índice, con una
+        consulta por shard y cada `chunk_size` claves. Las claves sin precios se
+        guardan también, para no volver a consultarlas.
+        """
+        if self.loaded:
+            return
+        if self._revision is None:
+            revision = current_revision()
+            with self._lock:
+                self._revision, self._checked = revision, time.monotonic()
+        missing = {key for key in keys if key not in self._keys}
+        for chunk, groups in self._read_keys(missing, chunk_size):
+            with self._lock:
+                for key in chunk:
+                    self._keys[key] = self._entry(groups[key]) if key in groups else None
+
+    def is_cached(self, product_id, brand_id):
+        """Indica si la clave se puede consultar sin acceder a la base de datos."""
+        return self.fresh() and (self.loaded or (self.lazy and (product_id, brand_id) in self._keys))
+
+    def fresh(self):
+        """Indica si no toca leer el registro de cambios (no consulta la base de datos)."""
+        interval = getattr(settings, 'PRICES_INDEX_CHECK_INTERVAL', 1.0)
+        return self._revision is None or time.monotonic() - self._checked < interval
+
+    def catch_up(self):
+        """Reconstruye las claves cambiadas (en cualquier proceso) desde la revisión ya aplicada."""
+        with self._catch_up_lock:
+            since = self._revision
+            if since is None or self.fresh():
+                return
+            revision = current_revision()
+            if revision != since:
+                changes = PriceChange.objects.using(CHANGES_DATABASE).filter(
+                    revision__gt=since, revision__lte=revision,
+                ).values_list('product_id', 'brand_id').distinct()
+                self.refresh_keys(set(changes.iterator(chunk_size=2000)))
+            with self._lock:
+                if self._revision == since:
+                    self._revision, self._checked = revision, time.monotonic()
+
+    @property
+    def lazy(self):
+        return getattr(settings, 'PRICES_INDEX_LAZY', False)
+
+    def _entry_for(self, product_id, brand_id):
+        if not self.fresh():
+            self.catch_up()
+        if not self.loaded:
+            if not self.lazy:
+                self.load()
+            elif (product_id, brand_id) not in self._keys:
+                self.load_keys([(product_id, brand_id)])
+        return self._keys.get((product_id, brand_id))
+
+    def refresh_keys(self, keys, chunk_size=200):
+        """Reconstruye varias claves con una consulta por shard y cada `chunk_size` claves."""
+        if not self.loaded:
+            # En modo perezoso se descartan y se vuelven a leer en su siguiente consulta
+            with self._lock:
+                for key in keys:
+                    self._keys.pop(key, None)
+            return
+        for chunk, groups in self._read_keys(keys, chunk_size):
+            with self._lock:
+                for key in chunk:
+                    if key in groups:
+                        self._keys[key] = self._entry(groups[key])
+                    else:
+                        self._keys.pop(key, None)
+
+    @staticmethod
+    def _read_keys(keys, chunk_size):
+        # (claves del bloque, {clave: filas}) por shard y cada `chunk_size` claves
+        for alias, shard_keys in keys_by_shard(keys).items():
+            for chunk in chunked(shard_keys, chunk_size):
+                rows = Price.objects.using(alias).filter(key_filter(chunk)).order_by('product_id', 'brand_id')
+                yield chunk, {key: list(group) for key, group in groupby(rows, key=attrgetter('product_id', 'brand_id'))}
+
+    @staticmethod
+    def _entry(rows):
+        segments = build_segments(rows)
+        return [segment.start for segment in segments], segments
+
+
+# Instancia compartida por el proceso
+price_index = PriceIndex()
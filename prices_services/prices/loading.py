@@ -0,0 +1,146 @@
+import csv
+import json
+import time
+from datetime import timezone as dt_timezone
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .changes import record_changes, upsert_change
+from .models import Price
+from .overlaps import incoming_overlaps
+from .sharding import prices_by_shard
+from .signals import prices_bulk_changed
+from .utils import chunked
+
+# Columnas aceptadas en los ficheros de precios (cabeceras sin distinguir mayúsculas);
+# `price` es el importe decimal, que Price guarda en unidades menores de la moneda
+FIELDS = ('product_id', 'brand_id', 'price_list', 'start_date', 'end_date', 'price', 'curr', 'priority')
+
+# Clave de la restricción unique_price_for_brand_and_list y campos que actualiza el upsert
+UNIQUE_FIELDS = ('product_id', 'brand_id', 'price_list')
+UPDATE_FIELDS = ('start_date', 'end_date', 'price_minor', 'price_exponent', 'curr', 'priority')
+
+
+def read_records(stream, fmt):
+    """Lee registros de un fichero CSV o NDJSON de uno en uno, sin cargarlo en memoria."""
+    if fmt == 'csv':
+        for record in csv.DictReader(stream):
+            yield {key.strip().lower(): value for key, value in record.items() if key}
+    elif fmt == 'ndjson':
+        for line in stream:
+            if line.strip():
+                yield {key.lower(): value for key, value in json.loads(line).items()}
+    else:
+        raise ValueError(f"Unsupported format: {fmt!r}")
+
+
+def build_price(record):
+    """
+    Construye un Price sin guardar a partir de un registro y lo valida con las
+    mismas reglas que el modelo: tipos y validadores de cada campo, `Price.clean`
+    y, con ello, las restricciones price_minor_positive y valid_date_range.
+    """
+    price = Price(**{field: record[field] for field in FIELDS if record.get(field) not in (None, '')})
+    price.clean_fields()
+
+    # Las fechas sin zona horaria se interpretan en UTC, igual que en PriceView
+    for field in ('start_date', 'end_date'):
+        value = getattr(price, field)
+        if timezone.is_naive(value):
+            setattr(price, field, timezone.make_aware(value, dt_timezone.utc))
+
+    price.clean()
+    return price
+
+
+def upsert_prices(prices, using='default'):
+    """Inserta o actualiza en bloque por (product_id, brand_id, price_list) en la base de datos `using`."""
+    return Price.objects.using(using).bulk_create(
+        prices,
+        update_conflicts=True,
+        unique_fields=UNIQUE_FIELDS,
+        update_fields=UPDATE_FIELDS,
+    )
+
+
+def write_prices(prices, batch_size=2000):
+    """
+    Escribe precios con upserts de `batch_size` filas en una transacción por
+    shard y avisa a las estructuras derivadas con `prices_bulk_changed`. Dentro
+    de la lista gana la última aparición de cada clave única, que es también
+    la que queda en el registro de cambios. Devuelve el número de filas escritas.
+    """
+    keys = set()
+    written = 0
+    for alias, shard_prices in prices_by_shard(prices).items():
+        unique = {price.unique_key(): price for price in shard_prices}
+        with transaction.atomic(using=alias):
+            for batch in chunked(unique.values(), batch_size):
+                upsert_prices(batch, using=alias)
+                record_changes(upsert_change(price) for price in batch)
+                written += len(batch)
+        keys.update((price.product_id, price.brand_id) for price in unique.values())
+
+    # bulk_create no envía post_save: se avisa a las estructuras derivadas
+    if keys:
+        prices_bulk_changed.send(sender=Price, keys=keys)
+    return written
+
+
+class PriceLoader:
+    """
+    Carga masiva de precios en streaming: valida cada registro, lo escribe con
+    upserts de `batch_size` filas y confirma una transacción cada
+    `transaction_size` filas (una por shard si los precios están repartidos
+    por marca). La memoria usada no depende del tamaño del fichero.
+    """
+
+    def __init__(self, batch_size=2000, transaction_size=50000, skip_invalid=False, progress=None):
+        self.batch_size = batch_size
+        self.transaction_size = max(transaction_size, batch_size)
+        self.skip_invalid = skip_invalid
+        self.progress = progress        # callable(loaded, rejected, elapsed) tras cada transacción
+        self.loaded = 0
+        self.rejected = 0
+        self.started = None
+
+    def load(self, records):
+        """Carga un iterable de registros; devuelve el número de filas escritas."""
+        self.started = time.perf_counter()
+        for chunk in chunked(self._validated(records), self.transaction_size):
+            self._write_transaction(chunk)
+            if self.progress:
+                self.progress(self.loaded, self.rejected, self.elapsed)
+        return self.loaded
+
+    def overlaps(self, records, presorted=True):
+        """
+        Comprobación previa a la carga: valida los registros con las mismas
+        reglas que `load` y devuelve los solapes ambiguos (misma clave y
+        prioridad) que dejarían escribirlos sobre la tabla actual. No escribe
+        nada. Los registros tienen que venir ordenados por clave salvo con
+        `presorted=False` (ver `incoming_overlaps`).
+        """
+        return incoming_overlaps(self._validated(records), presorted=presorted)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.loaded / self.elapsed if self.elapsed else 0.0
+
+    def _validated(self, records):
+        for line, record in enumerate(records, start=1):
+            try:
+                yield build_price(record)
+            except (ValidationError, TypeError, ValueError) as exc:
+                if not self.skip_invalid:
+                    raise ValidationError(f"Record {line}: {exc}") from exc
+                self.rejected += 1
+
+    def _write_transaction(self, prices):
+        self.loaded += write_prices(prices, batch_size=self.batch_size)
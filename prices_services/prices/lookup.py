@@ -0,0 +1,280 @@
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .columnar import price_store
+from .index import price_index
+from .mmap_snapshot import price_snapshot
+from .models import Price, PriceSegment
+from .sharding import keys_by_shard, shard_for_brand
+from .timeline import Segment, build_segments, clip_segments, exclusive_end, find_segment, priority_key
+from .utils import chunked, key_filter
+
+# Número máximo de claves (product_id, brand_id) por consulta en la resolución por lotes
+BATCH_KEYS_PER_QUERY = 200
+
+# Orden con el que se elige el precio ganador entre los vigentes: mayor
+# prioridad primero; a igualdad, el que empezó más tarde, después el que
+# termina antes y, por último, el de menor id. Coincide con el orden de
+# price_lookup_idx, y `timeline.priority_key` aplica exactamente la misma regla.
+WINNER_ORDERING = ('-priority', '-start_date', 'end_date', 'id')
+
+
+def lookup_backend():
+    """Backend configurado para resolver precios (`PRICES_LOOKUP_BACKEND`)."""
+    return getattr(settings, 'PRICES_LOOKUP_BACKEND', 'orm')
+
+
+def resolve_price(product_id, brand_id, application_date):
+    """
+    Devuelve el precio de mayor prioridad vigente en `application_date` para
+    el producto y la marca dados, o None si no existe ninguno.
+    """
+    backend = lookup_backend()
+    if backend == 'index':
+        return price_index.lookup(product_id, brand_id, application_date)
+    if backend == 'columnar':
+        return price_store.lookup(product_id, brand_id, application_date)
+    if backend == 'snapshot':
+        return price_snapshot.lookup(product_id, brand_id, application_date)
+    if backend == 'timeline':
+        return resolve_price_from_timeline(product_id, brand_id, application_date)
+    if backend == 'orm':
+        return resolve_price_from_orm(product_id, brand_id, application_date)
+    raise ImproperlyConfigured(f"Unknown PRICES_LOOKUP_BACKEND: {backend!r}")
+
+
+def resolve_segment(product_id, brand_id, application_date):
+    """
+    Como `resolve_price`, pero devuelve el segmento completo que contiene la
+    fecha: el precio ganador y el intervalo [start, end) en el que lo sigue
+    siendo. Con el backend ORM son dos consultas acotadas por price_lookup_idx.
+    """
+    backend = lookup_backend()
+    if backend == 'index':
+        return price_index.segment(product_id, brand_id, application_date)
+    if backend == 'columnar':
+        return price_store.segment(product_id, brand_id, application_date)
+    if backend == 'snapshot':
+        return price_snapshot.segment(product_id, brand_id, application_date)
+    if backend == 'timeline':
+        segment = resolve_price_from_timeline(product_id, brand_id, application_date)
+        return segment and Segment(segment.segment_start, segment.segment_end, segment)
+    if backend == 'orm':
+        return resolve_segment_from_orm(product_id, brand_id, application_date)
+    raise ImproperlyConfigured(f"Unknown PRICES_LOOKUP_BACKEND: {backend!r}")
+
+
+def price_history(product_id, brand_id, date_from, date_to):
+    """
+    Secuencia exacta de segmentos con precio ganador de la clave dentro de la
+    ventana [date_from, date_to), en orden y recortados a la ventana.
+
+    Se leen en una sola consulta las filas que se solapan con la ventana y se
+    resuelven con el barrido de `build_segments`: O(n log n) en esas filas,
+    independientemente de la longitud de la ventana.
+    """
+    rows = history_rows(Price.objects.using(shard_for_brand(brand_id)), product_id, brand_id, date_from, date_to)
+    return clip_segments(build_segments(rows), date_from, date_to)
+
+
+def history_rows(queryset, product_id, brand_id, date_from, date_to):
+    """Filas de la clave en `queryset` que se solapan con la ventana [date_from, date_to)."""
+    return queryset.filter(
+        product_id=product_id,
+        brand_id=brand_id,
+        start_date__lt=date_to,
+        end_date__gte=date_from,
+    )
+
+
+async def aresolve_price(product_id, brand_id, application_date):
+    """Versión asíncrona de `resolve_price` basada en el ORM asíncrono de Django."""
+    backend = lookup_backend()
+    if backend == 'index':
+        if not price_index.is_cached(product_id, brand_id):
+            # Carga completa o, en modo perezoso, de la clave: acceso a la base de datos
+            return await sync_to_async(price_index.lookup)(product_id, brand_id, application_date)
+        return price_index.lookup(product_id, brand_id, application_date)
+    if backend == 'columnar':
+        if price_store.fresh() is None:
+            # Carga o comprobación del registro de cambios: acceso a la base de datos
+            await sync_to_async(price_store.current)()
+        return price_store.lookup(product_id, brand_id, application_date)
+    if backend == 'snapshot':
+        return price_snapshot.lookup(product_id, brand_id, application_date)
+    if backend == 'timeline':
+        segment = await timeline_candidates(product_id, brand_id, application_date).afirst()
+        return segment_containing(segment, application_date)
+    if backend == 'orm':
+        return await price_candidates(product_id, brand_id, application_date).afirst()
+    raise ImproperlyConfigured(f"Unknown PRICES_LOOKUP_BACKEND: {backend!r}")
+
+
+def price_candidates(product_id, brand_id, application_date, queryset=None):
+    """
+    Precios vigentes en la fecha, ordenados de forma que el primero es el
+    ganador. Por defecto se buscan en Price, en el shard de la marca.
+    """
+    if queryset is None:
+        queryset = Price.objects.using(shard_for_brand(brand_id))
+    # Buscar precios por producto y marca, ordenados por prioridad
+    return queryset.filter(
+        product_id=product_id,
+        brand_id=brand_id,
+        start_date__lte=application_date,
+        end_date__gte=application_date
+    ).order_by(*WINNER_ORDERING)
+
+
+def resolve_price_from_orm(product_id, brand_id, application_date):
+    """Resuelve el precio consultando directamente la tabla Price."""
+    # Una sola consulta: first() devuelve None si no hay ningún precio vigente
+    return price_candidates(product_id, brand_id, application_date).first()
+
+
+def resolve_segment_from_orm(product_id, brand_id, application_date):
+    """
+    Segmento del ganador en la fecha sin leer todas las filas de la clave.
+
+    La primera consulta es la de `resolve_price_from_orm`. La segunda lee solo
+    las filas de prioridad no menor que se solapan con el ganador: las que le
+    ganan (mismo orden que `timeline.priority_key`) y terminan antes de la
+    fecha fijan el inicio del segmento, y las que le ganan y empiezan después,
+    su final. El resultado es el mismo segmento que daría `build_segments`.
+    """
+    winner = resolve_price_from_orm(product_id, brand_id, application_date)
+    if winner is None:
+        return None
+    return winner_segment(winner, segment_rivals(winner), application_date)
+
+
+async def aresolve_segment(product_id, brand_id, application_date):
+    """Versión asíncrona de `resolve_segment` basada en el ORM asíncrono de Django."""
+    backend = lookup_backend()
+    if backend == 'orm':
+        winner = await price_candidates(product_id, brand_id, application_date).afirst()
+        if winner is None:
+            return None
+        return winner_segment(winner, [row async for row in segment_rivals(winner)], application_date)
+    if backend == 'timeline':
+        segment = await timeline_candidates(product_id, brand_id, application_date).afirst()
+        segment = segment_containing(segment, application_date)
+        return segment and Segment(segment.segment_start, segment.segment_end, segment)
+    if backend == 'snapshot' or (backend == 'index' and price_index.is_cached(product_id, brand_id)) or (
+            backend == 'columnar' and price_store.fresh() is not None):
+        return resolve_segment(product_id, brand_id, application_date)
+    # Estructuras en memoria aún sin cargar: acceso a la base de datos
+    return await sync_to_async(resolve_segment)(product_id, brand_id, application_date)
+
+
+def segment_rivals(winner):
+    """Filas de la clave, distintas del ganador, de prioridad no menor y que se solapan con él."""
+    return Price.objects.using(shard_for_brand(winner.brand_id)).filter(
+        product_id=winner.product_id,
+        brand_id=winner.brand_id,
+        priority__gte=winner.priority,
+        start_date__lte=winner.end_date,
+        end_date__gte=winner.start_date,
+    ).exclude(pk=winner.pk)
+
+
+def winner_segment(winner, rivals, application_date):
+    """Recorta la vigencia del ganador en la fecha con las filas de `rivals` que le ganan."""
+    start, end = winner.start_date, exclusive_end(winner.end_date)
+    winner_key = priority_key(winner)
+    for row in rivals:
+        if priority_key(row) >= winner_key:
+            continue
+        # Un rival vigente en la fecha ganaría al ganador: solo puede terminar antes o empezar después
+        if row.end_date < application_date:
+            start = max(start, exclusive_end(row.end_date))
+        else:
+            end = min(end, row.start_date)
+    return Segment(start, end, winner)
+
+
+def timeline_candidates(product_id, brand_id, application_date):
+    """
+    Segmentos de la clave que terminan después de la fecha, en orden: el
+    primero es el único que puede contenerla.
+    """
+    return PriceSegment.objects.using(shard_for_brand(brand_id)).filter(
+        product_id=product_id,
+        brand_id=brand_id,
+        segment_end__gt=application_date
+    ).order_by('segment_end')
+
+
+def segment_containing(segment, application_date):
+    """Devuelve el segmento si contiene la fecha (su inicio no es posterior) o None."""
+    if segment is None or segment.segment_start > application_date:
+        return None
+    return segment
+
+
+def resolve_price_from_timeline(product_id, brand_id, application_date):
+    """Resuelve el precio con una consulta puntual sobre la tabla PriceSegment."""
+    segment = timeline_candidates(product_id, brand_id, application_date).first()
+    return segment_containing(segment, application_date)
+
+
+def resolve_prices(queries):
+    """
+    Resuelve un lote de consultas `(product_id, brand_id, application_date)`.
+
+    Devuelve una lista alineada con `queries` con el precio ganador de cada una
+    o None. Salvo con el índice en memoria, el snapshot binario o el almacén
+    columnar (que resuelve el lote completo con operaciones vectorizadas), se
+    emite una consulta sobre Price por shard y cada `BATCH_KEYS_PER_QUERY`
+    claves distintas, nunca una por elemento.
+    """
+    queries = list(queries)
+    backend = lookup_backend()
+    if backend == 'index':
+        # En modo perezoso, las claves que faltan se cargan juntas antes de resolver
+        if price_index.lazy:
+            price_index.load_keys({(product_id, brand_id) for product_id, brand_id, _ in queries})
+        return [price_index.lookup(*query) for query in queries]
+    if backend == 'snapshot':
+        snapshot = price_snapshot.current()
+        return [snapshot.lookup(*query) for query in queries]
+    if backend == 'columnar':
+        return [segment and segment.row for segment in price_store.segments(queries)]
+    return resolve_prices_from_orm(queries)
+
+
+def resolve_prices_from_orm(queries, model=Price, using=None):
+    """
+    Resolución por lotes sobre la tabla `model`: una consulta por cada
+    `BATCH_KEYS_PER_QUERY` claves distintas en el shard de su marca o, con
+    `using`, todas en esa base de datos.
+    """
+    # Agrupa las fechas pedidas por clave para acotar el rango de cada consulta
+    dates_by_key = defaultdict(list)
+    for product_id, brand_id, application_date in queries:
+        dates_by_key[(product_id, brand_id)].append(application_date)
+
+    keys_by_alias = {using: list(dates_by_key)} if using else keys_by_shard(dates_by_key)
+    segments_by_key = {}
+    for alias, shard_keys in keys_by_alias.items():
+        for chunk in chunked(shard_keys, BATCH_KEYS_PER_QUERY):
+            dates = [date for key in chunk for date in dates_by_key[key]]
+            rows = model.objects.using(alias).filter(
+                key_filter(chunk),
+                start_date__lte=max(dates),
+                end_date__gte=min(dates),
+            )
+            rows_by_key = defaultdict(list)
+            for row in rows:
+                rows_by_key[(row.product_id, row.brand_id)].append(row)
+            for key in chunk:
+                segments_by_key[key] = build_segments(rows_by_key[key])
+
+    results = []
+    for product_id, brand_id, application_date in queries:
+        segment = find_segment(segments_by_key[(product_id, brand_id)], application_date)
+        results.append(segment.row if segment is not None else None)
+    return results
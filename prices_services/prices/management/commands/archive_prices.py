@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from prices.archive import archive_expired, expired_rows, retention_horizon
+from prices.sharding import price_databases
+from prices.views_api import InvalidPriceQuery, parse_application_date, use_archive
+
+
+class Command(BaseCommand):
+    help = "Mueve por lotes a la tabla de archivo los precios que terminaron antes del horizonte de retención."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            help="Archiva los precios que terminan antes de esta fecha "
+                 "(por defecto, hoy menos PRICES_ARCHIVE_RETENTION_DAYS días).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Filas movidas por lote y transacción (por defecto 1000).",
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help="Segundos de espera entre lotes (por defecto 0).",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Solo cuenta las filas que se archivarían en cada shard.",
+        )
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                before = parse_application_date(options['before'])
+            except InvalidPriceQuery:
+                raise CommandError(f"Invalid date: {options['before']}")
+        else:
+            before = retention_horizon()
+
+        if options['dry_run']:
+            total = 0
+            for alias in price_databases():
+                rows = expired_rows(alias, before).count()
+                total += rows
+                self.stdout.write(f"{alias}: {rows} rows")
+            self.stdout.write(self.style.SUCCESS(f"{total} rows end before {before.isoformat()}."))
+            return
+
+        # Sin consultas al archivo, las fechas históricas dejarían de encontrar sus precios
+        if not use_archive():
+            raise CommandError("PRICES_ARCHIVE_LOOKUPS is disabled: archived prices would not be served.")
+
+        archived = archive_expired(
+            before, batch_size=options['batch_size'], pause=options['pause'], progress=self.report,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} rows ending before {before.isoformat()}."))
+
+    def report(self, alias, archived):
+        self.stdout.write(f"{alias}: {archived} rows archived")
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from prices.models import Price
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara bajo ASGI el rendimiento con peticiones concurrentes de PriceView "
+        "(síncrona) y AsyncPriceView sobre los datos de la base de datos configurada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Peticiones por vista.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Peticiones simultáneas.")
+        parser.add_argument('--sample', type=int, default=200, help="Claves distintas consultadas.")
+
+    def handle(self, *args, **options):
+        rows = list(Price.objects.order_by('?').values_list('product_id', 'brand_id', 'start_date')[:options['sample']])
+        if not rows:
+            raise CommandError("No prices to benchmark; load some data first.")
+
+        queries = [
+            {'product_id': product_id, 'brand_id': brand_id, 'application_date': start_date.isoformat()}
+            for product_id, brand_id, start_date in rows
+        ]
+
+        for name in ('price-view', 'price-async-view'):
+            # El cliente de pruebas siempre envía Host: testserver
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                elapsed = async_to_sync(self.run)(reverse(name), queries, options['requests'], options['concurrency'])
+            self.stdout.write(
+                f"{name}: {options['requests']} requests, concurrency {options['concurrency']}, "
+                f"{elapsed:.2f}s, {options['requests'] / elapsed:.0f} req/s"
+            )
+
+    async def run(self, url, queries, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def request(number):
+            async with semaphore:
+                await client.get(url, queries[number % len(queries)])
+
+        started = time.perf_counter()
+        await asyncio.gather(*(request(number) for number in range(total)))
+        return time.perf_counter() - started
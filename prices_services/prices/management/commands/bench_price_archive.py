@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from prices.benchmarks import run_archive_benchmark
+
+
+def integer_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia (p50/p99) de las consultas de precio según el tamaño de la tabla caliente: "
+        "con años de historial vencido en Price, tras archivarlos y sobre el archivo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=10000, help="Claves (product_id, brand_id) generadas.")
+        parser.add_argument(
+            '--history-years', type=integer_list, default=[0, 1, 3],
+            help="Años de historial vencido a medir, separados por comas.",
+        )
+        parser.add_argument('--queries', type=int, default=2000, help="Consultas por camino y caso.")
+        parser.add_argument('--seed', type=int, default=0, help="Semilla de datos y consultas.")
+        parser.add_argument('--output', help="Fichero JSON de resultados (por defecto, la salida estándar).")
+
+    def handle(self, *args, **options):
+        report = run_archive_benchmark(
+            options['keys'],
+            history_years=options['history_years'],
+            queries=options['queries'],
+            seed=options['seed'],
+            progress=self.report,
+        )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+    def report(self, result):
+        self.stderr.write(
+            f"{result['history_years']:>2} years {result['hot_rows']:>9} hot rows {result['stage']:<10} "
+            f"{result['path']:<12} p50 {result['p50_us']:>9.1f}us p99 {result['p99_us']:>9.1f}us "
+            f"{result['queries_per_s']:>10.1f} q/s"
+        )
@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from prices.benchmarks import PATHS, run_benchmarks
+
+
+def integer_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia (p50/p99) y rendimiento de PriceView y de cada camino de consulta "
+        "sobre datos sintéticos de varios tamaños y escribe los resultados en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=integer_list, default=[1000, 10000, 100000],
+            help="Tamaños a medir, en claves (product_id, brand_id), separados por comas.",
+        )
+        parser.add_argument(
+            '--paths', type=lambda value: value.split(','), default=None,
+            help=f"Caminos a medir, separados por comas (por defecto todos: {', '.join(PATHS)}).",
+        )
+        parser.add_argument('--queries', type=int, default=2000, help="Consultas por camino y tamaño.")
+        parser.add_argument('--seed', type=int, default=0, help="Semilla de datos y consultas.")
+        parser.add_argument('--output', help="Fichero JSON de resultados (por defecto, la salida estándar).")
+
+    def handle(self, *args, **options):
+        unknown = set(options['paths'] or []) - set(PATHS)
+        if unknown:
+            raise CommandError(f"Unknown benchmark paths: {', '.join(sorted(unknown))}")
+
+        report = run_benchmarks(
+            options['sizes'],
+            paths=options['paths'],
+            queries=options['queries'],
+            seed=options['seed'],
+            progress=self.report,
+        )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+    def report(self, result):
+        self.stderr.write(
+            f"{result['keys']:>8} keys {result['path']:<16} p50 {result['p50_us']:>9.1f}us "
+            f"p99 {result['p99_us']:>9.1f}us {result['queries_per_s']:>10.1f} q/s"
+        )
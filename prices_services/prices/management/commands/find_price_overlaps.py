@@ -0,0 +1,73 @@
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from prices.loading import PriceLoader, read_records
+from prices.overlaps import UnsortedPrices, incoming_overlaps, overlap_lines, table_overlaps
+
+
+class Command(BaseCommand):
+    help = (
+        "Informe en NDJSON de los precios de la misma clave y prioridad con intervalos solapados, "
+        "en toda la tabla o en un fichero antes de cargarlo. Termina con error si encuentra alguno."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?',
+            help="Fichero de precios a comprobar ('-' para la entrada estándar), ordenado por "
+                 "product_id y brand_id; sin él se revisa la tabla.",
+        )
+        parser.add_argument(
+            '--format', choices=['csv', 'ndjson'],
+            help="Formato del fichero; por defecto se deduce de la extensión.",
+        )
+        parser.add_argument(
+            '--file-only', action='store_true',
+            help="Compara solo las filas del fichero entre sí, sin las de la tabla.",
+        )
+        parser.add_argument(
+            '--unsorted', action='store_true',
+            help="Admite un fichero sin ordenar por clave, a costa de guardar todas sus filas en memoria.",
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help="Fichero del informe ('-' para la salida estándar, por defecto).",
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        stream = None
+        if path is None:
+            overlaps = table_overlaps()
+        else:
+            fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+            prices = PriceLoader()._validated(read_records(stream, fmt))
+            overlaps = incoming_overlaps(
+                prices, include_table=not options['file_only'], presorted=not options['unsorted'],
+            )
+
+        output = None if options['output'] == '-' else open(options['output'], 'w', encoding='utf-8')
+        count = 0
+        try:
+            for line in overlap_lines(overlaps):
+                if output is None:
+                    self.stdout.write(line, ending='')
+                else:
+                    output.write(line)
+                count += 1
+        except ValidationError as exc:
+            raise CommandError(' '.join(exc.messages))
+        except UnsortedPrices as exc:
+            raise CommandError(f"{exc} Sort the file or use --unsorted.")
+        finally:
+            if output is not None:
+                output.close()
+            if stream is not None and stream is not sys.stdin:
+                stream.close()
+
+        if count:
+            raise CommandError(f"Found {count} overlapping prices with the same priority.")
+        self.stderr.write(self.style.SUCCESS("No overlapping prices with the same priority."))
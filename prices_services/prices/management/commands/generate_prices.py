@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from prices.index import price_index
+from prices.models import Price
+from prices.sharding import price_databases
+from prices.synthetic import create_synthetic_prices
+
+
+class Command(BaseCommand):
+    help = "Genera precios sintéticos deterministas con solapamientos y prioridades realistas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=10000, help="Claves (product_id, brand_id) a generar.")
+        parser.add_argument('--seed', type=int, default=0, help="Semilla del generador.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Filas por inserción.")
+        parser.add_argument('--clear', action='store_true', help="Borra antes todos los precios existentes.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            for alias in price_databases():
+                Price.objects.using(alias).all().delete()
+
+        total = create_synthetic_prices(options['keys'], seed=options['seed'], batch_size=options['batch_size'])
+        price_index.clear()
+        self.stdout.write(self.style.SUCCESS(f"Generated {total} prices for {options['keys']} keys."))
@@ -0,0 +1,97 @@
+import sys
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from prices.loading import PriceLoader, read_records
+from prices.overlaps import UnsortedPrices, overlap_lines
+
+# Solapes que se muestran al rechazar una carga por --check-overlaps
+OVERLAPS_SHOWN = 20
+
+
+class Command(BaseCommand):
+    help = "Carga en streaming un fichero de precios CSV o NDJSON con upserts en bloque."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichero a cargar ('-' para leer de la entrada estándar).")
+        parser.add_argument(
+            '--format', choices=['csv', 'ndjson'],
+            help="Formato del fichero; por defecto se deduce de la extensión.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help="Filas por sentencia de inserción (por defecto 2000).",
+        )
+        parser.add_argument(
+            '--transaction-size', type=int, default=50000,
+            help="Filas por transacción (por defecto 50000).",
+        )
+        parser.add_argument(
+            '--skip-invalid', action='store_true',
+            help="Descarta los registros inválidos en lugar de abortar la carga.",
+        )
+        parser.add_argument(
+            '--check-overlaps', action='store_true',
+            help="Antes de escribir, rechaza la carga si deja precios de la misma clave y "
+                 "prioridad solapados (lee el fichero dos veces; tiene que estar ordenado por "
+                 "product_id y brand_id salvo con --unsorted).",
+        )
+        parser.add_argument(
+            '--unsorted', action='store_true',
+            help="Con --check-overlaps, admite un fichero sin ordenar por clave a costa de guardar "
+                 "todas sus filas en memoria durante la comprobación.",
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+
+        if options['check_overlaps']:
+            if path == '-':
+                raise CommandError("--check-overlaps needs a file path: the input is read twice.")
+            self.check_overlaps(path, fmt, options['skip_invalid'], presorted=not options['unsorted'])
+
+        loader = PriceLoader(
+            batch_size=options['batch_size'],
+            transaction_size=options['transaction_size'],
+            skip_invalid=options['skip_invalid'],
+            progress=self.report,
+        )
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        try:
+            loader.load(read_records(stream, fmt))
+        except ValidationError as exc:
+            raise CommandError(f"Load aborted after {loader.loaded} rows. {' '.join(exc.messages)}")
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {loader.loaded} rows ({loader.rejected} rejected) in {loader.elapsed:.1f}s, "
+            f"{loader.rows_per_second:.0f} rows/s."
+        ))
+
+    def check_overlaps(self, path, fmt, skip_invalid, presorted=True):
+        """Aborta antes de escribir nada si la carga dejaría solapes ambiguos."""
+        with open(path, newline='', encoding='utf-8') as stream:
+            records = read_records(stream, fmt)
+            try:
+                overlaps = list(PriceLoader(skip_invalid=skip_invalid).overlaps(records, presorted=presorted))
+            except ValidationError as exc:
+                raise CommandError(f"Load aborted before writing. {' '.join(exc.messages)}")
+            except UnsortedPrices as exc:
+                raise CommandError(f"Load aborted before writing. {exc} Sort the file or use --unsorted.")
+        if overlaps:
+            for line in islice(overlap_lines(overlaps), OVERLAPS_SHOWN):
+                self.stderr.write(line, ending='')
+            raise CommandError(
+                f"Load aborted before writing: {len(overlaps)} overlapping prices with the same priority "
+                f"(run 'manage.py find_price_overlaps {path}' for the full report)."
+            )
+
+    def report(self, loaded, rejected, elapsed):
+        rate = loaded / elapsed if elapsed else 0.0
+        self.stdout.write(f"{loaded} rows loaded, {rejected} rejected, {rate:.0f} rows/s")
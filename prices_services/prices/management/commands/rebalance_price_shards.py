@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from prices.rebalance import misplaced_brands, rebalance_shards
+
+
+class Command(BaseCommand):
+    help = "Mueve los precios de cada marca al shard que le asigna PRICES_SHARD_MAP."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Filas movidas por lote (por defecto 500).",
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Solo muestra las marcas que habría que mover.",
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            moves = misplaced_brands()
+            for brand_id, source, target in moves:
+                self.stdout.write(f"brand {brand_id}: {source} -> {target}")
+            self.stdout.write(self.style.SUCCESS(f"{len(moves)} brands to move."))
+            return
+
+        report = rebalance_shards(batch_size=options['batch_size'], progress=self.report)
+        rows = sum(moved for *_, moved in report)
+        self.stdout.write(self.style.SUCCESS(f"Moved {rows} rows of {len(report)} brands."))
+
+    def report(self, brand_id, source, target, rows):
+        self.stdout.write(f"brand {brand_id}: {rows} rows {source} -> {target}")
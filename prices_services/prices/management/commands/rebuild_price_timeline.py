@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from prices.materialize import rebuild_all_segments
+
+
+class Command(BaseCommand):
+    help = "Reconstruye por completo la tabla PriceSegment a partir de Price."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help="Número de segmentos por inserción (por defecto 2000).",
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_all_segments(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} price segments."))
@@ -0,0 +1,61 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from prices.archive import price_archive
+from prices.fx import UnknownCurrency
+from prices.snapshot import snapshot_lines
+from prices.views_api import (
+    InvalidPriceQuery, archived_date, fx_table_for, parse_application_date, parse_target_currency,
+)
+
+
+class Command(BaseCommand):
+    help = "Escribe en NDJSON el precio vigente de todos los productos de una marca en una fecha."
+
+    def add_arguments(self, parser):
+        parser.add_argument('brand_id', type=int, help="Marca del snapshot.")
+        parser.add_argument('application_date', help="Fecha de aplicación (ISO 8601; sin zona horaria, UTC).")
+        parser.add_argument(
+            '--output', default='-',
+            help="Fichero de salida ('-' para la salida estándar, por defecto).",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help="Filas leídas de la base de datos por bloque (por defecto 2000).",
+        )
+        parser.add_argument(
+            '--target-currency',
+            help="Moneda a la que convertir los precios con la tabla FxRate.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            application_date = parse_application_date(options['application_date'])
+            target_currency = parse_target_currency(options)
+            fx_table = fx_table_for(target_currency) if target_currency else None
+        except (InvalidPriceQuery, UnknownCurrency) as exc:
+            raise CommandError(str(exc))
+
+        prices = None
+        if archived_date(application_date):
+            prices = price_archive.snapshot(options['brand_id'], application_date, chunk_size=options['chunk_size'])
+        lines = snapshot_lines(
+            options['brand_id'], application_date, chunk_size=options['chunk_size'],
+            target_currency=target_currency, fx_table=fx_table, prices=prices,
+        )
+        output = options['output']
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        count = 0
+        try:
+            for line in lines:
+                stream.write(line)
+                count += 1
+        finally:
+            if stream is sys.stdout.buffer:
+                stream.flush()
+            else:
+                stream.close()
+
+        if output != '-':
+            self.stdout.write(self.style.SUCCESS(f"Wrote {count} prices to {output}."))
@@ -0,0 +1,27 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from prices.mmap_snapshot import write_snapshot
+
+
+class Command(BaseCommand):
+    help = "Escribe y publica de forma atómica el snapshot binario de precios del backend 'snapshot'."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help="Fichero de destino (por defecto PRICES_SNAPSHOT_PATH).",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help="Filas leídas de la base de datos por bloque (por defecto 5000).",
+        )
+
+    def handle(self, *args, **options):
+        path = options['output'] or os.fspath(settings.PRICES_SNAPSHOT_PATH)
+        keys, segments = write_snapshot(path, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {segments} segments for {keys} keys to {path} ({os.path.getsize(path)} bytes)."
+        ))
@@ -0,0 +1,66 @@
+from itertools import groupby
+from operator import attrgetter
+
+from django.db import transaction
+
+from .models import Price, PriceSegment
+from .sharding import keys_by_shard, price_databases
+from .timeline import build_segments
+from .utils import chunked, key_filter
+
+
+def segment_objects(rows):
+    """Construye (sin guardar) los PriceSegment de las filas de una clave."""
+    return [
+        PriceSegment(
+            product_id=segment.row.product_id,
+            brand_id=segment.row.brand_id,
+            segment_start=segment.start,
+            segment_end=segment.end,
+            source_id=segment.row.pk,
+            price_list=segment.row.price_list,
+            start_date=segment.row.start_date,
+            end_date=segment.row.end_date,
+            price_minor=segment.row.price_minor,
+            price_exponent=segment.row.price_exponent,
+            curr=segment.row.curr,
+            priority=segment.row.priority,
+        )
+        for segment in build_segments(rows)
+    ]
+
+
+def rebuild_keys_segments(keys, chunk_size=200):
+    """
+    Reconstruye los segmentos de varias claves con consultas por bloques de
+    claves, en el shard de cada una (los segmentos viven junto a sus precios).
+    """
+    for alias, shard_keys in keys_by_shard(keys).items():
+        for chunk in chunked(shard_keys, chunk_size):
+            rows = Price.objects.using(alias).filter(key_filter(chunk)).order_by('product_id', 'brand_id')
+            with transaction.atomic(using=alias):
+                PriceSegment.objects.using(alias).filter(key_filter(chunk)).delete()
+                segments = []
+                for _, group in groupby(rows, key=attrgetter('product_id', 'brand_id')):
+                    segments.extend(segment_objects(group))
+                PriceSegment.objects.using(alias).bulk_create(segments)
+
+
+def rebuild_all_segments(batch_size=2000):
+    """Reconstruye la tabla completa de cada shard recorriendo Price una sola vez, en orden de clave."""
+    total = 0
+    for alias in price_databases():
+        with transaction.atomic(using=alias):
+            PriceSegment.objects.using(alias).all().delete()
+            pending = []
+            rows = Price.objects.using(alias).order_by('product_id', 'brand_id').iterator(chunk_size=batch_size)
+            for _, group in groupby(rows, key=attrgetter('product_id', 'brand_id')):
+                pending.extend(segment_objects(group))
+                if len(pending) >= batch_size:
+                    PriceSegment.objects.using(alias).bulk_create(pending)
+                    total += len(pending)
+                    pending = []
+            PriceSegment.objects.using(alias).bulk_create(pending)
+            total += len(pending)
+    return total
+
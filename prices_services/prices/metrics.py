@@ -0,0 +1,194 @@
+import threading
+from bisect import bisect_left
+
+# Límites de los buckets de latencia, en segundos
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Límites de los buckets del número de consultas por petición
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Counter:
+    """Contador acumulado por combinación de etiquetas."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield f'{self.name}{format_labels(self.labels, label_values)} {value}'
+
+
+class Histogram:
+    """Histograma acumulado con buckets fijos por combinación de etiquetas."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._values = {}   # etiquetas -> [conteos por bucket..., +Inf], suma
+
+    def observe(self, value, *label_values):
+        position = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(label_values) or ([0] * (len(self.buckets) + 1), 0)
+            counts[position] += 1
+            self._values[label_values] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = {labels: (list(counts), total) for labels, (counts, total) in self._values.items()}
+        for label_values, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                labels = format_labels(self.labels + ('le',), label_values + (bound,))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            labels = format_labels(self.labels, label_values)
+            yield f'{self.name}_sum{labels} {total}'
+            yield f'{self.name}_count{labels} {cumulative}'
+
+
+class Registry:
+    """Conjunto de métricas del proceso, exportable en formato de texto de Prometheus."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """Añade una función que devuelve métricas calculadas al exportar: [(nombre, tipo, ayuda, valor)]."""
+        self._collectors.append(collector)
+        return collector
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        for collector in self._collectors:
+            for name, kind, documentation, value in collector():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+request_latency = registry.register(Histogram(
+    'prices_request_duration_seconds', 'Latencia de las peticiones por endpoint.',
+    labels=('endpoint', 'method', 'status'),
+))
+db_queries = registry.register(Histogram(
+    'prices_request_db_queries', 'Consultas a la base de datos por petición.',
+    labels=('endpoint',), buckets=QUERY_COUNT_BUCKETS,
+))
+db_time = registry.register(Histogram(
+    'prices_request_db_duration_seconds', 'Tiempo en la base de datos por petición.',
+    labels=('endpoint',),
+))
+serialization_time = registry.register(Histogram(
+    'prices_response_render_duration_seconds', 'Tiempo de serialización de la respuesta por petición.',
+    labels=('endpoint',),
+))
+slow_profiles = registry.register(Counter(
+    'prices_slow_request_profiles_total', 'Perfiles de peticiones lentas escritos en disco.',
+    labels=('endpoint',),
+))
+
+
+@registry.register_collector
+def cache_counters():
+    # Importación diferida: la caché no depende de las métricas
+    from .cache import price_cache
+
+    stats = price_cache.stats()
+    return [
+        ('prices_cache_hits_total', 'counter', 'Aciertos de la caché de respuestas de PriceView.', stats['hits']),
+        ('prices_cache_misses_total', 'counter', 'Fallos de la caché de respuestas de PriceView.', stats['misses']),
+    ]
+
+
+@registry.register_collector
+def single_flight_counters():
+    # Importación diferida, igual que la caché
+    from .singleflight import async_price_flights, price_flights
+
+    stats = [price_flights.stats(), async_price_flights.stats()]
+    return [
+        ('prices_lookup_executed_total', 'counter', 'Resoluciones de precio ejecutadas por PriceView y AsyncPriceView.',
+         sum(flight['executed'] for flight in stats)),
+        ('prices_lookup_coalesced_total', 'counter', 'Consultas que reutilizaron una resolución idéntica en curso.',
+         sum(flight['coalesced'] for flight in stats)),
+    ]
+
+
+@registry.register_collector
+def key_bloom_stats():
+    # Importación diferida, igual que la caché
+    from .bloom import price_key_bloom
+
+    stats = price_key_bloom.stats()
+    return [
+        ('prices_key_bloom_checks_total', 'counter', 'Claves comprobadas con el filtro de Bloom.', stats['checks']),
+        ('prices_key_bloom_negatives_total', 'counter', 'Consultas respondidas con 404 por el filtro sin ir a la base de datos.', stats['negatives']),
+        ('prices_key_bloom_keys', 'gauge', 'Claves añadidas al filtro de Bloom.', stats['keys']),
+        ('prices_key_bloom_bytes', 'gauge', 'Memoria de los bits del filtro de Bloom.', stats['bytes']),
+        ('prices_key_bloom_error_rate', 'gauge', 'Tasa de falsos positivos esperada del filtro con sus claves actuales.', stats['error_rate']),
+    ]
+
+
+@registry.register_collector
+def archive_stats():
+    # Importación diferida, igual que la caché
+    from .archive import price_archive
+
+    stats = price_archive.stats()
+    return [
+        ('prices_archive_lookups_total', 'counter', 'Consultas anteriores al horizonte resueltas entre Price y el archivo.', stats['lookups']),
+        ('prices_archive_hits_total', 'counter', 'Consultas históricas cuyo ganador estaba archivado.', stats['hits']),
+    ]
+
+
+@registry.register_collector
+def warmup_stats():
+    # Importación diferida: el calentamiento importa todo el camino de consulta
+    from . import warmup
+
+    stats = warmup.last_warmup
+    if stats is None:
+        return []
+    return [
+        ('prices_warmup_duration_seconds', 'gauge', 'Duración del calentamiento al arrancar el proceso.', stats.duration),
+        ('prices_warmup_requests', 'gauge', 'Peticiones de calentamiento hechas al arrancar.', stats.requests),
+        ('prices_warmup_budget_exceeded', 'gauge', 'Si el calentamiento agotó su presupuesto de tiempo (1) o no (0).', int(stats.budget_exceeded)),
+    ]
@@ -0,0 +1,172 @@
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .metrics import db_queries, db_time, request_latency, serialization_time, slow_profiles
+
+# Serializa la escritura de perfiles en el fichero compartido
+_profile_lock = threading.Lock()
+
+
+class RequestMetrics:
+    """Contadores de una petición: consultas, su tiempo total y tiempo de serialización."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.render_time = 0.0
+
+
+# Contadores de la petición en curso. El contexto se copia a los hilos de
+# sync_to_async, así que cada petición concurrente bajo ASGI ve los suyos
+# aunque todas compartan el hilo y la conexión del ORM.
+current_metrics = ContextVar('prices_request_metrics', default=None)
+
+
+def count_query(execute, sql, params, many, context):
+    """
+    Envoltorio de `execute_wrapper`, uno por conexión y para todo el proceso,
+    que acredita la consulta a la petición en curso (si hay alguna).
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.duration += time.perf_counter() - started
+        metrics.count += 1
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    # Cada reconexión vuelve a enviar la señal: el envoltorio se añade una sola vez
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+def record_serialization(duration):
+    """Suma `duration` segundos al tiempo de serialización de la petición en curso."""
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.render_time += duration
+
+
+class RequestMetricsMiddleware:
+    """
+    Registra por endpoint (nombre de la URL) la latencia de cada petición, el
+    número de consultas y el tiempo en la base de datos y el tiempo de
+    serialización de las respuestas renderizadas (DRF Response y plantillas).
+
+    Con PRICES_PROFILE_SAMPLE_RATE > 0 ejecuta esa fracción de las peticiones
+    bajo cProfile y añade a PRICES_PROFILE_FILE el perfil de las que tardan más
+    de PRICES_PROFILE_SLOW_MS milisegundos.
+
+    Admite los dos modos de Django: bajo ASGI no obliga a pasar las vistas
+    asíncronas por un hilo, así que las peticiones concurrentes se atienden a
+    la vez en el bucle de eventos. En ese modo no se perfila: cProfile mide el
+    hilo completo y mezclaría las peticiones que se intercalan en él.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        profiler = cProfile.Profile() if sample_profile() else None
+        metrics = request.metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+
+        started = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            if profiler:
+                profiler.disable()
+            current_metrics.reset(token)
+        self.record(request, response, time.perf_counter() - started, metrics, profiler)
+        return response
+
+    async def __acall__(self, request):
+        metrics = request.metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        self.record(request, response, time.perf_counter() - started, metrics)
+        return response
+
+    def record(self, request, response, duration, metrics, profiler=None):
+        endpoint = endpoint_name(request)
+        request_latency.observe(duration, endpoint, request.method, response.status_code)
+        db_queries.observe(metrics.count, endpoint)
+        db_time.observe(metrics.duration, endpoint)
+        if metrics.render_time:
+            serialization_time.observe(metrics.render_time, endpoint)
+
+        if profiler and duration * 1000 >= getattr(settings, 'PRICES_PROFILE_SLOW_MS', 250):
+            write_profile(profiler, request, endpoint, duration, metrics)
+            slow_profiles.inc(endpoint)
+
+    def process_template_response(self, request, response):
+        # Se ejecuta justo antes de renderizar; el callback, justo después
+        started = time.perf_counter()
+
+        def record(rendered):
+            request.metrics.render_time += time.perf_counter() - started
+
+        response.add_post_render_callback(record)
+        return response
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+def sample_profile():
+    rate = getattr(settings, 'PRICES_PROFILE_SAMPLE_RATE', 0)
+    return rate > 0 and random.random() < rate
+
+
+def write_profile(profiler, request, endpoint, duration, metrics):
+    """Añade al fichero de perfiles las funciones con más tiempo acumulado de la petición."""
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(getattr(settings, 'PRICES_PROFILE_TOP_FUNCTIONS', 30))
+
+    header = (
+        f"=== {timezone.now().isoformat()} {request.method} {request.get_full_path()} "
+        f"endpoint={endpoint} duration_ms={duration * 1000:.1f} "
+        f"queries={metrics.count} db_ms={metrics.duration * 1000:.1f}\n"
+    )
+    with _profile_lock, open(settings.PRICES_PROFILE_FILE, 'a', encoding='utf-8') as profile_file:
+        profile_file.write(header)
+        profile_file.write(output.getvalue())
+        profile_file.write('\n')
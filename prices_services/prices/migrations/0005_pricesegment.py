@@ -0,0 +1,34 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prices', '0004_price_curr'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.PositiveIntegerField()),
+                ('brand_id', models.PositiveIntegerField()),
+                ('segment_start', models.DateTimeField()),
+                ('segment_end', models.DateTimeField()),
+                ('price_list', models.PositiveIntegerField()),
+                ('start_date', models.DateTimeField()),
+                ('end_date', models.DateTimeField()),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('curr', models.CharField(max_length=3)),
+                ('priority', models.PositiveIntegerField()),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='prices.price')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product_id', 'brand_id', 'segment_end'], name='price_segment_lookup_idx')],
+            },
+        ),
+    ]
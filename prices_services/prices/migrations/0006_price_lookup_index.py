@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prices', '0005_pricesegment'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='price',
+            name='prices_pric_product_693c7c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='price',
+            index=models.Index(fields=['product_id', 'brand_id', '-priority', '-start_date', 'end_date'], name='price_lookup_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prices', '0006_price_lookup_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='price',
+            name='price_lookup_idx',
+        ),
+        migrations.AddIndex(
+            model_name='price',
+            index=models.Index(fields=['brand_id', 'product_id', '-priority', '-start_date', 'end_date'], name='price_lookup_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:04
+
+from django.db import migrations, models
+
+
+def create_revision_counter(apps, schema_editor):
+    PriceRevision = apps.get_model('prices', 'PriceRevision')
+    PriceRevision.objects.using(schema_editor.connection.alias).get_or_create(pk=1, defaults={'revision': 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prices', '0007_price_lookup_index_brand_first'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceChange',
+            fields=[
+                ('revision', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('op', models.CharField(choices=[('upsert', 'Alta o modificación'), ('delete', 'Borrado')], max_length=6)),
+                ('product_id', models.PositiveIntegerField()),
+                ('brand_id', models.PositiveIntegerField()),
+                ('price_list', models.PositiveIntegerField()),
+                ('start_date', models.DateTimeField(null=True)),
+                ('end_date', models.DateTimeField(null=True)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('curr', models.CharField(blank=True, default='', max_length=3)),
+                ('priority', models.PositiveIntegerField(null=True)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PriceRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('revision', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(
+            create_revision_counter,
+            migrations.RunPython.noop,
+            hints={'model_name': 'pricerevision'},
+        ),
+    ]
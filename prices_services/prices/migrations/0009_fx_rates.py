@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:11
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def create_version_row(apps, schema_editor):
+    FxRatesVersion = apps.get_model('prices', 'FxRatesVersion')
+    FxRatesVersion.objects.using(schema_editor.connection.alias).get_or_create(pk=1, defaults={'version': 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prices', '0008_price_change_feed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FxRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3, unique=True)),
+                ('rate', models.DecimalField(decimal_places=8, max_digits=18, validators=[django.core.validators.MinValueValidator(Decimal('1E-8'))])),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FxRatesVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(
+            create_version_row,
+            migrations.RunPython.noop,
+            hints={'model_name': 'fxratesversion'},
+        ),
+    ]
@@ -0,0 +1,164 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:32
+
+import django.core.validators
+from decimal import Decimal
+from django.db import migrations, models
+
+# Copia de prices.currencies en el momento de la migración: la tabla puede
+# cambiar después y la migración debe convertir siempre igual.
+CURRENCY_EXPONENTS = {
+    'BHD': 3, 'IQD': 3, 'JOD': 3, 'KWD': 3, 'LYD': 3, 'OMR': 3, 'TND': 3,
+    'BIF': 0, 'CLP': 0, 'DJF': 0, 'GNF': 0, 'ISK': 0, 'JPY': 0, 'KMF': 0, 'KRW': 0,
+    'PYG': 0, 'RWF': 0, 'UGX': 0, 'UYI': 0, 'VND': 0, 'VUV': 0, 'XAF': 0, 'XOF': 0, 'XPF': 0,
+}
+# Decimales de la antigua columna DecimalField(decimal_places=2)
+LEGACY_EXPONENT = 2
+BATCH_SIZE = 2000
+
+
+def minor_units(amount, currency):
+    """
+    (unidades menores, exponente) de un importe Decimal: con los decimales de
+    la moneda si el importe es exacto en ellos y, si no, con los 2 de la
+    columna anterior, para no perder ningún céntimo.
+    """
+    exponent = CURRENCY_EXPONENTS.get(currency, LEGACY_EXPONENT)
+    minor = amount.scaleb(exponent)
+    if minor != minor.to_integral_value():
+        exponent = LEGACY_EXPONENT
+        minor = amount.scaleb(exponent)
+    return int(minor), exponent
+
+
+def forward_rows(model, alias):
+    queryset = model.objects.using(alias).exclude(price=None).order_by('pk')
+    batch = []
+    for row in queryset.iterator(chunk_size=BATCH_SIZE):
+        row.price_minor, row.price_exponent = minor_units(row.price, row.curr)
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.using(alias).bulk_update(batch, ['price_minor', 'price_exponent'])
+            batch = []
+    if batch:
+        model.objects.using(alias).bulk_update(batch, ['price_minor', 'price_exponent'])
+
+
+def backward_rows(model, alias):
+    queryset = model.objects.using(alias).exclude(price_minor=None).order_by('pk')
+    batch = []
+    for row in queryset.iterator(chunk_size=BATCH_SIZE):
+        row.price = Decimal(row.price_minor).scaleb(-row.price_exponent)
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            model.objects.using(alias).bulk_update(batch, ['price'])
+            batch = []
+    if batch:
+        model.objects.using(alias).bulk_update(batch, ['price'])
+
+
+def converter(model_name, rows):
+    def convert(apps, schema_editor):
+        rows(apps.get_model('prices', model_name), schema_editor.connection.alias)
+    return convert
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prices', '0009_fx_rates'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='price',
+            name='price_positive',
+        ),
+        # Las columnas antiguas admiten nulos durante la conversión para que la
+        # migración se pueda deshacer (se rellenan antes de volver a NOT NULL)
+        migrations.AlterField(
+            model_name='price',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(0.0)]),
+        ),
+        migrations.AlterField(
+            model_name='pricesegment',
+            name='price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='price',
+            name='price_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='price',
+            name='price_exponent',
+            field=models.PositiveSmallIntegerField(default=2),
+        ),
+        migrations.AddField(
+            model_name='pricesegment',
+            name='price_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='pricesegment',
+            name='price_exponent',
+            field=models.PositiveSmallIntegerField(default=2),
+        ),
+        migrations.AddField(
+            model_name='pricechange',
+            name='price_minor',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='pricechange',
+            name='price_exponent',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.RunPython(
+            converter('Price', forward_rows),
+            converter('Price', backward_rows),
+            hints={'model_name': 'price'},
+        ),
+        migrations.RunPython(
+            converter('PriceSegment', forward_rows),
+            converter('PriceSegment', backward_rows),
+            hints={'model_name': 'pricesegment'},
+        ),
+        migrations.RunPython(
+            converter('PriceChange', forward_rows),
+            converter('PriceChange', backward_rows),
+            hints={'model_name': 'pricechange'},
+        ),
+        migrations.RemoveField(
+            model_name='price',
+            name='price',
+        ),
+        migrations.RemoveField(
+            model_name='pricesegment',
+            name='price',
+        ),
+        migrations.RemoveField(
+            model_name='pricechange',
+            name='price',
+        ),
+        migrations.AlterField(
+            model_name='price',
+            name='price_minor',
+            field=models.BigIntegerField(validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AlterField(
+            model_name='pricesegment',
+            name='price_minor',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='pricesegment',
+            name='price_exponent',
+            field=models.PositiveSmallIntegerField(),
+        ),
+        migrations.AddConstraint(
+            model_name='price',
+            constraint=models.CheckConstraint(condition=models.Q(('price_minor__gte', 0)), name='price_minor_positive'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.15 on 2026-10-18 17:39
+
+import prices.currencies
+from django.db import migrations, models
+
+
+def create_archive_horizon(apps, schema_editor):
+    PriceArchiveHorizon = apps.get_model('prices', 'PriceArchiveHorizon')
+    PriceArchiveHorizon.objects.using(schema_editor.connection.alias).get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('prices', '0010_price_minor_units'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceArchiveHorizon',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archived_before', models.DateTimeField(null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.PositiveIntegerField()),
+                ('brand_id', models.PositiveIntegerField()),
+                ('price_list', models.PositiveIntegerField()),
+                ('start_date', models.DateTimeField()),
+                ('end_date', models.DateTimeField()),
+                ('price_minor', models.BigIntegerField()),
+                ('price_exponent', models.PositiveSmallIntegerField()),
+                ('curr', models.CharField(max_length=3)),
+                ('priority', models.PositiveIntegerField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['brand_id', 'product_id', '-priority', '-start_date', 'end_date'], name='archived_price_lookup_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product_id', 'brand_id', 'price_list', 'start_date', 'end_date'), name='unique_archived_price')],
+            },
+            bases=(prices.currencies.MinorUnitPrice, models.Model),
+        ),
+        migrations.RunPython(
+            create_archive_horizon,
+            migrations.RunPython.noop,
+            hints={'model_name': 'pricearchivehorizon'},
+        ),
+    ]
@@ -0,0 +1,251 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .models import MAX_KEY_ID, Price
+from .sharding import ordered_rows
+from .timeline import ResolvedPrice, Segment, build_segments, epoch_us, from_epoch_us
+
+# Formato del snapshot binario (little-endian, secciones alineadas a 8 bytes):
+#
+#   cabecera      HEADER (64 bytes)
+#   key_codes     int64[K]    (product_id << 32) | brand_id, ordenados
+#   key_offsets   int64[K+1]  primer segmento de cada clave (CSR)
+#   starts        int64[S]    inicio de cada segmento, µs desde epoch
+#   ends          int64[S]    fin (exclusivo) de cada segmento
+#   records       RECORD[S]   fila ganadora de cada segmento
+#
+# Los segmentos de cada clave están ordenados por inicio, así que una consulta
+# son dos búsquedas binarias directamente sobre el mapa de memoria.
+MAGIC = b'PRICESNP'
+VERSION = 2
+HEADER = struct.Struct('<8sI4xQQq24x')           # magic, versión, K, S, creado (µs)
+RECORD = struct.Struct('<qqqqII4sB3x')           # pk, inicio, fin, precio (unidades menores), price_list, prioridad, moneda, exponente
+
+
+def key_code(product_id, brand_id):
+    """Empaqueta (product_id, brand_id) en un int64 ordenable; ambos deben caber en 31 bits."""
+    if not (0 <= product_id <= MAX_KEY_ID and 0 <= brand_id <= MAX_KEY_ID):
+        raise ValueError(f"Price key out of range: ({product_id}, {brand_id})")
+    return (product_id << 32) | brand_id
+
+
+class InvalidSnapshot(ValueError):
+    """El fichero no es un snapshot de precios válido para esta versión."""
+
+
+def write_snapshot(path, chunk_size=5000):
+    """
+    Escribe el snapshot de todos los precios en `path` y lo publica de forma
+    atómica: se escribe en un fichero temporal del mismo directorio y se
+    renombra con `os.replace`, así que los lectores ven el snapshot anterior o
+    el nuevo completo, nunca uno a medias. Devuelve (claves, segmentos).
+    """
+    key_codes, key_offsets = array('q'), array('q', [0])
+    starts, ends = array('q'), array('q')
+    records = bytearray()
+
+    rows = ordered_rows(Price.objects.all(), chunk_size=chunk_size)
+    for (product_id, brand_id), group in groupby(rows, key=attrgetter('product_id', 'brand_id')):
+        segments = build_segments(group)
+        key_codes.append(key_code(product_id, brand_id))
+        key_offsets.append(key_offsets[-1] + len(segments))
+        for segment in segments:
+            row = segment.row
+            starts.append(epoch_us(segment.start))
+            ends.append(epoch_us(segment.end))
+            records += RECORD.pack(
+                row.pk,
+                epoch_us(row.start_date),
+                epoch_us(row.end_date),
+                row.price_minor,
+                row.price_list,
+                row.priority,
+                row.curr.encode('ascii'),
+                row.price_exponent,
+            )
+
+    if sys.byteorder != 'little':
+        for section in (key_codes, key_offsets, starts, ends):
+            section.byteswap()
+
+    header = HEADER.pack(MAGIC, VERSION, len(key_codes), len(starts), epoch_us(timezone.now()))
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, prefix='.prices-snapshot-')
+    try:
+        with os.fdopen(descriptor, 'wb') as snapshot_file:
+            snapshot_file.write(header)
+            for section in (key_codes, key_offsets, starts, ends):
+                section.tofile(snapshot_file)
+            snapshot_file.write(records)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.chmod(temporary, 0o644)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+    return len(key_codes), len(starts)
+
+
+class MappedPriceSnapshot:
+    """
+    Snapshot abierto con `mmap` en solo lectura. No se copia ni se parsea: las
+    secciones de enteros se leen a través de memoryviews sobre el mapa y solo
+    se decodifica el registro del segmento encontrado. Todos los procesos que
+    abren el mismo fichero comparten sus páginas en la caché del sistema.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as snapshot_file:
+            self.stat = os.fstat(snapshot_file.fileno())
+            self._map = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < HEADER.size:
+            raise InvalidSnapshot(f"{path}: truncated header")
+        magic, version, key_count, segment_count, created = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise InvalidSnapshot(f"{path}: not a version {VERSION} price snapshot")
+        if sys.byteorder != 'little':
+            raise InvalidSnapshot("Price snapshots can only be mapped on little-endian machines")
+
+        expected = HEADER.size + 8 * (2 * key_count + 1 + 2 * segment_count) + RECORD.size * segment_count
+        if len(self._map) != expected:
+            raise InvalidSnapshot(f"{path}: size {len(self._map)}, expected {expected}")
+
+        self.path = path
+        self.created = from_epoch_us(created)
+        view = memoryview(self._map)
+        offset = HEADER.size
+        self.key_codes, offset = view[offset:offset + 8 * key_count].cast('q'), offset + 8 * key_count
+        self.key_offsets, offset = view[offset:offset + 8 * (key_count + 1)].cast('q'), offset + 8 * (key_count + 1)
+        self.starts, offset = view[offset:offset + 8 * segment_count].cast('q'), offset + 8 * segment_count
+        self.ends, offset = view[offset:offset + 8 * segment_count].cast('q'), offset + 8 * segment_count
+        self.records_offset = offset
+
+    def __len__(self):
+        return len(self.starts)
+
+    def prefetch(self):
+        """Pide al sistema que lea por adelantado todas las páginas del mapa (sin bloquear)."""
+        if hasattr(mmap, 'MADV_WILLNEED'):
+            self._map.madvise(mmap.MADV_WILLNEED)
+
+    def lookup(self, product_id, brand_id, application_date):
+        """Devuelve el precio ganador para la fecha dada o None si no hay ninguno."""
+        segment = self.segment(product_id, brand_id, application_date)
+        return segment.row if segment is not None else None
+
+    def segment(self, product_id, brand_id, application_date):
+        """Devuelve el segmento que contiene la fecha dada o None."""
+        try:
+            code = key_code(product_id, brand_id)
+        except ValueError:
+            # Fuera de rango no hay ninguna clave: empaquetarla coincidiría con otra
+            return None
+        position = bisect_left(self.key_codes, code)
+        if position == len(self.key_codes) or self.key_codes[position] != code:
+            return None
+
+        when = epoch_us(application_date)
+        first, last = self.key_offsets[position], self.key_offsets[position + 1]
+        index = bisect_right(self.starts, when, first, last) - 1
+        if index < first or when >= self.ends[index]:
+            return None
+
+        pk, row_start, row_end, price_minor, price_list, priority, curr, price_exponent = RECORD.unpack_from(
+            self._map, self.records_offset + index * RECORD.size
+        )
+        row = ResolvedPrice(
+            pk=pk,
+            product_id=product_id,
+            brand_id=brand_id,
+            price_list=price_list,
+            start_date=from_epoch_us(row_start),
+            end_date=from_epoch_us(row_end),
+            price_minor=price_minor,
+            price_exponent=price_exponent,
+            curr=curr.rstrip(b'\0').decode('ascii'),
+            priority=priority,
+        )
+        return Segment(from_epoch_us(self.starts[index]), from_epoch_us(self.ends[index]), row)
+
+
+class SnapshotReader:
+    """
+    Acceso del proceso al snapshot de `PRICES_SNAPSHOT_PATH`.
+
+    Como mucho cada PRICES_SNAPSHOT_CHECK_INTERVAL segundos comprueba con
+    `os.stat` si el fichero se ha sustituido (otro inodo, tamaño o fecha de
+    modificación) y, en ese caso, abre el nuevo sin reiniciar el worker. Las
+    consultas en curso siguen usando el mapa anterior, que se libera cuando
+    deja de estar referenciado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked = 0.0
+
+    @property
+    def path(self):
+        path = getattr(settings, 'PRICES_SNAPSHOT_PATH', None)
+        if not path:
+            raise ImproperlyConfigured("PRICES_SNAPSHOT_PATH is not set.")
+        return os.fspath(path)
+
+    def current(self):
+        """Devuelve el snapshot vigente, abriendo el nuevo si el fichero ha cambiado."""
+        snapshot = self._snapshot
+        interval = getattr(settings, 'PRICES_SNAPSHOT_CHECK_INTERVAL', 1.0)
+        if snapshot is not None and time.monotonic() - self._checked < interval:
+            return snapshot
+
+        with self._lock:
+            path = self.path
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                raise ImproperlyConfigured(
+                    f"Price snapshot {path} not found; run 'manage.py write_price_snapshot'."
+                )
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.path != path or not same_file(snapshot.stat, stat):
+                snapshot = self._snapshot = MappedPriceSnapshot(path)
+            self._checked = time.monotonic()
+            return snapshot
+
+    def clear(self):
+        """Suelta el snapshot abierto; se volverá a abrir en la siguiente consulta."""
+        with self._lock:
+            self._snapshot = None
+            self._checked = 0.0
+
+    def lookup(self, product_id, brand_id, application_date):
+        return self.current().lookup(product_id, brand_id, application_date)
+
+    def segment(self, product_id, brand_id, application_date):
+        return self.current().segment(product_id, brand_id, application_date)
+
+
+def same_file(previous, current):
+    return (previous.st_ino, previous.st_dev, previous.st_size, previous.st_mtime_ns) == (
+        current.st_ino, current.st_dev, current.st_size, current.st_mtime_ns
+    )
+
+
+# Instancia compartida por el proceso
+price_snapshot = SnapshotReader()
@@ -1,8 +1,14 @@
-from django.db import models
+from django.db import models, router
+from decimal import Decimal
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from .currencies import MinorUnitPrice, currency_exponent
 
-class Price(models.Model):
+# Mayor product_id o brand_id que admite PositiveIntegerField en todas las bases
+# de datos; los almacenes binarios empaquetan las claves contando con este rango
+MAX_KEY_ID = 2 ** 31 - 1
+
+class Price(MinorUnitPrice, models.Model):
     # Definición de los campos principales del modelo
 
     # ID del producto, debe ser un valor positivo
@@ -20,12 +26,15 @@ class Price(models.Model):
     # Fecha de fin del periodo en que el precio es válido
     end_date = models.DateTimeField()           # Fecha de finalización de la vigencia del precio
     
-    # Precio del producto, debe ser positivo o cero, con hasta 10 dígitos y 2 decimales
-    price = models.DecimalField(
-        max_digits=10,                         # Limita el número total de dígitos a 10
-        decimal_places=2,                      # Limita los decimales a 2 dígitos
-        validators=[MinValueValidator(0.0)]    # El precio debe ser positivo o cero
+    # Precio del producto en unidades menores de la moneda (céntimos, yenes...),
+    # debe ser positivo o cero. El importe es price_minor / 10 ** price_exponent
+    # y se lee y asigna como Decimal a través del atributo `price`.
+    price_minor = models.BigIntegerField(
+        validators=[MinValueValidator(0)]      # El precio debe ser positivo o cero
     )
+
+    # Decimales de la unidad menor de la moneda (2 para USD o EUR, 0 para JPY)
+    price_exponent = models.PositiveSmallIntegerField(default=2)
     
     # Campo para la moneda, con un máximo de 3 caracteres (ej. USD, EUR)
     curr = models.CharField(
@@ -51,8 +60,8 @@ class Price(models.Model):
                 name='unique_price_for_brand_and_list'            # Nombre de la restricción de unicidad
             ),
             models.CheckConstraint(
-                condition=models.Q(price__gte=0),  # Verifica que el precio sea mayor o igual a 0
-                name='price_positive'              # Nombre de la restricción de verificación
+                condition=models.Q(price_minor__gte=0),  # Verifica que el precio sea mayor o igual a 0
+                name='price_minor_positive'              # Nombre de la restricción de verificación
             ),
             models.CheckConstraint(
                 condition=models.Q(start_date__lt=models.F('end_date')),  # Verifica que la fecha de inicio sea menor que la fecha de fin
@@ -60,9 +69,18 @@ class Price(models.Model):
             ),
         ]
 
-        # Define índices para mejorar el rendimiento de consultas en los campos product_id, brand_id y price_list
+        # Índice para la consulta de PriceView: igualdad en brand_id y product_id,
+        # recorrido en el orden de WINNER_ORDERING (prioridad y fecha de inicio
+        # descendentes, id implícito) y end_date en el propio índice, de modo que
+        # el rango de fechas se filtra sin leer la tabla ni ordenar en memoria.
+        # brand_id va primero para que el snapshot de una marca (prices/snapshot.py)
+        # recorra el mismo índice en orden de product_id.
+        # La unicidad de (product_id, brand_id, price_list) ya crea su propio índice.
         indexes = [
-            models.Index(fields=['product_id', 'brand_id', 'price_list']),
+            models.Index(
+                fields=['brand_id', 'product_id', '-priority', '-start_date', 'end_date'],
+                name='price_lookup_idx',
+            ),
         ]
 
     # Validaciones personalizadas en el nivel de aplicación
@@ -72,9 +90,208 @@ class Price(models.Model):
             raise ValidationError('La fecha de inicio debe ser anterior a la fecha de fin.')
 
         # Valida que el precio no sea negativo
-        if self.price < 0:
+        if self.price_minor < 0:
             raise ValidationError('El precio no puede ser negativo.')
 
+        # Valida que el precio no tenga más decimales de los que admite la moneda
+        exponent = currency_exponent(self.curr)
+        if self.price_exponent > exponent:
+            scale = 10 ** (self.price_exponent - exponent)
+            if self.price_minor % scale:
+                raise ValidationError(f'El precio tiene más de {exponent} decimales para {self.curr}.')
+            self.price_minor, self.price_exponent = self.price_minor // scale, exponent
+        elif self.price_exponent < exponent:
+            # Se normaliza a los decimales de la moneda (la moneda pudo asignarse después del precio)
+            self.price_minor, self.price_exponent = self.price_minor * 10 ** (exponent - self.price_exponent), exponent
+
+        # Valida que el precio en unidades menores quepa en la columna price_minor
+        if self.price_minor > models.BigIntegerField.MAX_BIGINT:
+            raise ValidationError('El precio es demasiado alto.')
+
+    # Recuerda la clave única (product_id, brand_id, price_list) con la que se leyó la fila de la base de datos
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_unique_key = tuple(instance.__dict__.get(field) for field in ('product_id', 'brand_id', 'price_list'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Cada fila se guarda en el shard de su marca, también cuando llega un
+        # `using` fijo (Price.objects.create pasa el alias por defecto)
+        target = kwargs['using'] = router.db_for_write(Price, instance=self)
+        if self.pk is not None and self._state.db not in (None, target):
+            # La marca pasa a otro shard: la fila se borra del anterior y se inserta
+            # en el nuevo con un id propio de ese shard. El borrado ya sincroniza
+            # (y registra) la clave anterior.
+            Price.objects.using(self._state.db).filter(pk=self.pk).delete()
+            self._saved_unique_key = None
+            self.pk = None
+            self._state.adding = True
+        super().save(*args, **kwargs)
+        # post_save ya se ha enviado con la clave anterior: a partir de aquí la guardada es la actual
+        self._saved_unique_key = self.unique_key()
+
+    def unique_key(self):
+        """Clave de la restricción unique_price_for_brand_and_list."""
+        return (self.product_id, self.brand_id, self.price_list)
+
+    def saved_unique_key(self):
+        """Clave única con la que la fila está guardada (la actual si no se leyó de la base de datos)."""
+        return getattr(self, '_saved_unique_key', None) or self.unique_key()
+
+    def affected_keys(self):
+        """Claves afectadas por una escritura de esta fila: la actual y, si cambió, la guardada antes."""
+        return {(self.product_id, self.brand_id), self.saved_unique_key()[:2]}
+
     # Representación en cadena del objeto para mostrar información útil cuando se imprima o se consulte
     def __str__(self):
         return f"Price {self.product_id} for brand {self.brand_id}, Price List {self.price_list}, Priority {self.priority}, Currency {self.curr}"
+
+
+class ArchivedPrice(MinorUnitPrice, models.Model):
+    # Precios ya vencidos sacados de Price por prices/archive.py: los mismos
+    # datos, sin restricción de unicidad por lista de precios (una misma lista
+    # puede archivarse varias veces con vigencias distintas). Vive en la base
+    # de datos PRICES_ARCHIVE_DATABASE, fuera de los shards.
+
+    product_id = models.PositiveIntegerField()
+    brand_id = models.PositiveIntegerField()
+    price_list = models.PositiveIntegerField()
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    price_minor = models.BigIntegerField()
+    price_exponent = models.PositiveSmallIntegerField()
+    curr = models.CharField(max_length=3)
+    priority = models.PositiveIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Archivar dos veces la misma fila (un lote interrumpido que se repite) no la duplica
+            models.UniqueConstraint(
+                fields=['product_id', 'brand_id', 'price_list', 'start_date', 'end_date'],
+                name='unique_archived_price',
+            ),
+        ]
+        # Mismo índice que price_lookup_idx para las consultas históricas de PriceView
+        indexes = [
+            models.Index(
+                fields=['brand_id', 'product_id', '-priority', '-start_date', 'end_date'],
+                name='archived_price_lookup_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Archived price {self.product_id} for brand {self.brand_id}, Price List {self.price_list}, {self.start_date} - {self.end_date}"
+
+
+class PriceArchiveHorizon(models.Model):
+    # Horizonte del archivo (una única fila, pk=1): las filas de Price que
+    # terminan antes de `archived_before` pueden estar en ArchivedPrice, así que
+    # solo las consultas anteriores a esa fecha necesitan leer el archivo. Nunca
+    # retrocede.
+
+    archived_before = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return f"Archived before {self.archived_before}"
+
+
+class PriceSegment(MinorUnitPrice, models.Model):
+    # Tabla derivada de Price: cada (product_id, brand_id) aplanado en segmentos
+    # no solapados [segment_start, segment_end) con el precio ganador de cada uno.
+    # Se reconstruye por clave desde prices/materialize.py; no se edita a mano.
+
+    product_id = models.PositiveIntegerField()
+    brand_id = models.PositiveIntegerField()
+
+    # Inicio (inclusivo) y fin (exclusivo) del segmento
+    segment_start = models.DateTimeField()
+    segment_end = models.DateTimeField()
+
+    # Fila de Price que gana en el segmento y sus datos desnormalizados
+    source = models.ForeignKey(Price, on_delete=models.CASCADE, related_name='segments')
+    price_list = models.PositiveIntegerField()
+    start_date = models.DateTimeField()         # Vigencia completa de la fila ganadora
+    end_date = models.DateTimeField()
+    price_minor = models.BigIntegerField()
+    price_exponent = models.PositiveSmallIntegerField()
+    curr = models.CharField(max_length=3)
+    priority = models.PositiveIntegerField()
+
+    class Meta:
+        # Una consulta puntual es: primer segmento de la clave que termina después de la fecha
+        indexes = [
+            models.Index(fields=['product_id', 'brand_id', 'segment_end'], name='price_segment_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"Segment {self.product_id} for brand {self.brand_id}, Price List {self.price_list}, {self.segment_start} - {self.segment_end}"
+
+
+class PriceChange(MinorUnitPrice, models.Model):
+    # Registro de cambios de Price: cada alta, modificación o borrado de una
+    # fila, identificada por su clave única, con una revisión creciente. Las
+    # altas y modificaciones guardan los valores escritos; los borrados, solo
+    # la clave. Se escribe desde prices/changes.py.
+
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    OP_CHOICES = [
+        (UPSERT, 'Alta o modificación'),
+        (DELETE, 'Borrado'),
+    ]
+
+    revision = models.BigIntegerField(primary_key=True)
+    op = models.CharField(max_length=6, choices=OP_CHOICES)
+    product_id = models.PositiveIntegerField()
+    brand_id = models.PositiveIntegerField()
+    price_list = models.PositiveIntegerField()
+    start_date = models.DateTimeField(null=True)
+    end_date = models.DateTimeField(null=True)
+    price_minor = models.BigIntegerField(null=True)
+    price_exponent = models.PositiveSmallIntegerField(null=True)
+    curr = models.CharField(max_length=3, blank=True, default='')
+    priority = models.PositiveIntegerField(null=True)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Revision {self.revision}: {self.op} {self.product_id} for brand {self.brand_id}, Price List {self.price_list}"
+
+
+class PriceRevision(models.Model):
+    # Contador de revisiones del registro de cambios (una única fila, pk=1).
+    # Cada escritura lo incrementa con un UPDATE que bloquea la fila hasta el
+    # commit, así que las revisiones se asignan en el orden de confirmación.
+
+    revision = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Revision {self.revision}"
+
+
+class FxRate(models.Model):
+    # Tipo de cambio de cada moneda: unidades de `currency` por unidad de una
+    # moneda de referencia común (la que tenga tipo 1). Convertir de A a B es
+    # multiplicar por rate(B) / rate(A). Se lee en memoria desde prices/fx.py.
+
+    currency = models.CharField(max_length=3, unique=True)   # Código ISO 4217
+    rate = models.DecimalField(
+        max_digits=18,
+        decimal_places=8,
+        validators=[MinValueValidator(Decimal('0.00000001'))],   # Debe ser positivo
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.currency} {self.rate}"
+
+
+class FxRatesVersion(models.Model):
+    # Versión de la tabla FxRate (una única fila, pk=1): cada escritura la
+    # incrementa y los procesos recargan los tipos al ver una versión nueva.
+
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"FX rates version {self.version}"
@@ -0,0 +1,140 @@
+import heapq
+import json
+from collections import defaultdict, namedtuple
+from itertools import groupby
+from operator import attrgetter
+
+from .encoding import json_datetime
+from .models import Price
+from .sharding import keys_by_shard, ordered_rows
+from .utils import chunked, key_filter
+
+# Columnas de Price que necesita la detección de solapes
+OVERLAP_FIELDS = ('product_id', 'brand_id', 'price_list', 'start_date', 'end_date', 'priority')
+
+# Fila reducida a esas columnas (para los precios de un fichero, que se guardan en memoria)
+OverlapRow = namedtuple('OverlapRow', OVERLAP_FIELDS)
+
+# Dos filas de la misma clave y prioridad vigentes a la vez en [start, end]
+# (ambos inclusive, como start_date y end_date): en ese intervalo el ganador
+# no lo decide la prioridad sino el desempate de WINNER_ORDERING.
+Overlap = namedtuple('Overlap', ['product_id', 'brand_id', 'priority', 'price_list', 'other_price_list', 'start', 'end'])
+
+
+def key_overlaps(rows):
+    """
+    Solapes ambiguos entre las filas de una misma clave (product_id, brand_id).
+
+    Por cada prioridad se recorren las filas por fecha de inicio manteniendo en
+    un heap, por fecha de fin, las que siguen vigentes: cada fila solapa
+    exactamente con las que quedan en el heap al llegar a su inicio. Coste
+    O(n log n) más el número de solapes encontrados.
+    """
+    rows = sorted(rows, key=attrgetter('priority', 'start_date', 'price_list'))
+    for priority, group in groupby(rows, key=attrgetter('priority')):
+        active = []     # (end_date, price_list, fila)
+        for row in group:
+            while active and active[0][0] < row.start_date:
+                heapq.heappop(active)
+            for end_date, price_list, other in sorted(active, key=lambda item: item[1]):
+                yield Overlap(
+                    product_id=row.product_id,
+                    brand_id=row.brand_id,
+                    priority=priority,
+                    price_list=price_list,
+                    other_price_list=row.price_list,
+                    start=row.start_date,
+                    end=min(end_date, row.end_date),
+                )
+            heapq.heappush(active, (row.end_date, row.price_list, row))
+
+
+def find_overlaps(rows):
+    """Solapes ambiguos de filas ordenadas por (product_id, brand_id), clave a clave y en streaming."""
+    for _, group in groupby(rows, key=attrgetter('product_id', 'brand_id')):
+        yield from key_overlaps(group)
+
+
+def table_overlaps(chunk_size=5000):
+    """Todos los solapes ambiguos de la tabla Price, recorriéndola una vez en cada shard."""
+    return find_overlaps(ordered_rows(Price.objects.only(*OVERLAP_FIELDS), chunk_size=chunk_size))
+
+
+class UnsortedPrices(ValueError):
+    """La entrada de `incoming_overlaps` no está ordenada por (product_id, brand_id)."""
+
+
+def overlap_row(price):
+    """Fila de un precio reducida a las columnas de OVERLAP_FIELDS."""
+    return OverlapRow(*(getattr(price, field) for field in OVERLAP_FIELDS))
+
+
+def key_runs(prices):
+    """
+    Filas de `prices` agrupadas por clave (product_id, brand_id) en streaming,
+    con la última fila de cada price_list. La entrada tiene que venir ordenada
+    por clave: si una clave aparece después de otra mayor, UnsortedPrices.
+    """
+    previous = None
+    for key, group in groupby(prices, key=attrgetter('product_id', 'brand_id')):
+        if previous is not None and key <= previous:
+            raise UnsortedPrices(
+                f"Prices must be sorted by product_id and brand_id to check overlaps "
+                f"(found {key} after {previous})."
+            )
+        previous = key
+        yield key, {price.price_list: overlap_row(price) for price in group}
+
+
+def unsorted_key_runs(prices):
+    """Como `key_runs` para una entrada en cualquier orden: guarda todas sus filas en memoria."""
+    by_key = defaultdict(dict)      # (product_id, brand_id) -> {price_list: fila}
+    for price in prices:
+        by_key[price.product_id, price.brand_id][price.price_list] = overlap_row(price)
+    for key in sorted(by_key):
+        yield key, by_key[key]
+
+
+def incoming_overlaps(prices, include_table=True, chunk_size=200, presorted=True):
+    """
+    Solapes ambiguos que dejaría escribir `prices` (instancias sin guardar,
+    p. ej. de un fichero). Igual que `write_prices`, dentro de la entrada gana
+    la última fila de cada clave única y, con `include_table`, esas filas
+    sustituyen a las de la tabla con la misma clave única; el resto de filas de
+    la tabla de las mismas claves (product_id, brand_id) también se comparan.
+
+    La entrada se recorre en streaming, `chunk_size` claves cada vez, así que
+    tiene que venir ordenada por (product_id, brand_id) (UnsortedPrices si no).
+    Con `presorted=False` se admite cualquier orden a costa de guardar en
+    memoria todas sus filas.
+    """
+    runs = key_runs(prices) if presorted else unsorted_key_runs(prices)
+    for chunk in chunked(runs, chunk_size):
+        if include_table:
+            by_key = dict(chunk)
+            for alias, keys in keys_by_shard(by_key).items():
+                rows = Price.objects.using(alias).filter(key_filter(keys)).values_list(*OVERLAP_FIELDS)
+                for row in rows.iterator():
+                    row = OverlapRow(*row)
+                    by_key[row.product_id, row.brand_id].setdefault(row.price_list, row)
+        for _, rows in chunk:
+            yield from key_overlaps(rows.values())
+
+
+def overlap_payload(overlap):
+    """Representación de un solape en el informe."""
+    return {
+        "product_id": overlap.product_id,
+        "brand_id": overlap.brand_id,
+        "priority": overlap.priority,
+        "price_list": overlap.price_list,
+        "other_price_list": overlap.other_price_list,
+        "start": json_datetime(overlap.start),
+        "end": json_datetime(overlap.end),
+    }
+
+
+def overlap_lines(overlaps):
+    """Informe en NDJSON: una línea por solape."""
+    for overlap in overlaps:
+        yield json.dumps(overlap_payload(overlap), separators=(',', ':')) + '\n'
@@ -0,0 +1,62 @@
+from django.db import connections, transaction
+
+from .loading import FIELDS, upsert_prices
+from .models import Price, PriceSegment
+from .sharding import all_price_databases, shard_for_brand
+from .signals import prices_bulk_changed
+
+
+def misplaced_brands():
+    """Marcas con filas en un shard distinto del que les asigna el mapa: [(brand_id, origen, destino)]."""
+    moves = []
+    for source in all_price_databases():
+        brands = Price.objects.using(source).order_by('brand_id').values_list('brand_id', flat=True).distinct()
+        for brand_id in brands:
+            target = shard_for_brand(brand_id)
+            if target != source:
+                moves.append((brand_id, source, target))
+    return moves
+
+
+def move_brand(brand_id, source, target, batch_size=500):
+    """
+    Mueve todas las filas de la marca de `source` a `target` por lotes: cada
+    lote se inserta (upsert por la clave única, así que repetir un movimiento
+    interrumpido es seguro) en el destino y después se borra del origen junto
+    con sus segmentos, con borrados directos sin señales por fila. Al final se
+    avisa con `prices_bulk_changed` para reconstruir las estructuras derivadas.
+    Devuelve el número de filas movidas.
+    """
+    moved = 0
+    keys = set()
+    while True:
+        batch = list(Price.objects.using(source).filter(brand_id=brand_id).order_by('pk')[:batch_size])
+        if not batch:
+            break
+
+        with transaction.atomic(using=target):
+            upsert_prices([Price(**{field: getattr(row, field) for field in FIELDS}) for row in batch], using=target)
+
+        pks = [row.pk for row in batch]
+        placeholders = ', '.join(['%s'] * len(pks))
+        with transaction.atomic(using=source), connections[source].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {PriceSegment._meta.db_table} WHERE source_id IN ({placeholders})', pks)
+            cursor.execute(f'DELETE FROM {Price._meta.db_table} WHERE id IN ({placeholders})', pks)
+
+        keys.update((row.product_id, row.brand_id) for row in batch)
+        moved += len(batch)
+
+    if keys:
+        prices_bulk_changed.send(sender=Price, keys=keys)
+    return moved
+
+
+def rebalance_shards(batch_size=500, progress=None):
+    """Mueve al shard que les corresponde las marcas mal ubicadas; devuelve [(brand_id, origen, destino, filas)]."""
+    report = []
+    for brand_id, source, target in misplaced_brands():
+        rows = move_brand(brand_id, source, target, batch_size=batch_size)
+        report.append((brand_id, source, target, rows))
+        if progress:
+            progress(brand_id, source, target, rows)
+    return report
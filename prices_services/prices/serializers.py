@@ -1,7 +1,46 @@
+from decimal import Decimal
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
-from .models import Price
+from .loading import write_prices
+from .models import MAX_KEY_ID, Price
+
+
+class PriceListSerializer(serializers.ListSerializer):
+    """
+    Escritura de una lista de precios como un único upsert en bloque. Tras
+    `save()`, `written` es el número de filas escritas (una por clave única).
+    """
+
+    def create(self, validated_data):
+        prices = [Price(**attrs) for attrs in validated_data]
+        self.written = write_prices(prices)
+        return prices
+
 
 class PriceSerializer(serializers.ModelSerializer):
+    # Importe decimal; el modelo lo guarda en unidades menores con los decimales de
+    # la moneda. max_digits lo acota para que quepa en el BigIntegerField de price_minor
+    price = serializers.DecimalField(max_digits=18, decimal_places=None, min_value=Decimal('0'))
+
     class Meta:
         model = Price
         fields = ['brand_id', 'start_date', 'end_date', 'price_list', 'product_id', 'priority', 'price', 'curr']
+        list_serializer_class = PriceListSerializer
+        # Sin UniqueTogetherValidator: haría una consulta por fila y la clave
+        # única (product_id, brand_id, price_list) la resuelve el propio upsert
+        validators = []
+
+    def validate(self, attrs):
+        # Mismas reglas que Price.clean (y las restricciones price_minor_positive y valid_date_range)
+        try:
+            Price(**attrs).clean()
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.messages)
+        return attrs
+
+
+class PriceQuerySerializer(serializers.Serializer):
+    """Una consulta de precio dentro de una petición por lotes."""
+    product_id = serializers.IntegerField(min_value=0, max_value=MAX_KEY_ID)
+    brand_id = serializers.IntegerField(min_value=0, max_value=MAX_KEY_ID)
+    application_date = serializers.DateTimeField()
@@ -0,0 +1,128 @@
+import heapq
+from collections import defaultdict
+from operator import attrgetter
+
+from django.conf import settings
+
+# Modelos que se reparten entre shards por brand_id. PriceSegment vive siempre
+# en el mismo shard que la fila de Price de la que se deriva.
+SHARDED_MODELS = ('price', 'pricesegment')
+
+# Modelos del archivo de precios vencidos, en su propia base de datos
+ARCHIVE_MODELS = ('archivedprice', 'pricearchivehorizon')
+
+
+def default_shard():
+    """Base de datos de las marcas que no aparecen en PRICES_SHARD_MAP."""
+    return getattr(settings, 'PRICES_DEFAULT_SHARD', 'default')
+
+
+def shard_for_brand(brand_id):
+    """Alias de la base de datos que guarda los precios de la marca."""
+    return getattr(settings, 'PRICES_SHARD_MAP', {}).get(brand_id, default_shard())
+
+
+def archive_database():
+    """Base de datos del archivo de precios vencidos (ArchivedPrice)."""
+    return getattr(settings, 'PRICES_ARCHIVE_DATABASE', 'default')
+
+
+def price_databases():
+    """
+    Shards en uso según el mapa actual: el shard por defecto y los que tienen
+    alguna marca asignada. Los recorridos completos (índice, snapshots...) leen
+    solo estos, igual que las consultas por marca.
+    """
+    databases = [default_shard()]
+    for alias in getattr(settings, 'PRICES_SHARD_MAP', {}).values():
+        if alias not in databases:
+            databases.append(alias)
+    return databases
+
+
+def all_price_databases():
+    """Todas las bases de datos que pueden guardar precios, estén o no en el mapa actual."""
+    databases = price_databases()
+    for alias in getattr(settings, 'PRICES_SHARD_DATABASES', []):
+        if alias not in databases:
+            databases.append(alias)
+    return databases
+
+
+def prices_by_shard(prices):
+    """Agrupa instancias de Price por el shard de su marca."""
+    groups = defaultdict(list)
+    for price in prices:
+        groups[shard_for_brand(price.brand_id)].append(price)
+    return groups
+
+
+def keys_by_shard(keys):
+    """Agrupa claves (product_id, brand_id) por el shard de su marca."""
+    groups = defaultdict(list)
+    for key in keys:
+        groups[shard_for_brand(key[1])].append(key)
+    return groups
+
+
+def ordered_rows(queryset, chunk_size=2000):
+    """
+    Recorre las filas de `queryset` en todos los shards en orden de
+    (product_id, brand_id), mezclando en streaming un iterador ordenado por shard.
+    """
+    queryset = queryset.order_by('product_id', 'brand_id')
+    iterators = [queryset.using(alias).iterator(chunk_size=chunk_size) for alias in price_databases()]
+    if len(iterators) == 1:
+        return iterators[0]
+    return heapq.merge(*iterators, key=attrgetter('product_id', 'brand_id'))
+
+
+class BrandShardRouter:
+    """
+    Router que reparte Price y PriceSegment entre bases de datos por brand_id
+    según PRICES_SHARD_MAP, y lleva el archivo de precios vencidos a
+    PRICES_ARCHIVE_DATABASE.
+
+    Las escrituras y lecturas de una instancia concreta se enrutan con la pista
+    `instance`; las consultas por marca (PriceView, lotes, snapshots...) eligen
+    el shard explícitamente con `shard_for_brand`. El resto de aplicaciones
+    vive solo en la base de datos por defecto.
+    """
+
+    def db_for_read(self, model, **hints):
+        return self._instance_shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._instance_shard(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_sharded(obj1) and is_sharded(obj2):
+            return obj1._state.db == obj2._state.db
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if app_label == 'prices':
+            if model_name in ARCHIVE_MODELS:
+                return db == archive_database()
+            # El registro de cambios y su contador no se reparten: solo en 'default'
+            if model_name is not None and model_name not in SHARDED_MODELS:
+                return db == 'default'
+            return db in all_price_databases()
+        if db != 'default' and (db in all_price_databases() or db == archive_database()):
+            return False
+        return None
+
+    @staticmethod
+    def _instance_shard(model, hints):
+        instance = hints.get('instance')
+        if model._meta.app_label == 'prices' and model._meta.model_name in ARCHIVE_MODELS:
+            return archive_database()
+        if model._meta.app_label == 'prices' and model._meta.model_name in SHARDED_MODELS:
+            brand_id = getattr(instance, 'brand_id', None)
+            if brand_id is not None:
+                return shard_for_brand(brand_id)
+        return None
+
+
+def is_sharded(obj):
+    return obj._meta.app_label == 'prices' and obj._meta.model_name in SHARDED_MODELS
@@ -0,0 +1,78 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import materialize
+from .bloom import price_key_bloom
+from .cache import price_cache
+from .changes import delete_change, record_changes, upsert_change
+from .columnar import price_store
+from .index import price_index
+from .fx import bump_version, fx_rates
+from .lookup import lookup_backend
+from .models import FxRate, Price
+from .sharding import keys_by_shard
+
+# Se envía tras escrituras masivas (bulk_create, upserts, borrados en bloque) que
+# no disparan post_save/post_delete. Argumentos: `keys`, conjunto de
+# (product_id, brand_id) afectados. Quien escribe en bloque registra además
+# sus cambios con `changes.record_changes`.
+prices_bulk_changed = Signal()
+
+
+def keys_changed(keys):
+    """Sincroniza las estructuras derivadas de Price para las claves modificadas."""
+    price_index.refresh_keys(keys)
+    price_store.invalidate(keys)
+    # PriceSegment solo se lee con el backend 'timeline': con los demás no se
+    # mantiene en cada escritura y se reconstruye con rebuild_price_timeline
+    # al cambiar a ese backend
+    if lookup_backend() == 'timeline':
+        materialize.rebuild_keys_segments(keys)
+    price_cache.invalidate(keys)
+    price_key_bloom.add(keys)
+
+
+def keys_changed_on_commit(keys):
+    """
+    Sincroniza las claves cuando se confirme la escritura en el shard de cada
+    una (en el momento si no hay transacción abierta): un lector concurrente no
+    puede volver a cachear la fila anterior al commit y, si la transacción se
+    deshace, las estructuras derivadas no ven filas que nunca existieron.
+    """
+    for alias, shard_keys in keys_by_shard(keys).items():
+        transaction.on_commit(partial(keys_changed, set(shard_keys)), using=alias)
+
+
+@receiver(post_save, sender=Price)
+def sync_on_save(sender, instance, **kwargs):
+    # Si la fila cambió de clave única, la anterior deja de existir
+    changes = [upsert_change(instance)]
+    if instance.saved_unique_key() != instance.unique_key():
+        changes.insert(0, delete_change(instance.saved_unique_key()))
+    record_changes(changes)
+
+    # Incluye la clave anterior si la fila cambió de producto o marca
+    keys_changed_on_commit(instance.affected_keys())
+
+
+@receiver(post_delete, sender=Price)
+def sync_on_delete(sender, instance, **kwargs):
+    record_changes([delete_change(instance.saved_unique_key())])
+    keys_changed_on_commit(instance.affected_keys())
+
+
+@receiver(prices_bulk_changed)
+def sync_after_bulk_change(sender, keys, **kwargs):
+    # Las escrituras masivas no envían señales por fila: se refrescan sus claves
+    keys_changed_on_commit(keys)
+
+
+@receiver(post_save, sender=FxRate)
+@receiver(post_delete, sender=FxRate)
+def sync_fx_rates(sender, **kwargs):
+    # Los demás procesos recargan los tipos al ver la nueva versión
+    bump_version()
+    fx_rates.clear()
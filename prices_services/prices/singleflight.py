@@ -0,0 +1,111 @@
+import asyncio
+import threading
+
+
+class _Call:
+    """Resolución en curso de una clave: quienes llegan mientras tanto esperan su resultado."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Agrupa las llamadas concurrentes con la misma clave desde varios hilos
+    (workers WSGI con hilos): la primera ejecuta la función y las que llegan
+    mientras está en curso esperan y reciben su resultado o su excepción, sin
+    repetir el trabajo. Terminada la llamada, la siguiente vuelve a ejecutarla:
+    no es una caché.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, function, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args)
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {'executed': self.executed, 'coalesced': self.coalesced}
+
+    def reset_stats(self):
+        with self._lock:
+            self.executed = 0
+            self.coalesced = 0
+
+
+class AsyncSingleFlight:
+    """
+    Versión de SingleFlight para el bucle de eventos (ASGI). La corrutina de la
+    primera llamada se ejecuta en su propia tarea, así que si se cancela una
+    de las peticiones que la esperan (el cliente se desconecta) el resto
+    siguen recibiendo el resultado.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key, function, *args):
+        # Las tareas pertenecen a un bucle: la clave incluye el bucle en curso
+        loop = asyncio.get_running_loop()
+        flight = (loop, key)
+        task = self._tasks.get(flight)
+        if task is None:
+            task = self._tasks[flight] = loop.create_task(function(*args))
+            task.add_done_callback(lambda done: self._finished(flight, done))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finished(self, flight, task):
+        if self._tasks.get(flight) is task:
+            del self._tasks[flight]
+        # Si todas las peticiones se cancelaron nadie recoge la excepción
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        return {'executed': self.executed, 'coalesced': self.coalesced}
+
+    def reset_stats(self):
+        self.executed = 0
+        self.coalesced = 0
+
+
+# Instancias compartidas por el proceso para las consultas de PriceView y AsyncPriceView
+price_flights = SingleFlight()
+async_price_flights = AsyncSingleFlight()
@@ -0,0 +1,63 @@
+import json
+from itertools import groupby
+from operator import attrgetter
+
+from .currencies import currency_exponent, from_minor
+from .encoding import encode_converted_payload, encode_price, price_payload
+from .fx import UnknownCurrency
+from .lookup import WINNER_ORDERING
+from .models import Price
+from .sharding import shard_for_brand
+from .utils import chunked
+
+
+def snapshot_prices(brand_id, application_date, chunk_size=2000, queryset=None):
+    """
+    Precio ganador de cada producto de la marca en `application_date`, en orden
+    de product_id. Por defecto se leen de Price, en el shard de la marca.
+
+    Es un único recorrido ordenado por (product_id, WINNER_ORDERING) sobre
+    price_lookup_idx, leído con `iterator()`: la primera fila de cada
+    producto es la ganadora y el resto se descarta sin guardarse, de modo que la
+    memoria no depende del número de productos de la marca.
+    """
+    if queryset is None:
+        queryset = Price.objects.using(shard_for_brand(brand_id))
+    rows = queryset.filter(
+        brand_id=brand_id,
+        start_date__lte=application_date,
+        end_date__gte=application_date,
+    ).order_by('product_id', *WINNER_ORDERING).iterator(chunk_size=chunk_size)
+
+    for _, candidates in groupby(rows, key=attrgetter('product_id')):
+        yield next(candidates)
+
+
+def snapshot_lines(brand_id, application_date, chunk_size=2000, target_currency=None, fx_table=None, prices=None):
+    """
+    Snapshot en NDJSON: una línea por producto con el mismo formato que PriceView.
+    Con `target_currency`, los precios de cada bloque de `chunk_size` filas se
+    convierten juntos con `fx_table` y los que no tienen tipo de cambio salen
+    como una línea de error. `prices` sustituye a los de `snapshot_prices`
+    (por ejemplo, los de `PriceArchive.snapshot` para fechas archivadas).
+    """
+    if prices is None:
+        prices = snapshot_prices(brand_id, application_date, chunk_size=chunk_size)
+    if target_currency is None:
+        for price in prices:
+            yield encode_price(price) + b'\n'
+        return
+
+    exponent = currency_exponent(target_currency)
+    for chunk in chunked(prices, chunk_size):
+        amounts = fx_table.convert_many(
+            [price.price_minor for price in chunk], [price.price_exponent for price in chunk],
+            [price.curr for price in chunk], target_currency,
+        )
+        for price, amount in zip(chunk, amounts):
+            if amount is None:
+                error = {"product_id": price.product_id, "brand_id": price.brand_id, "error": str(UnknownCurrency(price.curr))}
+                yield json.dumps(error, separators=(',', ':')).encode() + b'\n'
+            else:
+                payload = {**price_payload(price), "price": from_minor(amount, exponent), "curr": target_currency}
+                yield encode_converted_payload(payload) + b'\n'
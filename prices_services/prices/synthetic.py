@@ -0,0 +1,100 @@
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.db import transaction
+
+from .changes import record_changes, upsert_change
+from .materialize import rebuild_all_segments
+from .models import Price
+from .sharding import prices_by_shard
+from .utils import chunked
+
+# Fecha de inicio por defecto de los datos sintéticos (fija para que sean reproducibles)
+DEFAULT_START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def generate_prices(keys, seed=0, start=DEFAULT_START, days=365):
+    """
+    Genera de forma determinista (misma semilla, mismos datos) precios sin
+    guardar para `keys` claves (product_id, brand_id), con patrones realistas
+    de solapamiento y prioridad por clave:
+
+    - una tarifa base de prioridad baja que cubre todo el periodo,
+    - algunas tarifas de temporada de prioridad baja que se solapan con ella,
+    - varias promociones de prioridad alta, de horas a semanas de duración,
+      que pueden solaparse entre sí.
+
+    Las claves recorren 4 marcas por producto: (1, 1), (1, 2), ..., (2, 1)...
+    """
+    rng = random.Random(seed)
+    end = start + timedelta(days=days)
+    seconds = int((end - start).total_seconds())
+
+    for number in range(keys):
+        product_id, brand_id = number // 4 + 1, number % 4 + 1
+        base_price = Decimal(rng.randint(500, 50000)) / 100
+        price_list = 1
+
+        def row(row_start, row_end, price, priority):
+            return Price(
+                product_id=product_id,
+                brand_id=brand_id,
+                price_list=price_list,
+                start_date=row_start,
+                end_date=row_end,
+                price=price,
+                curr='EUR',
+                priority=priority,
+            )
+
+        # Tarifa base
+        yield row(start, end - timedelta(seconds=1), base_price, 0)
+
+        # Tarifas de temporada (prioridad baja, empiezan más tarde que la base)
+        for _ in range(rng.choice((0, 0, 1, 2))):
+            price_list += 1
+            season_start = start + timedelta(seconds=rng.randrange(seconds // 2))
+            season_end = season_start + timedelta(days=rng.randint(30, 120))
+            yield row(season_start, min(season_end, end), (base_price * Decimal('1.10')).quantize(Decimal('0.01')), 0)
+
+        # Promociones (prioridad alta)
+        for _ in range(rng.randint(0, 6)):
+            price_list += 1
+            promotion_start = start + timedelta(seconds=rng.randrange(seconds))
+            promotion_end = promotion_start + timedelta(hours=rng.choice((2, 6, 24, 72, 168, 336)))
+            discount = Decimal(rng.randint(5, 50)) / 100
+            price = (base_price * (1 - discount)).quantize(Decimal('0.01'))
+            yield row(promotion_start, min(promotion_end, end), price, 1)
+
+
+def generate_queries(keys, count, seed=0, start=DEFAULT_START, days=365, miss_ratio=0.05):
+    """
+    Genera consultas (product_id, brand_id, application_date) deterministas
+    sobre las claves de `generate_prices`; una fracción `miss_ratio` apunta a
+    claves inexistentes.
+    """
+    rng = random.Random(seed + 1)
+    seconds = days * 86400
+    queries = []
+    for _ in range(count):
+        number = rng.randrange(keys) if rng.random() >= miss_ratio else keys + rng.randrange(keys)
+        application_date = start + timedelta(seconds=rng.randrange(seconds))
+        queries.append((number // 4 + 1, number % 4 + 1, application_date))
+    return queries
+
+
+def create_synthetic_prices(keys, seed=0, batch_size=5000, **options):
+    """
+    Guarda los precios de `generate_prices` con inserciones en bloque y
+    reconstruye después la tabla PriceSegment. Devuelve el número de filas.
+    """
+    total = 0
+    for batch in chunked(generate_prices(keys, seed=seed, **options), batch_size):
+        for alias, shard_prices in prices_by_shard(batch).items():
+            with transaction.atomic(using=alias):
+                Price.objects.using(alias).bulk_create(shard_prices)
+                record_changes(upsert_change(price) for price in shard_prices)
+        total += len(batch)
+    rebuild_all_segments()
+    return total
@@ -0,0 +1,169 @@
+import pytest
+import pytz
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta
+from django.conf import settings
+from prices.archive import price_archive
+from prices.bloom import price_key_bloom
+from prices.cache import price_cache
+from prices.columnar import price_store
+from prices.fx import fx_rates
+from prices.index import price_index
+from prices.materialize import rebuild_all_segments
+from prices.mmap_snapshot import price_snapshot
+from prices.models import Price
+from prices.singleflight import async_price_flights, price_flights
+
+
+@pytest.fixture(autouse=True)
+def reset_price_state():
+    # El índice y la caché son globales al proceso: se vacían para que no
+    # arrastren datos entre pruebas (el rollback de cada prueba no envía señales)
+    price_index.clear()
+    price_store.clear()
+    fx_rates.clear()
+    price_cache.backend.clear()
+    price_cache.reset_stats()
+    price_flights.reset_stats()
+    async_price_flights.reset_stats()
+    price_key_bloom.clear()
+    price_key_bloom.reset_stats()
+    price_archive.clear()
+    price_archive.reset_stats()
+    yield
+    price_index.clear()
+    price_store.clear()
+    price_snapshot.clear()
+    price_key_bloom.clear()
+    price_archive.clear()
+    fx_rates.clear()
+    price_cache.backend.clear()
+
+
+@pytest.fixture
+def committed(django_capture_on_commit_callbacks):
+    """
+    Bloque cuyas escrituras se dan por confirmadas: al salir se ejecutan sus
+    callbacks de on_commit (sincronización de las estructuras derivadas) en
+    todas las bases de datos. Cada prueba corre dentro de una transacción que
+    nunca se confirma, así que sin él esos callbacks no se ejecutan.
+    """
+    @contextmanager
+    def block():
+        with ExitStack() as stack:
+            for alias in settings.DATABASES:
+                stack.enter_context(django_capture_on_commit_callbacks(using=alias, execute=True))
+            yield
+    return block
+
+
+@pytest.fixture
+def timeline_backend(settings):
+    """Backend 'timeline', con el que las escrituras mantienen PriceSegment (se pide antes que los precios)."""
+    settings.PRICES_LOOKUP_BACKEND = 'timeline'
+    return settings
+
+
+@pytest.fixture
+def use_backend(settings):
+    """Cambia de backend de consulta; al pasar a 'timeline' reconstruye PriceSegment, como rebuild_price_timeline."""
+    def use(backend):
+        settings.PRICES_LOOKUP_BACKEND = backend
+        if backend == 'timeline':
+            rebuild_all_segments()
+    return use
+
+
+@pytest.fixture
+def create_new_prices(db, committed):
+    # Los precios de partida se dan por confirmados (estructuras derivadas como PriceSegment)
+    with committed():
+        # Grupo 1: product_id 35455, brand_id 2
+        Price.objects.create(
+            product_id=35455,
+            brand_id=2,
+            price_list=1,
+            start_date="2020-06-14T00:00:00Z",
+            end_date="2020-12-31T23:59:59Z",
+            price=36.50,
+            priority=0
+        )
+        Price.objects.create(
+            product_id=35455,
+            brand_id=2,
+            price_list=2,
+            start_date="2020-06-14T15:00:00Z",
+            end_date="2020-06-14T18:30:00Z",
+            price=26.45,
+            priority=1
+        )
+        Price.objects.create(
+            product_id=35455,
+            brand_id=2,
+            price_list=3,
+            start_date="2020-06-15T00:00:00Z",
+            end_date="2020-06-15T11:00:00Z",
+            price=31.50,
+            priority=1
+        )
+        Price.objects.create(
+            product_id=35455,
+            brand_id=2,
+            price_list=4,
+            start_date="2020-06-15T16:00:00Z",
+            end_date="2020-12-31T23:59:59Z",
+            price=39.95,
+            priority=1
+        )
+
+        # Grupo 2: product_id 35455, brand_id 3
+        Price.objects.create(
+            product_id=35455,
+            brand_id=3,
+            price_list=1,
+            start_date="2020-06-14T00:00:00Z",
+            end_date="2020-12-31T23:59:59Z",
+            price=37.50,
+            priority=0
+        )
+        Price.objects.create(
+            product_id=35455,
+            brand_id=3,
+            price_list=2,
+            start_date="2020-06-14T15:00:00Z",
+            end_date="2020-06-14T18:30:00Z",
+            price=27.45,
+            priority=1
+        )
+        Price.objects.create(
+            product_id=35455,
+            brand_id=3,
+            price_list=3,
+            start_date="2020-06-15T00:00:00Z",
+            end_date="2020-06-15T11:00:00Z",
+            price=32.50,
+            priority=1
+        )
+        Price.objects.create(
+            product_id=35455,
+            brand_id=3,
+            price_list=4,
+            start_date="2020-06-15T16:00:00Z",
+            end_date="2020-12-31T23:59:59Z",
+            price=40.95,
+            priority=1
+        )
+
+
+@pytest.fixture
+def application_dates(create_new_prices):
+    """Fechas cada 30 minutos entre el 13 y el 17 de junio, más todas las fronteras de los fixtures."""
+    dates = []
+    current = datetime(2020, 6, 13, 0, 0, 0, tzinfo=pytz.UTC)
+    while current < datetime(2020, 6, 17, 0, 0, 0, tzinfo=pytz.UTC):
+        dates.append(current)
+        current += timedelta(minutes=30)
+    for price in Price.objects.all():
+        for boundary in (price.start_date, price.end_date):
+            dates.extend([boundary - timedelta(microseconds=1), boundary, boundary + timedelta(microseconds=1)])
+    return dates
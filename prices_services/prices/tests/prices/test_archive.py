@@ -0,0 +1,152 @@
+import io
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from datetime import datetime, timezone
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.test import APIClient
+from prices.archive import price_archive
+from prices.changes import changes_since, current_revision
+from prices.metrics import registry
+from prices.models import ArchivedPrice, Price, PriceSegment
+
+# Los precios del fixture que terminan antes son las listas 2 y 3 de cada marca
+HORIZON = '2020-06-15T12:00:00Z'
+
+
+@pytest.mark.django_db
+class TestPriceArchive:
+
+    @pytest.fixture(autouse=True)
+    def client(self):
+        self.client = APIClient()
+
+    def get_price(self, application_date, brand_id=2):
+        return self.client.get(reverse('price-view'), {
+            'product_id': 35455, 'brand_id': brand_id, 'application_date': application_date,
+        })
+
+    # Test 1: el comando mueve por lotes solo las filas vencidas, registra los borrados y es repetible
+    def test_archive_command(self, create_new_prices, settings):
+        out = io.StringIO()
+        call_command('archive_prices', '--before', HORIZON, '--dry-run', stdout=out)
+        assert "4 rows end before" in out.getvalue()
+        assert Price.objects.count() == 8
+
+        # Sin consultas al archivo no se archiva nada
+        with pytest.raises(CommandError, match="PRICES_ARCHIVE_LOOKUPS is disabled"):
+            call_command('archive_prices', '--before', HORIZON, stdout=out)
+        assert Price.objects.count() == 8
+        settings.PRICES_ARCHIVE_LOOKUPS = True
+
+        revision = current_revision()
+        call_command('archive_prices', '--before', HORIZON, '--batch-size', '3', stdout=out)
+        assert "Archived 4 rows" in out.getvalue()
+
+        assert sorted(Price.objects.values_list('brand_id', 'price_list')) == [(2, 1), (2, 4), (3, 1), (3, 4)]
+        assert sorted(ArchivedPrice.objects.values_list('brand_id', 'price_list')) == [(2, 2), (2, 3), (3, 2), (3, 3)]
+        archived = ArchivedPrice.objects.get(brand_id=2, price_list=2)
+        assert (str(archived.price), archived.curr, archived.priority) == ('26.45', 'USD', 1)
+        assert not PriceSegment.objects.filter(price_list__in=[2, 3]).exists()
+        assert [(change.op, change.price_list) for change in changes_since(revision)] == [
+            ('delete', 2), ('delete', 3), ('delete', 2), ('delete', 3),
+        ]
+
+        # Un lote que se repite (p. ej. tras un fallo antes del borrado) no duplica el archivo
+        call_command('archive_prices', '--before', HORIZON, stdout=out)
+        assert ArchivedPrice.objects.count() == 4
+
+    # Test 2: con el archivo activado, las fechas anteriores al horizonte responden como antes de archivar
+    def test_historical_lookups(self, create_new_prices, settings):
+        dates = ['2020-06-14T10:00:00Z', '2020-06-14T16:00:00Z', '2020-06-15T10:00:00Z',
+                 '2020-06-15T13:00:00Z', '2020-06-16T21:00:00Z']
+        before = [self.get_price(date, brand) for date in dates for brand in (2, 3)]
+        before = [(response.status_code, response.content) for response in before]
+
+        settings.PRICES_ARCHIVE_LOOKUPS = True
+        call_command('archive_prices', '--before', HORIZON, stdout=io.StringIO())
+        after = [self.get_price(date, brand) for date in dates for brand in (2, 3)]
+        after = [(response.status_code, response.content) for response in after]
+        assert after == before
+        assert json.loads(after[2][1])['price_list'] == 2
+        assert price_archive.stats()['hits'] > 0
+        assert 'prices_archive_hits_total' in registry.render()
+
+        # Sin el archivo, las fechas históricas solo ven la tabla caliente
+        settings.PRICES_ARCHIVE_LOOKUPS = False
+        assert json.loads(self.get_price('2020-06-14T16:00:00Z').content)['price_list'] == 1
+
+    # Test 3: el ganador se elige entre las dos tablas con las reglas de prioridad
+    def test_winner_across_tables(self, create_new_prices, settings):
+        settings.PRICES_ARCHIVE_LOOKUPS = True
+        call_command('archive_prices', '--before', HORIZON, stdout=io.StringIO())
+        # Fila caliente de prioridad alta que empieza más tarde que la lista 2 archivada
+        Price.objects.create(
+            product_id=35455, brand_id=2, price_list=9, price='1.00', curr='USD', priority=1,
+            start_date=datetime(2020, 6, 14, 16, 0, tzinfo=timezone.utc),
+            end_date=datetime(2020, 6, 30, tzinfo=timezone.utc),
+        )
+        assert json.loads(self.get_price('2020-06-14T15:30:00Z').content)['price_list'] == 2
+        assert json.loads(self.get_price('2020-06-14T17:00:00Z').content)['price_list'] == 9
+
+    # Test 4: vista asíncrona, claves que solo tienen precios archivados e historial
+    def test_async_view_and_history(self, create_new_prices, settings):
+        settings.PRICES_ARCHIVE_LOOKUPS = True
+        settings.PRICES_KEY_BLOOM = True
+        Price.objects.create(
+            product_id=77, brand_id=2, price_list=1, price='3.00', curr='USD', priority=0,
+            start_date=datetime(2020, 1, 1, tzinfo=timezone.utc), end_date=datetime(2020, 2, 1, tzinfo=timezone.utc),
+        )
+        history = self.client.get(reverse('price-history-view'), {
+            'product_id': 35455, 'brand_id': 2, 'from': '2020-06-14T00:00:00Z', 'to': '2020-06-16T00:00:00Z',
+        }).json()
+
+        call_command('archive_prices', '--before', HORIZON, stdout=io.StringIO())
+        query = {'product_id': 77, 'brand_id': 2, 'application_date': '2020-01-15T00:00:00Z'}
+        response = async_to_sync(AsyncClient().get)(reverse('price-async-view'), query)
+        assert (response.status_code, response.json()['price']) == (200, 3.0)
+        assert self.client.get(reverse('price-view'), query).status_code == 200
+
+        assert self.client.get(reverse('price-history-view'), {
+            'product_id': 35455, 'brand_id': 2, 'from': '2020-06-14T00:00:00Z', 'to': '2020-06-16T00:00:00Z',
+        }).json() == history
+
+    # Test 5: los lotes y los snapshots de fechas anteriores al horizonte leen también el archivo
+    def test_batch_and_snapshot(self, create_new_prices, settings):
+        settings.PRICES_ARCHIVE_LOOKUPS = True
+        queries = [
+            {'product_id': 35455, 'brand_id': brand_id, 'application_date': date}
+            for date in ('2020-06-14T16:00:00Z', '2020-06-15T10:00:00Z', '2020-06-16T21:00:00Z')
+            for brand_id in (2, 3)
+        ]
+
+        def snapshot(date):
+            response = self.client.get(reverse('price-snapshot-view'), {'brand_id': 2, 'application_date': date})
+            return [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+        batch = self.client.post(reverse('price-batch-view'), queries, format='json').json()
+        snapshots = [snapshot(date) for date in ('2020-06-14T16:00:00Z', '2020-06-16T21:00:00Z')]
+
+        call_command('archive_prices', '--before', HORIZON, stdout=io.StringIO())
+        assert self.client.post(reverse('price-batch-view'), queries, format='json').json() == batch
+        assert [item['price_list'] for item in batch] == [2, 2, 3, 3, 4, 4]
+        assert [snapshot(date) for date in ('2020-06-14T16:00:00Z', '2020-06-16T21:00:00Z')] == snapshots
+        assert snapshots[0][0]['price_list'] == 2
+
+    # Test 6: benchmark del tamaño de la tabla caliente
+    def test_archive_benchmark(self, tmp_path, create_new_prices):
+        output = tmp_path / 'bench.json'
+        call_command('bench_price_archive', '--keys', '20', '--history-years', '0,2', '--queries', '30',
+                     '--output', str(output), stdout=io.StringIO(), stderr=io.StringIO())
+
+        results = json.loads(output.read_text())['results']
+        assert {(result['history_years'], result['stage'], result['path']) for result in results} == {
+            (years, stage, path) for years in (0, 2) for stage in ('hot', 'archived') for path in ('lookup-orm', 'view-orm')
+        } | {(2, 'historical', 'view-orm')}
+        archived = [result for result in results if result['history_years'] == 2 and result['stage'] == 'archived']
+        assert all(result['hot_rows'] + result['archived_rows'] == result['rows'] for result in archived)
+        assert Price.objects.count() == 8
+        assert not ArchivedPrice.objects.exists()
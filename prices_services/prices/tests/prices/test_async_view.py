@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+
+
+QUERIES = [
+    {'product_id': 35455, 'brand_id': brand_id, 'application_date': application_date}
+    for brand_id in (2, 3, 4)
+    for application_date in (
+        '2020-06-14T10:00:00Z', '2020-06-14T16:00:00Z', '2020-06-14T21:00:00Z',
+        '2020-06-15T10:00:00Z', '2020-06-16T21:00:00Z', '2019-01-01T00:00:00Z',
+    )
+]
+
+
+async def fetch_concurrently(url, queries):
+    """Lanza todas las peticiones a la vez contra la aplicación ASGI."""
+    client = AsyncClient()
+    responses = await asyncio.gather(*(client.get(url, query) for query in queries))
+    return [(response.status_code, response.content) for response in responses]
+
+
+@pytest.mark.django_db
+class TestAsyncPriceView:
+
+    # Test 1: bajo ASGI y con peticiones concurrentes, la vista asíncrona responde igual que la síncrona
+    @pytest.mark.parametrize('backend', ['orm', 'index', 'timeline'])
+    def test_concurrent_requests_match_sync_view(self, create_new_prices, use_backend, backend):
+        use_backend(backend)
+
+        sync_results = async_to_sync(fetch_concurrently)(reverse('price-view'), QUERIES)
+        async_results = async_to_sync(fetch_concurrently)(reverse('price-async-view'), QUERIES)
+
+        assert async_results == sync_results
+        assert {status for status, _ in async_results} == {200, 404}
+
+    # Test 2: errores de parámetros
+    def test_invalid_parameters(self):
+        client = AsyncClient()
+        response = async_to_sync(client.get)(reverse('price-async-view'), {'product_id': 1})
+        assert response.status_code == 400
+        assert response.json() == {"error": "Missing parameters"}
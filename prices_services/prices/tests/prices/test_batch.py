@@ -0,0 +1,76 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from prices.lookup import BATCH_KEYS_PER_QUERY
+
+
+QUERIES = [
+    {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-14T10:00:00Z'},
+    {'product_id': 35455, 'brand_id': 3, 'application_date': '2020-06-14T16:00:00Z'},
+    {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-14T21:00:00Z'},
+    {'product_id': 35455, 'brand_id': 3, 'application_date': '2020-06-15T10:00:00Z'},
+    {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-16T21:00:00Z'},
+]
+
+
+@pytest.mark.django_db
+class TestPriceBatchAPI:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    # Test 1: cada elemento coincide con la respuesta individual de PriceView
+    def test_batch_matches_price_view(self, create_new_prices, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            response = self.client.post(reverse('price-batch-view'), QUERIES, format='json')
+        assert response.status_code == 200
+
+        for query, item in zip(QUERIES, response.json()):
+            single = self.client.get(reverse('price-view'), query)
+            assert item == single.json()
+
+    # Test 2: las consultas sin precio devuelven un error por elemento
+    def test_batch_not_found_item(self, create_new_prices):
+        queries = QUERIES[:1] + [
+            {'product_id': 35455, 'brand_id': 2, 'application_date': '2019-01-01T00:00:00Z'},
+            {'product_id': 1, 'brand_id': 2, 'application_date': '2020-06-14T10:00:00Z'},
+        ]
+        response = self.client.post(reverse('price-batch-view'), queries, format='json')
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data[0]['price_list'] == 1
+        assert data[1] == {
+            "product_id": 35455,
+            "brand_id": 2,
+            "application_date": "2019-01-01T00:00:00Z",
+            "error": "No price found"
+        }
+        assert data[2]['error'] == "No price found"
+
+    # Test 3: el número de consultas depende de las claves distintas, no de los elementos
+    def test_batch_query_count_is_bounded(self, create_new_prices, django_assert_num_queries):
+        queries = [
+            {'product_id': product_id, 'brand_id': 2, 'application_date': '2020-06-14T10:00:00Z'}
+            for product_id in range(BATCH_KEYS_PER_QUERY * 2 + 1)
+        ]
+        with django_assert_num_queries(3):
+            response = self.client.post(reverse('price-batch-view'), queries, format='json')
+        assert response.status_code == 200
+        assert len(response.json()) == len(queries)
+
+    # Test 4: peticiones mal formadas
+    def test_batch_invalid_payload(self, settings):
+        response = self.client.post(reverse('price-batch-view'), {'product_id': 1}, format='json')
+        assert response.status_code == 400
+
+        response = self.client.post(
+            reverse('price-batch-view'),
+            [{'product_id': 1, 'brand_id': 2, 'application_date': 'not-a-date'}],
+            format='json'
+        )
+        assert response.status_code == 400
+
+        settings.PRICES_BATCH_MAX_ITEMS = 2
+        response = self.client.post(reverse('price-batch-view'), QUERIES, format='json')
+        assert response.status_code == 400
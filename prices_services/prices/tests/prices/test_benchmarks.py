@@ -0,0 +1,52 @@
+import io
+import json
+import pytest
+from django.core.management import call_command
+from prices.benchmarks import PATHS
+from prices.models import Price
+from prices.synthetic import generate_prices, generate_queries
+
+
+class TestSyntheticData:
+
+    # Test 1: misma semilla, mismos datos
+    def test_generator_is_deterministic(self):
+        first = [(p.product_id, p.brand_id, p.price_list, p.start_date, p.end_date, p.price, p.priority)
+                 for p in generate_prices(50, seed=7)]
+        second = [(p.product_id, p.brand_id, p.price_list, p.start_date, p.end_date, p.price, p.priority)
+                  for p in generate_prices(50, seed=7)]
+        assert first == second
+        assert generate_queries(50, 100, seed=7) == generate_queries(50, 100, seed=7)
+
+    # Test 2: los datos cumplen las reglas del modelo y mezclan prioridades solapadas
+    def test_generated_rows_are_valid(self):
+        prices = list(generate_prices(200, seed=1))
+        for price in prices:
+            price.clean_fields()
+            price.clean()
+        assert {price.priority for price in prices} == {0, 1}
+        assert len({(p.product_id, p.brand_id, p.price_list) for p in prices}) == len(prices)
+
+
+@pytest.mark.django_db
+class TestBenchmarkSuite:
+
+    # Test 3: la batería genera un JSON por tamaño y camino y no deja datos en la base de datos
+    def test_bench_prices_command(self, tmp_path, create_new_prices):
+        output = tmp_path / 'bench.json'
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('bench_prices', '--sizes', '20,40', '--queries', '30', '--output', str(output),
+                     stdout=out, stderr=err)
+
+        assert f"Results written to {output}" in out.getvalue()
+        assert len(err.getvalue().splitlines()) == 2 * len(PATHS)
+
+        report = json.loads(output.read_text())
+        assert {(result['keys'], result['path']) for result in report['results']} == {
+            (size, path) for size in (20, 40) for path in PATHS
+        }
+        for result in report['results']:
+            assert 0 < result['p50_us'] <= result['p99_us']
+            assert result['queries_per_s'] > 0
+        assert Price.objects.count() == 8
@@ -0,0 +1,118 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from prices.models import Price
+
+
+def price_record(product_id, brand_id=1, price_list=1, price='10.00', **extra):
+    record = {
+        'product_id': product_id,
+        'brand_id': brand_id,
+        'price_list': price_list,
+        'start_date': '2020-06-14T00:00:00Z',
+        'end_date': '2020-12-31T23:59:59Z',
+        'price': price,
+        'priority': 0,
+        'curr': 'EUR',
+    }
+    record.update(extra)
+    return record
+
+
+@pytest.mark.django_db
+class TestPriceBulkAPI:
+
+    @pytest.fixture(autouse=True)
+    def staff_client(self, django_user_model):
+        self.client = APIClient()
+        self.client.force_authenticate(django_user_model.objects.create(username='staff', is_staff=True))
+
+    def post(self, records):
+        return self.client.post(reverse('price-bulk-view'), records, format='json')
+
+    # Test 1: inserta filas nuevas y actualiza las existentes por la clave única
+    def test_bulk_inserts_and_updates(self, create_new_prices):
+        records = [
+            price_record(35455, brand_id=2, price_list=1, price='40.00'),
+            price_record(1000, brand_id=2, price_list=1, price='5.50'),
+        ]
+        response = self.post(records)
+        assert response.status_code == 200
+        assert response.json() == {"written": 2}
+
+        assert Price.objects.count() == 9
+        updated = Price.objects.get(product_id=35455, brand_id=2, price_list=1)
+        assert str(updated.price) == '40.00'
+        assert updated.curr == 'EUR'
+
+        # Las estructuras derivadas se actualizan: PriceView ve el nuevo precio
+        response = self.client.get(
+            reverse('price-view'),
+            {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-14T10:00:00Z'}
+        )
+        assert response.json()['price'] == 40.0
+
+    # Test 2: el número de consultas no depende del número de filas (con lotes
+    # por debajo del límite de parámetros por sentencia de SQLite)
+    def test_bulk_queries_do_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as few:
+            assert self.post([price_record(product_id) for product_id in range(5)]).status_code == 200
+        with CaptureQueriesContext(connection) as many:
+            assert self.post([price_record(product_id) for product_id in range(100, 160)]).status_code == 200
+        assert len(many) == len(few)
+        assert Price.objects.count() == 65
+
+    # Test 3: se aplican las reglas de Price.clean y un error rechaza el lote completo
+    def test_bulk_invalid_item_rejects_batch(self):
+        records = [
+            price_record(1),
+            price_record(2, start_date='2021-01-01T00:00:00Z'),
+            price_record(3, price='-1.00'),
+        ]
+        response = self.post(records)
+        assert response.status_code == 400
+
+        errors = response.json()
+        assert errors[0] == {}
+        assert errors[1] == {'non_field_errors': ['La fecha de inicio debe ser anterior a la fecha de fin.']}
+        assert 'price' in errors[2]
+        assert Price.objects.count() == 0
+
+    # Test 4: dentro de un lote gana la última aparición de cada clave única
+    def test_bulk_duplicate_keys_last_wins(self):
+        response = self.post([price_record(1, price='1.00'), price_record(1, price='2.00')])
+        assert response.status_code == 200
+        assert response.json() == {"written": 1}
+        assert [str(price.price) for price in Price.objects.all()] == ['2.00']
+
+    # Test 5: el cuerpo debe ser una lista dentro del límite
+    def test_bulk_rejects_non_list_and_oversized(self, settings):
+        assert self.post(price_record(1)).status_code == 400
+        settings.PRICES_BULK_MAX_ITEMS = 2
+        response = self.post([price_record(product_id) for product_id in range(3)])
+        assert response.status_code == 400
+        assert response.json() == {"error": "Too many prices (max 2)"}
+
+    # Test 6: solo los usuarios del staff pueden escribir precios
+    def test_bulk_requires_staff(self, django_user_model):
+        self.client.force_authenticate(None)
+        assert self.post([price_record(1)]).status_code in (401, 403)
+
+        self.client.force_authenticate(django_user_model.objects.create(username='customer'))
+        assert self.post([price_record(1)]).status_code == 403
+        assert Price.objects.count() == 0
+
+    # Test 7: un importe que no cabe en price_minor se rechaza con un 400
+    def test_bulk_rejects_out_of_range_price(self):
+        for price in ('1e30', '9999999999999999999'):
+            response = self.post([price_record(1, price=price)])
+            assert response.status_code == 400, price
+            assert 'price' in response.json()[0]
+
+        # Cabe en max_digits pero no en unidades menores de una moneda con tres decimales
+        response = self.post([price_record(1, price='9999999999999999.99', curr='KWD')])
+        assert response.status_code == 400
+        assert response.json()[0] == {'non_field_errors': ['El precio es demasiado alto.']}
+        assert Price.objects.count() == 0
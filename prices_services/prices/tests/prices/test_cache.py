@@ -0,0 +1,145 @@
+import pytest
+from unittest import mock
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from datetime import timedelta
+from prices import views_api
+from prices.cache import price_cache
+from prices.models import Price
+
+
+@pytest.fixture
+def current_prices(db, settings):
+    """Precios vigentes ahora: uno base de un mes y una promoción que empieza en una hora."""
+    settings.PRICES_CACHE_ENABLED = True
+    now = timezone.now()
+    base = Price.objects.create(
+        product_id=1,
+        brand_id=1,
+        price_list=1,
+        start_date=now - timedelta(days=1),
+        end_date=now + timedelta(days=30),
+        price=10.00,
+        priority=0
+    )
+    promotion = Price.objects.create(
+        product_id=1,
+        brand_id=1,
+        price_list=2,
+        start_date=now + timedelta(hours=1),
+        end_date=now + timedelta(hours=2),
+        price=8.00,
+        priority=1
+    )
+    Price.objects.create(
+        product_id=2,
+        brand_id=1,
+        price_list=1,
+        start_date=now - timedelta(days=1),
+        end_date=now + timedelta(days=30),
+        price=20.00,
+        priority=0
+    )
+    return now, base, promotion
+
+
+@pytest.mark.django_db
+class TestPriceResponseCache:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    def get_price(self, product_id, application_date):
+        return self.client.get(
+            reverse('price-view'),
+            {'product_id': product_id, 'brand_id': 1, 'application_date': application_date.isoformat()}
+        )
+
+    # Test 1: la segunda consulta del mismo segmento se sirve de la caché sin consultas
+    def test_hit_after_miss(self, current_prices, django_assert_num_queries):
+        now, base, _ = current_prices
+
+        first = self.get_price(1, now)
+        with django_assert_num_queries(0):
+            second = self.get_price(1, now + timedelta(minutes=30))
+
+        assert first.status_code == second.status_code == 200
+        assert first.content == second.content
+        assert second.data['price_list'] == base.price_list
+        assert self.client.get(reverse('price-cache-stats')).data == {'hits': 1, 'misses': 1}
+
+    # Test 2: la entrada caduca cuando empieza el precio de mayor prioridad
+    def test_entry_expires_at_segment_end(self, current_prices):
+        now, _, promotion = current_prices
+
+        with mock.patch.object(price_cache.backend, 'set', wraps=price_cache.backend.set) as cache_set:
+            self.get_price(1, now)
+
+        _, entry = cache_set.call_args.args[1]
+        assert entry.end == promotion.start_date
+        assert 3500 < cache_set.call_args.kwargs['timeout'] <= 3600
+
+        # Una fecha dentro de la promoción no usa la entrada del segmento anterior
+        response = self.get_price(1, now + timedelta(minutes=90))
+        assert response.data['price_list'] == promotion.price_list
+
+    # Test 3: las escrituras invalidan solo la clave afectada
+    def test_signals_invalidate_affected_key(self, current_prices, committed):
+        now, base, _ = current_prices
+        self.get_price(1, now)
+        self.get_price(2, now)
+
+        base.price = 12.00
+        with committed():
+            base.save()
+
+        assert price_cache.backend.get(price_cache.cache_key(1, 1)) is None
+        assert price_cache.backend.get(price_cache.cache_key(2, 1)) is not None
+        assert float(self.get_price(1, now).data['price']) == 12.00
+
+        with committed():
+            base.delete()
+        assert self.get_price(1, now).status_code == 404
+
+    # Test 4: los segmentos que no están vigentes ahora no se guardan
+    def test_only_current_segments_are_cached(self, current_prices):
+        now, _, _ = current_prices
+        self.get_price(1, now + timedelta(minutes=90))
+        self.get_price(1, now - timedelta(days=2))
+
+        assert price_cache.backend.get(price_cache.cache_key(1, 1)) is None
+
+    # Test 5: una respuesta resuelta antes de que se confirme una escritura no se guarda
+    def test_stale_resolution_is_not_cached(self, current_prices, monkeypatch):
+        now, base, _ = current_prices
+        resolve_segment = views_api.resolve_segment
+
+        def resolve_then_write(*args):
+            # La escritura se confirma entre la lectura de la generación y el set
+            segment = resolve_segment(*args)
+            Price.objects.filter(pk=base.pk).update(price_minor=1500)
+            price_cache.invalidate([(1, 1)])
+            return segment
+
+        monkeypatch.setattr(views_api, 'resolve_segment', resolve_then_write)
+        assert float(self.get_price(1, now).data['price']) == 10.00
+        monkeypatch.undo()
+
+        assert float(self.get_price(1, now).data['price']) == 15.00
+
+    # Test 6: si la transacción de la escritura se deshace, la entrada no se invalida
+    def test_invalidation_waits_for_commit(self, current_prices, committed):
+        now, base, _ = current_prices
+        self.get_price(1, now)
+
+        with committed(), pytest.raises(RuntimeError), transaction.atomic():
+            base.price = 12.00
+            base.save()
+            # Dentro de la transacción, la caché aún no se ha tocado
+            assert price_cache.backend.get(price_cache.cache_key(1, 1)) is not None
+            raise RuntimeError("rollback")
+
+        assert price_cache.backend.get(price_cache.cache_key(1, 1)) is not None
+        assert float(self.get_price(1, now).data['price']) == 10.00
@@ -0,0 +1,123 @@
+import json
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from prices.changes import current_revision
+from prices.loading import write_prices
+from prices.models import Price, PriceChange
+
+
+def replica_from_feed(lines, replica=None):
+    """Aplica un feed NDJSON a una réplica {clave única: precio}."""
+    replica = {} if replica is None else replica
+    for change in lines:
+        key = (change['product_id'], change['brand_id'], change['price_list'])
+        if change['op'] == 'upsert':
+            replica[key] = change['price']
+        else:
+            replica.pop(key, None)
+    return replica
+
+
+def table_state():
+    return {price.unique_key(): float(price.price) for price in Price.objects.all()}
+
+
+@pytest.mark.django_db
+class TestPriceChangeFeed:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    def get_changes(self, since, **params):
+        response = self.client.get(reverse('price-changes-view'), {'since': since, **params})
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        return response, lines
+
+    # Test 1: cada alta, modificación y borrado por el ORM queda registrado en orden
+    def test_orm_writes_are_recorded(self, create_new_prices):
+        start = current_revision()
+        price = Price.objects.get(product_id=35455, brand_id=2, price_list=1)
+        price.price = 30
+        price.save()
+        price.price_list = 9
+        price.save()
+        Price.objects.get(product_id=35455, brand_id=3, price_list=4).delete()
+
+        changes = list(PriceChange.objects.filter(revision__gt=start).order_by('revision'))
+        assert [change.revision for change in changes] == list(range(start + 1, start + 5))
+        assert [(change.op, change.brand_id, change.price_list) for change in changes] == [
+            ('upsert', 2, 1),
+            ('delete', 2, 1),       # la clave única anterior deja de existir
+            ('upsert', 2, 9),
+            ('delete', 3, 4),
+        ]
+        assert changes[0].price == 30
+        assert current_revision() == start + 4
+
+    # Test 2: las escrituras en bloque registran un cambio por clave única, el último valor
+    def test_bulk_writes_are_recorded(self, create_new_prices):
+        start = current_revision()
+        prices = [
+            Price(product_id=1, brand_id=1, price_list=1, start_date='2020-01-01T00:00:00Z',
+                  end_date='2020-12-31T00:00:00Z', price=price)
+            for price in (1, 2)
+        ]
+        write_prices(prices)
+
+        changes = list(PriceChange.objects.filter(revision__gt=start))
+        assert [(change.op, change.price) for change in changes] == [('upsert', 2)]
+
+    # Test 3: el endpoint devuelve solo los cambios posteriores a la revisión pedida
+    def test_endpoint_returns_changes_since(self, create_new_prices):
+        start = current_revision()
+        Price.objects.filter(brand_id=3).first().delete()
+
+        response, lines = self.get_changes(start)
+        assert response['Content-Type'] == 'application/x-ndjson'
+        assert response['X-Price-Revision'] == str(start + 1)
+        assert lines == [{"revision": start + 1, "op": "delete", "product_id": 35455, "brand_id": 3, "price_list": 1}]
+
+        _, lines = self.get_changes(start - 1)
+        assert lines[0] == {
+            "revision": start,
+            "op": "upsert",
+            "product_id": 35455,
+            "brand_id": 3,
+            "price_list": 4,
+            "start_date": "2020-06-15T16:00:00Z",
+            "end_date": "2020-12-31T23:59:59Z",
+            "price": 40.95,
+            "curr": "USD",
+            "priority": 1,
+        }
+
+    # Test 4: aplicar el feed por páginas reproduce el estado de la tabla
+    def test_feed_pages_rebuild_table(self, create_new_prices):
+        price = Price.objects.get(product_id=35455, brand_id=2, price_list=2)
+        price.price = 1
+        price.save()
+        Price.objects.filter(brand_id=3, price_list__in=[1, 2]).delete()
+
+        replica, since = {}, 0
+        while True:
+            response, lines = self.get_changes(since, limit=3)
+            assert len(lines) <= 3
+            replica_from_feed(lines, replica)
+            if not lines or lines[-1]['revision'] == int(response['X-Price-Revision']):
+                break
+            since = lines[-1]['revision']
+        assert replica == table_state()
+
+    # Test 5: parámetros ausentes o inválidos
+    @pytest.mark.parametrize('params, error', [
+        ({}, "Missing parameters"),
+        ({'since': 'abc'}, "Invalid parameters"),
+        ({'since': -1}, "Invalid parameters"),
+        ({'since': 0, 'limit': 0}, "Invalid parameters"),
+    ])
+    def test_endpoint_invalid_params(self, params, error):
+        response = self.client.get(reverse('price-changes-view'), params)
+        assert response.status_code == 400
+        assert response.json() == {"error": error}
@@ -0,0 +1,115 @@
+import pytest
+import pytz
+from datetime import datetime
+from django.urls import reverse
+from rest_framework.test import APIClient
+from prices.changes import record_changes, upsert_change
+from prices.lookup import resolve_price_from_orm, resolve_prices
+from prices.models import Price
+from prices.synthetic import create_synthetic_prices, generate_queries
+
+np = pytest.importorskip('numpy')
+from prices.columnar import price_store  # noqa: E402
+
+KEYS = 60
+
+
+@pytest.fixture
+def synthetic_prices(db):
+    create_synthetic_prices(KEYS, seed=5)
+
+
+@pytest.mark.django_db
+class TestColumnarPriceStore:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    # Test 1: el almacén resuelve lo mismo que el ORM, incluidas claves y fechas sin precio
+    def test_matches_orm(self, synthetic_prices):
+        queries = generate_queries(KEYS, 500, seed=5, miss_ratio=0.1)
+        for query, segment in zip(queries, price_store.segments(queries)):
+            expected = resolve_price_from_orm(*query)
+            assert (segment and segment.row.pk) == (expected and expected.pk), query
+            if expected is not None:
+                assert segment.start <= query[2] < segment.end
+                assert segment.row.price == expected.price
+                assert segment.row.start_date == expected.start_date
+
+    # Test 2: la búsqueda vectorizada sobre arrays de NumPy
+    def test_lookup_arrays(self, synthetic_prices):
+        queries = generate_queries(KEYS, 200, seed=8)
+        product_ids, brand_ids, dates = (np.array(column) for column in zip(*queries))
+        timestamps = np.array([date.replace(tzinfo=None) for date in dates], dtype='datetime64[us]')
+
+        result = price_store.lookup_arrays(product_ids, brand_ids, timestamps)
+
+        for index, query in enumerate(queries):
+            expected = resolve_price_from_orm(*query)
+            assert bool(result.found[index]) == (expected is not None)
+            if expected is not None:
+                assert (result.price_minor[index], result.price_exponent[index]) == (expected.price_minor, expected.price_exponent)
+                assert result.price_list[index] == expected.price_list
+
+    # Test 3: el lote y PriceView usan el almacén sin consultas y con la misma respuesta
+    def test_backend(self, create_new_prices, settings, django_assert_num_queries, application_dates):
+        queries = [(35455, brand_id, date) for brand_id in (2, 3, 4) for date in application_dates]
+        expected = [resolve_price_from_orm(*query) for query in queries]
+        settings.PRICES_LOOKUP_BACKEND = 'columnar'
+        price_store.load()
+
+        with django_assert_num_queries(0):
+            found = resolve_prices(queries)
+        assert [price and price.pk for price in found] == [price and price.pk for price in expected]
+
+        params = {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-14T16:00:00'}
+        with django_assert_num_queries(0):
+            columnar = self.client.get(reverse('price-view'), params)
+        settings.PRICES_LOOKUP_BACKEND = 'orm'
+        assert columnar.content == self.client.get(reverse('price-view'), params).content
+
+    # Test 4: una escritura descarta el almacén y la siguiente consulta lo recarga
+    def test_invalidated_on_write(self, create_new_prices, committed):
+        application_date = datetime(2020, 6, 14, 16, 0, 0, tzinfo=pytz.UTC)
+        assert price_store.lookup(35455, 2, application_date).price_list == 2
+
+        with committed():
+            Price.objects.get(brand_id=2, price_list=2).delete()
+        assert not price_store.loaded
+        assert price_store.lookup(35455, 2, application_date).price_list == 1
+
+    # Test 5: con la tabla vacía, PriceView y el lote responden sin precio en lugar de fallar
+    def test_empty_table(self, settings):
+        settings.PRICES_LOOKUP_BACKEND = 'columnar'
+        price_store.clear()
+        params = {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-14T16:00:00'}
+
+        assert self.client.get(reverse('price-view'), params).status_code == 404
+        response = self.client.post(reverse('price-batch-view'), [params], format='json')
+        assert response.status_code == 200
+        assert 'price' not in response.json()[0]
+        assert not price_store.lookup_arrays([35455], [2], np.array(['2020-06-14T16:00'], dtype='datetime64[us]')).found.any()
+
+    # Test 6: los ids fuera del rango de la columna no se confunden con otra clave
+    def test_out_of_range_ids(self, create_new_prices):
+        # (0, 2 ** 32 + 2) empaquetado sería el código de (1, 2)
+        Price.objects.create(
+            product_id=1, brand_id=2, price_list=1, price='5.00', priority=0,
+            start_date='2020-06-14T00:00:00Z', end_date='2020-06-30T00:00:00Z',
+        )
+        timestamps = np.array(['2020-06-15T10:00'] * 3, dtype='datetime64[us]')
+        result = price_store.lookup_arrays([0, -1, 1], [2 ** 32 + 2, 2 ** 32 + 2, 2], timestamps)
+        assert result.found.tolist() == [False, False, True]
+
+    # Test 7: las escrituras de otro proceso (sin señales aquí) recargan el almacén al comprobar el registro
+    def test_reloaded_after_other_process_write(self, create_new_prices, settings):
+        application_date = datetime(2020, 6, 14, 16, 0, 0, tzinfo=pytz.UTC)
+        assert price_store.lookup(35455, 2, application_date).price_minor == 2645
+
+        Price.objects.filter(brand_id=2, price_list=2).update(price_minor=2000)
+        record_changes([upsert_change(Price.objects.get(brand_id=2, price_list=2))])
+        settings.PRICES_COLUMNAR_CHECK_INTERVAL = 60
+        assert price_store.lookup(35455, 2, application_date).price_minor == 2645
+
+        settings.PRICES_COLUMNAR_CHECK_INTERVAL = 0
+        assert price_store.lookup(35455, 2, application_date).price_minor == 2000
@@ -0,0 +1,92 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from prices.encoding import encode_price, encoded_price
+from prices.models import Price
+from prices.views_api import price_payload
+
+
+@pytest.mark.parametrize('price, start_date', [
+    (Decimal('35.50'), datetime(2020, 6, 14, tzinfo=timezone.utc)),
+    (Decimal('0.10'), datetime(2020, 6, 14, 15, 30, 0, 123456, tzinfo=timezone.utc)),
+    (Decimal('30.00'), datetime(2020, 6, 14, 15, 30, tzinfo=timezone(timedelta(hours=2)))),
+    (Decimal('12345678.99'), datetime(1999, 12, 31, 23, 59, 59, tzinfo=timezone.utc)),
+])
+def test_encode_price_matches_json_renderer(price, start_date):
+    row = Price(
+        product_id=35455,
+        brand_id=1,
+        price_list=4,
+        start_date=start_date,
+        end_date=start_date + timedelta(days=1),
+        price=price,
+    )
+    assert encode_price(row) == JSONRenderer().render(price_payload(row))
+
+
+def test_encoded_price_is_reused_per_row():
+    row = Price(product_id=1, brand_id=1, price_list=1, price=Decimal('1.00'),
+                start_date=datetime(2020, 1, 1, tzinfo=timezone.utc),
+                end_date=datetime(2020, 2, 1, tzinfo=timezone.utc))
+    assert encoded_price(row) is encoded_price(row)
+
+
+@pytest.mark.django_db
+class TestPriceViewFastPath:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    def get_price(self, **extra):
+        return self.client.get(
+            reverse('price-view'),
+            {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-14T16:00:00', **extra.pop('params', {})},
+            **extra
+        )
+
+    # Test 1: los bytes y las cabeceras coinciden con los de la Response de DRF
+    @pytest.mark.parametrize('backend', ['orm', 'index', 'timeline'])
+    def test_fast_path_is_byte_compatible(self, create_new_prices, use_backend, backend):
+        use_backend(backend)
+        expected = Price.objects.get(brand_id=2, price_list=2)
+
+        response = self.get_price()
+
+        assert response.status_code == 200
+        assert response.content == JSONRenderer().render(price_payload(expected))
+        assert response['Content-Type'] == 'application/json'
+        assert response['Vary'] == 'Accept, Cookie'
+        assert response['Allow'] == 'GET, HEAD, OPTIONS'
+        assert response.data == price_payload(expected)
+
+    # Test 2: con JSON los datos de la respuesta (y su Decimal) solo se construyen si se leen
+    def test_fast_path_builds_data_lazily(self, create_new_prices, monkeypatch):
+        calls = []
+
+        def counted_payload(row):
+            calls.append(row)
+            return price_payload(row)
+        monkeypatch.setattr('prices.views_api.price_payload', counted_payload)
+
+        response = self.get_price()
+        assert calls == []
+        assert response.data['price_list'] == 2
+        assert len(calls) == 1
+
+    # Test 3: con la caché activada se sirve el cuerpo guardado en la entrada
+    def test_cached_body(self, create_new_prices, settings):
+        settings.PRICES_CACHE_ENABLED = True
+        first = self.get_price()
+        second = self.get_price()
+        assert first.content == second.content
+
+    # Test 4: otros formatos siguen negociándose y renderizándose con DRF
+    def test_other_renderers(self, create_new_prices):
+        response = self.get_price(HTTP_ACCEPT='text/html')
+        assert response['Content-Type'].startswith('text/html')
+
+        response = self.get_price(params={'format': 'json'}, HTTP_ACCEPT='application/json; indent=2')
+        assert response.content.startswith(b'{\n  "product_id"')
@@ -0,0 +1,162 @@
+import json
+import random
+import pytest
+from asgiref.sync import async_to_sync
+from decimal import Decimal
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from prices import fx
+from prices.fx import FxTable, UnknownCurrency, set_rates
+from prices.models import FxRate, Price
+
+RATES = {'USD': Decimal('1'), 'EUR': Decimal('0.5'), 'GBP': Decimal('0.79123456')}
+
+
+@pytest.fixture
+def fx_table(db):
+    set_rates(RATES)
+
+
+def table():
+    return FxTable(1, RATES)
+
+
+# Test 1: la conversión vectorizada da exactamente lo mismo que la escalar, con y sin NumPy
+@pytest.mark.parametrize('numpy', [True, False])
+def test_convert_many_matches_convert(monkeypatch, numpy):
+    if not numpy:
+        monkeypatch.setattr(fx, 'np', None)
+    rng = random.Random(5)
+    minors = [rng.randrange(0, 10 ** 9) for _ in range(2000)]
+    exponents = [rng.choice([0, 2, 3]) for _ in minors]
+    currencies = [rng.choice(['USD', 'EUR', 'GBP', 'JPY']) for _ in minors]
+
+    converted = table().convert_many(minors, exponents, currencies, 'GBP')
+    for minor, exponent, currency, amount in zip(minors, exponents, currencies, converted):
+        if currency == 'JPY':
+            assert amount is None
+        else:
+            assert amount == table().convert(minor, exponent, currency, 'GBP')
+
+
+def test_convert_rounds_half_even():
+    assert table().convert(2645, 2, 'USD', 'EUR') == 1322
+    assert table().convert(2647, 2, 'USD', 'EUR') == 1324
+    assert table().convert(1322, 2, 'EUR', 'USD') == 2644
+    with pytest.raises(UnknownCurrency):
+        table().convert(100, 2, 'JPY', 'USD')
+
+
+def test_convert_changes_exponent():
+    jpy = FxTable(1, {**RATES, 'JPY': Decimal('150'), 'KWD': Decimal('0.3')})
+    assert jpy.convert(2645, 2, 'USD', 'JPY') == 3968
+    assert jpy.convert(1500, 0, 'JPY', 'USD') == 1000
+    assert jpy.convert(10000, 2, 'USD', 'KWD') == 30000
+
+
+@pytest.mark.django_db
+class TestTargetCurrency:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    def get_price(self, view='price-view', **params):
+        query = {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-14T16:00:00Z', **params}
+        return self.client.get(reverse(view), query)
+
+    # Test 3: PriceView convierte el precio y añade la moneda, con el mismo JSON que el renderer
+    def test_price_view_converts(self, create_new_prices, fx_table):
+        response = self.get_price(target_currency='eur')
+        assert response.status_code == 200
+        assert response.json() == {
+            "product_id": 35455,
+            "brand_id": 2,
+            "price_list": 2,
+            "start_date": "2020-06-14T15:00:00Z",
+            "end_date": "2020-06-14T18:30:00Z",
+            "price": 13.22,
+            "curr": "EUR",
+        }
+        assert response.content == JSONRenderer().render(response.data)
+        # Sin conversión la respuesta no cambia
+        assert 'curr' not in self.get_price().json()
+
+    # Test 4: con la tabla en memoria, convertir no añade consultas
+    def test_conversion_adds_no_queries(self, create_new_prices, fx_table, django_assert_num_queries):
+        self.get_price(target_currency='EUR')
+        with django_assert_num_queries(1):
+            assert self.get_price(target_currency='EUR').status_code == 200
+
+    # Test 5: moneda inválida, desconocida o precio sin tipo de cambio
+    def test_unknown_currencies(self, create_new_prices, fx_table):
+        assert self.get_price(target_currency='EURO').json() == {"error": "Invalid currency"}
+        response = self.get_price(target_currency='JPY')
+        assert response.status_code == 400
+        assert response.json() == {"error": "No exchange rate for JPY"}
+
+        FxRate.objects.filter(currency='USD').delete()
+        response = self.get_price(target_currency='EUR')
+        assert response.status_code == 400
+        assert response.json() == {"error": "No exchange rate for USD"}
+
+    # Test 6: otro proceso cambia los tipos: se recargan al comprobar la versión
+    def test_rates_reload_on_version_change(self, create_new_prices, fx_table, settings):
+        settings.PRICES_FX_CHECK_INTERVAL = 3600
+        assert self.get_price(target_currency='EUR').json()['price'] == 13.22
+
+        # Escritura sin señales, como la vería este proceso si la hiciera otro
+        FxRate.objects.filter(currency='EUR').update(rate=Decimal('2'))
+        fx.bump_version()
+        assert self.get_price(target_currency='EUR').json()['price'] == 13.22
+
+        settings.PRICES_FX_CHECK_INTERVAL = 0
+        assert self.get_price(target_currency='EUR').json()['price'] == 52.9
+
+    # Test 7: las escrituras del propio proceso descartan la tabla al momento
+    def test_local_write_invalidates(self, create_new_prices, fx_table, settings):
+        settings.PRICES_FX_CHECK_INTERVAL = 3600
+        assert self.get_price(target_currency='EUR').json()['price'] == 13.22
+        rate = FxRate.objects.get(currency='EUR')
+        rate.rate = Decimal('2')
+        rate.save()
+        assert self.get_price(target_currency='EUR').json()['price'] == 52.9
+
+    # Test 8: el lote convierte todos los precios encontrados
+    def test_batch_converts(self, create_new_prices, fx_table):
+        Price.objects.filter(brand_id=3).update(curr='CHF')
+        queries = [
+            {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-14T16:00:00Z'},
+            {'product_id': 35455, 'brand_id': 2, 'application_date': '2019-01-01T00:00:00Z'},
+            {'product_id': 35455, 'brand_id': 3, 'application_date': '2020-06-14T16:00:00Z'},
+        ]
+        response = self.client.post(reverse('price-batch-view') + '?target_currency=EUR', queries, format='json')
+        assert response.status_code == 200
+
+        data = response.json()
+        assert (data[0]['price'], data[0]['curr']) == (13.22, 'EUR')
+        assert data[1]['error'] == "No price found"
+        assert data[2]['error'] == "No exchange rate for CHF"
+
+    # Test 9: el snapshot de una marca sale convertido
+    def test_snapshot_converts(self, create_new_prices, fx_table):
+        response = self.client.get(reverse('price-snapshot-view'), {
+            'brand_id': 2, 'application_date': '2020-06-14T16:00:00Z', 'target_currency': 'GBP',
+        })
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        assert lines == [{
+            "product_id": 35455,
+            "brand_id": 2,
+            "price_list": 2,
+            "start_date": "2020-06-14T15:00:00Z",
+            "end_date": "2020-06-14T18:30:00Z",
+            "price": table().convert(2645, 2, 'USD', 'GBP') / 100,
+            "curr": "GBP",
+        }]
+
+    # Test 10: la vista asíncrona devuelve los mismos bytes que la síncrona
+    def test_async_view_matches(self, create_new_prices, fx_table):
+        query = {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-14T16:00:00Z', 'target_currency': 'EUR'}
+        response = async_to_sync(AsyncClient().get)(reverse('price-async-view'), query)
+        assert response.content == self.get_price(target_currency='EUR').content
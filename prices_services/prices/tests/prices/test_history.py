@@ -0,0 +1,100 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+import pytz
+from datetime import datetime, timedelta
+from prices.lookup import price_history, resolve_price_from_orm
+from prices.timeline import find_segment
+
+JUNE_14 = datetime(2020, 6, 14, 0, 0, 0, tzinfo=pytz.UTC)
+JUNE_16 = datetime(2020, 6, 16, 0, 0, 0, tzinfo=pytz.UTC)
+
+
+@pytest.mark.django_db
+class TestPriceHistory:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    # Test 1: la secuencia de segmentos de la ventana, con una sola consulta
+    def test_history_segments(self, create_new_prices, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            segments = price_history(35455, 2, JUNE_14, JUNE_16)
+
+        end_of_promotion = datetime(2020, 6, 14, 18, 30, 0, 1, tzinfo=pytz.UTC)
+        end_of_morning = datetime(2020, 6, 15, 11, 0, 0, 1, tzinfo=pytz.UTC)
+        assert [(segment.start, segment.end, segment.row.price_list) for segment in segments] == [
+            (JUNE_14, datetime(2020, 6, 14, 15, 0, 0, tzinfo=pytz.UTC), 1),
+            (datetime(2020, 6, 14, 15, 0, 0, tzinfo=pytz.UTC), end_of_promotion, 2),
+            (end_of_promotion, datetime(2020, 6, 15, 0, 0, 0, tzinfo=pytz.UTC), 1),
+            (datetime(2020, 6, 15, 0, 0, 0, tzinfo=pytz.UTC), end_of_morning, 3),
+            (end_of_morning, datetime(2020, 6, 15, 16, 0, 0, tzinfo=pytz.UTC), 1),
+            (datetime(2020, 6, 15, 16, 0, 0, tzinfo=pytz.UTC), JUNE_16, 4),
+        ]
+
+    # Test 2: cada instante de la ventana tiene el mismo precio que PriceView
+    def test_history_matches_point_lookups(self, create_new_prices):
+        date_from = datetime(2020, 6, 13, 20, 0, 0, tzinfo=pytz.UTC)
+        segments = price_history(35455, 2, date_from, JUNE_16)
+        assert segments[0].start == JUNE_14
+
+        application_date = date_from
+        while application_date < JUNE_16:
+            segment = find_segment(segments, application_date)
+            expected = resolve_price_from_orm(35455, 2, application_date)
+            assert (segment and segment.row.pk) == (expected and expected.pk), application_date
+            application_date += timedelta(minutes=7)
+
+    # Test 3: el endpoint devuelve los segmentos recortados a la ventana
+    def test_history_endpoint(self, create_new_prices):
+        response = self.client.get(reverse('price-history-view'), {
+            'product_id': 35455,
+            'brand_id': 2,
+            'from': '2020-06-14T16:00:00Z',
+            'to': '2020-06-15T01:00:00Z',
+        })
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {
+                "segment_start": "2020-06-14T16:00:00Z",
+                "segment_end": "2020-06-14T18:30:00.000001Z",
+                "product_id": 35455,
+                "brand_id": 2,
+                "price_list": 2,
+                "start_date": "2020-06-14T15:00:00Z",
+                "end_date": "2020-06-14T18:30:00Z",
+                "price": 26.45,
+            },
+            {
+                "segment_start": "2020-06-14T18:30:00.000001Z",
+                "segment_end": "2020-06-15T00:00:00Z",
+                "product_id": 35455,
+                "brand_id": 2,
+                "price_list": 1,
+                "start_date": "2020-06-14T00:00:00Z",
+                "end_date": "2020-12-31T23:59:59Z",
+                "price": 36.5,
+            },
+            {
+                "segment_start": "2020-06-15T00:00:00Z",
+                "segment_end": "2020-06-15T01:00:00Z",
+                "product_id": 35455,
+                "brand_id": 2,
+                "price_list": 3,
+                "start_date": "2020-06-15T00:00:00Z",
+                "end_date": "2020-06-15T11:00:00Z",
+                "price": 31.5,
+            },
+        ]
+
+    # Test 4: ventana vacía o invertida
+    def test_history_invalid_range(self):
+        response = self.client.get(reverse('price-history-view'), {
+            'product_id': 35455,
+            'brand_id': 2,
+            'from': '2020-06-15T00:00:00Z',
+            'to': '2020-06-15T00:00:00Z',
+        })
+        assert response.status_code == 400
+        assert response.data == {"error": "Invalid date range"}
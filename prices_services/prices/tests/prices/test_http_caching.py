@@ -0,0 +1,89 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+from prices.lookup import resolve_segment_from_orm
+from prices.models import Price
+from prices.timeline import build_segments, find_segment
+
+
+@pytest.mark.django_db
+class TestPriceHTTPCaching:
+
+    @pytest.fixture(autouse=True)
+    def http_caching(self, settings):
+        settings.PRICES_HTTP_MAX_AGE = 300
+        self.client = APIClient()
+
+    def get_price(self, application_date, **headers):
+        return self.client.get(
+            reverse('price-view'),
+            {'product_id': 35455, 'brand_id': 2, 'application_date': application_date},
+            headers=headers
+        )
+
+    # Test 1: max-age es lo que queda hasta que empieza el precio de mayor prioridad
+    def test_cache_control_from_validity(self, create_new_prices, settings):
+        settings.PRICES_HTTP_MAX_AGE = 86400
+
+        response = self.get_price('2020-06-14T10:00:00Z')
+
+        assert response.status_code == 200
+        assert response['Cache-Control'] == 'public, max-age=18000'
+        assert response['ETag'].startswith('"')
+        assert 'Last-Modified' not in response
+
+        # Acotado por PRICES_HTTP_MAX_AGE
+        settings.PRICES_HTTP_MAX_AGE = 300
+        assert self.get_price('2020-06-14T10:00:00Z')['Cache-Control'] == 'public, max-age=300'
+
+    # Test 2: If-None-Match con la ETag vigente responde 304 sin cuerpo
+    def test_if_none_match_returns_304(self, create_new_prices):
+        etag = self.get_price('2020-06-14T10:00:00Z')['ETag']
+
+        response = self.get_price('2020-06-14T11:00:00Z', if_none_match=etag)
+        assert response.status_code == 304
+        assert response.content == b''
+        assert response['ETag'] == etag
+
+        # Otro precio ganador tiene otra ETag
+        response = self.get_price('2020-06-14T16:00:00Z', if_none_match=etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    # Test 3: el 304 se decide sin codificar la respuesta
+    def test_not_modified_skips_encoding(self, create_new_prices, monkeypatch):
+        etag = self.get_price('2020-06-14T10:00:00Z')['ETag']
+
+        def fail(*args):
+            raise AssertionError("encoded a 304 response")
+        monkeypatch.setattr('prices.views_api.encoded_price', fail)
+        monkeypatch.setattr('prices.views_api.price_payload', fail)
+        assert self.get_price('2020-06-14T11:00:00Z', if_none_match=etag).status_code == 304
+
+    # Test 4: editar el precio cambia la ETag
+    def test_edit_changes_etag(self, create_new_prices):
+        etag = self.get_price('2020-06-14T10:00:00Z')['ETag']
+
+        Price.objects.filter(brand_id=2, price_list=1).update(price_minor=9999)
+
+        response = self.get_price('2020-06-14T10:00:00Z', if_none_match=etag)
+        assert response.status_code == 200
+        assert float(response.data['price']) == 99.99
+
+    # Test 5: con PRICES_HTTP_MAX_AGE = 0 no se envían cabeceras de caché
+    def test_disabled(self, create_new_prices, settings):
+        settings.PRICES_HTTP_MAX_AGE = 0
+        response = self.get_price('2020-06-14T10:00:00Z')
+        assert 'ETag' not in response
+        assert 'Cache-Control' not in response
+
+    # Test 6: el segmento de las consultas acotadas es el mismo que el del barrido completo
+    def test_bounded_segment_matches_sweep(self, application_dates):
+        for brand_id in (2, 3, 4):
+            segments = build_segments(Price.objects.filter(product_id=35455, brand_id=brand_id))
+            for application_date in application_dates:
+                expected = find_segment(segments, application_date)
+                found = resolve_segment_from_orm(35455, brand_id, application_date)
+                assert (found and (found.start, found.end, found.row.pk)) == (
+                    expected and (expected.start, expected.end, expected.row.pk)
+                ), application_date
@@ -0,0 +1,100 @@
+import pytest
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.test import APIClient
+import pytz
+from datetime import datetime
+from prices.changes import record_changes, upsert_change
+from prices.index import price_index
+from prices.lookup import resolve_price_from_orm
+from prices.models import Price
+
+
+@pytest.mark.django_db
+class TestPriceIndex:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    # Test 1: el índice devuelve lo mismo que el ORM (marca 4 sin precios incluida)
+    def test_index_matches_orm(self, application_dates):
+        for brand_id in (2, 3, 4):
+            for application_date in application_dates:
+                expected = resolve_price_from_orm(35455, brand_id, application_date)
+                found = price_index.lookup(35455, brand_id, application_date)
+                assert (found and found.pk) == (expected and expected.pk), application_date
+
+    # Test 2: PriceView responde desde el índice cuando está activado
+    def test_view_uses_index(self, create_new_prices, settings, django_assert_num_queries):
+        settings.PRICES_LOOKUP_BACKEND = 'index'
+        price_index.load()
+
+        with django_assert_num_queries(0):
+            response = self.client.get(
+                reverse('price-view'),
+                {
+                    'product_id': 35455,
+                    'brand_id': 2,
+                    'application_date': datetime(2020, 6, 14, 16, 0, 0, tzinfo=pytz.UTC).isoformat()
+                }
+            )
+        assert response.status_code == 200
+        assert response.data['price_list'] == 2
+
+    # Test 3: el índice se mantiene sincronizado al guardar y borrar filas
+    def test_index_follows_writes(self, create_new_prices, committed):
+        application_date = datetime(2020, 6, 14, 10, 0, 0, tzinfo=pytz.UTC)
+        price_index.load()
+        assert price_index.lookup(35455, 2, application_date).price_list == 1
+
+        with committed():
+            promotion = Price.objects.create(
+                product_id=35455,
+                brand_id=2,
+                price_list=5,
+                start_date="2020-06-14T09:00:00Z",
+                end_date="2020-06-14T11:00:00Z",
+                price=20.00,
+                priority=1
+            )
+        assert price_index.lookup(35455, 2, application_date).price_list == 5
+
+        promotion.brand_id = 3
+        with committed():
+            promotion.save()
+        assert price_index.lookup(35455, 2, application_date).price_list == 1
+        assert price_index.lookup(35455, 3, application_date).price_list == 5
+
+        with committed():
+            promotion.delete()
+        assert price_index.lookup(35455, 3, application_date).price_list == 1
+
+    # Test 4: una escritura que se deshace no deja filas fantasma en el índice
+    def test_rollback_leaves_index_untouched(self, create_new_prices, settings, committed):
+        settings.PRICES_LOOKUP_BACKEND = 'index'
+        application_date = datetime(2020, 6, 14, 10, 0, 0, tzinfo=pytz.UTC)
+        assert price_index.lookup(35455, 2, application_date).price_list == 1
+
+        with committed(), pytest.raises(RuntimeError), transaction.atomic():
+            Price.objects.create(
+                product_id=35455, brand_id=2, price_list=9, price='1.00', priority=1,
+                start_date=datetime(2020, 6, 1, tzinfo=pytz.UTC), end_date=datetime(2020, 6, 30, tzinfo=pytz.UTC),
+            )
+            assert price_index.lookup(35455, 2, application_date).price_list == 1
+            raise RuntimeError("rollback")
+
+        assert price_index.lookup(35455, 2, application_date).price_list == 1
+
+    # Test 5: las escrituras de otro proceso (sin señales aquí) llegan por el registro de cambios
+    def test_index_catches_up_from_changes(self, create_new_prices, settings):
+        application_date = datetime(2020, 6, 14, 16, 0, 0, tzinfo=pytz.UTC)
+        price_index.load()
+        assert price_index.lookup(35455, 2, application_date).price_minor == 2645
+
+        Price.objects.filter(brand_id=2, price_list=2).update(price_minor=2000)
+        record_changes([upsert_change(Price.objects.get(brand_id=2, price_list=2))])
+        settings.PRICES_INDEX_CHECK_INTERVAL = 60
+        assert price_index.lookup(35455, 2, application_date).price_minor == 2645
+
+        settings.PRICES_INDEX_CHECK_INTERVAL = 0
+        assert price_index.lookup(35455, 2, application_date).price_minor == 2000
@@ -0,0 +1,97 @@
+import random
+import pytest
+from asgiref.sync import async_to_sync
+from datetime import datetime, timezone
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.test import APIClient
+from prices.bloom import BloomFilter, price_key_bloom
+from prices.changes import record_changes, upsert_change
+from prices.metrics import registry
+from prices.models import Price
+
+APPLICATION_DATE = '2020-06-14T16:00:00Z'
+
+
+# Test 1: sin falsos negativos y con la tasa de falsos positivos configurada
+def test_bloom_filter_error_rate():
+    rng = random.Random(3)
+    keys = {(rng.randrange(1, 10 ** 6), rng.randrange(1, 100)) for _ in range(20000)}
+    bloom = BloomFilter(len(keys), 0.01)
+    for key in keys:
+        bloom.add(*key)
+
+    assert all(key in bloom for key in keys)
+    unknown = [(rng.randrange(10 ** 6, 2 * 10 ** 6), rng.randrange(1, 100)) for _ in range(20000)]
+    false_positives = sum(key in bloom for key in unknown) / len(unknown)
+    assert false_positives < 0.02
+    # Las claves que ya parecían estar (falsos positivos al añadir) no cuentan
+    assert 0.98 * len(keys) < bloom.count <= len(keys)
+    assert abs(bloom.estimated_error_rate() - 0.01) < 0.002
+
+    # Memoria: unos 1,2 MB por millón de claves al 1%
+    assert 1_100_000 < BloomFilter(10 ** 6, 0.01).nbytes < 1_300_000
+
+
+@pytest.mark.django_db
+class TestPriceViewKeyBloom:
+
+    @pytest.fixture(autouse=True)
+    def key_bloom(self, settings):
+        settings.PRICES_KEY_BLOOM = True
+        settings.PRICES_KEY_BLOOM_CHECK_INTERVAL = 3600
+        self.client = APIClient()
+        return settings
+
+    def get_price(self, product_id, brand_id=2):
+        return self.client.get(reverse('price-view'), {
+            'product_id': product_id, 'brand_id': brand_id, 'application_date': APPLICATION_DATE,
+        })
+
+    # Test 2: las claves sin precios responden 404 sin consultas y con el mismo cuerpo
+    def test_unknown_key_skips_database(self, create_new_prices, settings, django_assert_num_queries):
+        assert self.get_price(35455).status_code == 200
+
+        with django_assert_num_queries(0):
+            response = self.get_price(99999)
+        assert response.status_code == 404
+
+        settings.PRICES_KEY_BLOOM = False
+        assert self.get_price(99999).content == response.content
+        assert price_key_bloom.stats()['negatives'] == 1
+
+    # Test 3: las altas de este proceso se ven al momento
+    def test_local_write_is_visible(self, create_new_prices, committed):
+        assert self.get_price(1000).status_code == 404
+        with committed():
+            Price.objects.create(
+                product_id=1000, brand_id=2, price_list=1, price='5.00', curr='EUR', priority=0,
+                start_date=datetime(2020, 1, 1, tzinfo=timezone.utc), end_date=datetime(2020, 12, 31, tzinfo=timezone.utc),
+            )
+        assert self.get_price(1000).status_code == 200
+
+    # Test 4: las altas de otros procesos se leen del registro de cambios
+    def test_other_process_writes(self, create_new_prices, settings):
+        assert self.get_price(2000).status_code == 404
+
+        # Escritura sin señales, como la vería este proceso si la hiciera otro
+        price = Price(
+            product_id=2000, brand_id=2, price_list=1, price='5.00', curr='EUR', priority=0,
+            start_date=datetime(2020, 1, 1, tzinfo=timezone.utc), end_date=datetime(2020, 12, 31, tzinfo=timezone.utc),
+        )
+        Price.objects.bulk_create([price])
+        record_changes([upsert_change(price)])
+        assert self.get_price(2000).status_code == 404
+
+        settings.PRICES_KEY_BLOOM_CHECK_INTERVAL = 0
+        assert self.get_price(2000).status_code == 200
+
+    # Test 5: la vista asíncrona también responde 404 sin consultas
+    def test_async_view(self, create_new_prices, django_assert_num_queries):
+        price_key_bloom.current()
+        client = AsyncClient()
+        query = {'product_id': 99999, 'brand_id': 2, 'application_date': APPLICATION_DATE}
+        with django_assert_num_queries(0):
+            response = async_to_sync(client.get)(reverse('price-async-view'), query)
+        assert (response.status_code, response.json()) == (404, {"detail": "No price found"})
+        assert 'prices_key_bloom_negatives_total 1' in registry.render()
@@ -0,0 +1,91 @@
+import io
+import json
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+import pytz
+from datetime import datetime
+from prices.lookup import resolve_price_from_timeline
+from prices.models import Price
+
+CSV_HEADER = "PRODUCT_ID,BRAND_ID,PRICE_LIST,START_DATE,END_DATE,PRICE,CURR,PRIORITY\n"
+
+
+@pytest.mark.django_db
+class TestLoadPrices:
+
+    def write(self, tmp_path, name, content):
+        path = tmp_path / name
+        path.write_text(content)
+        return str(path)
+
+    # Test 1: carga un CSV en varias transacciones y lotes
+    def test_load_csv(self, tmp_path):
+        rows = "".join(
+            f"{product_id},1,1,2020-06-14 00:00:00,2020-12-31 23:59:59,{product_id}.50,EUR,0\n"
+            for product_id in range(1, 26)
+        )
+        path = self.write(tmp_path, 'prices.csv', CSV_HEADER + rows)
+        out = io.StringIO()
+
+        call_command('load_prices', path, '--batch-size', '4', '--transaction-size', '10', stdout=out)
+
+        assert Price.objects.count() == 25
+        price = Price.objects.get(product_id=7)
+        assert float(price.price) == 7.50
+        assert price.curr == 'EUR'
+        assert price.start_date == datetime(2020, 6, 14, 0, 0, 0, tzinfo=pytz.UTC)
+        assert 'rows/s' in out.getvalue()
+
+    # Test 2: NDJSON con upsert sobre (product_id, brand_id, price_list)
+    def test_load_ndjson_upserts(self, timeline_backend, create_new_prices, committed, tmp_path):
+        records = [
+            {"product_id": 35455, "brand_id": 2, "price_list": 2, "start_date": "2020-06-14T15:00:00Z",
+             "end_date": "2020-06-14T18:30:00Z", "price": "19.99", "priority": 1},
+            {"product_id": 35455, "brand_id": 2, "price_list": 9, "start_date": "2020-07-01T00:00:00Z",
+             "end_date": "2020-07-02T00:00:00Z", "price": "10.00", "priority": 1},
+        ]
+        path = self.write(tmp_path, 'prices.ndjson', "\n".join(json.dumps(record) for record in records))
+
+        with committed():
+            call_command('load_prices', path, stdout=io.StringIO())
+
+        assert Price.objects.filter(brand_id=2).count() == 5
+        assert float(Price.objects.get(brand_id=2, price_list=2).price) == 19.99
+
+        # La tabla derivada se reconstruye para las claves cargadas
+        application_date = datetime(2020, 6, 14, 16, 0, 0, tzinfo=pytz.UTC)
+        assert float(resolve_price_from_timeline(35455, 2, application_date).price) == 19.99
+
+    # Test 3: los registros que incumplen las reglas del modelo abortan la carga o se descartan
+    def test_invalid_records(self, tmp_path):
+        rows = (
+            "1,1,1,2020-06-14 00:00:00,2020-12-31 23:59:59,10.00,EUR,0\n"
+            "2,1,1,2020-12-31 00:00:00,2020-06-14 00:00:00,10.00,EUR,0\n"   # fechas invertidas
+            "3,1,1,2020-06-14 00:00:00,2020-12-31 23:59:59,-1.00,EUR,0\n"   # precio negativo
+            "4,1,1,2020-06-14 00:00:00,2020-12-31 23:59:59,10.00,EUR,7\n"   # prioridad no válida
+        )
+        path = self.write(tmp_path, 'prices.csv', CSV_HEADER + rows)
+
+        with pytest.raises(CommandError):
+            call_command('load_prices', path, stdout=io.StringIO())
+        assert not Price.objects.exists()
+
+        out = io.StringIO()
+        call_command('load_prices', path, '--skip-invalid', stdout=out)
+        assert list(Price.objects.values_list('product_id', flat=True)) == [1]
+        assert '3 rejected' in out.getvalue()
+
+    # Test 4: una clave repetida dentro de la misma transacción cuenta como una sola fila
+    def test_loaded_counts_unique_keys(self, tmp_path):
+        rows = (
+            "1,1,1,2020-06-14 00:00:00,2020-12-31 23:59:59,10.00,EUR,0\n"
+            "1,1,1,2020-06-14 00:00:00,2020-12-31 23:59:59,12.00,EUR,0\n"
+        )
+        path = self.write(tmp_path, 'prices.csv', CSV_HEADER + rows)
+        out = io.StringIO()
+
+        call_command('load_prices', path, stdout=out)
+
+        assert 'Loaded 1 rows (0 rejected)' in out.getvalue()
+        assert float(Price.objects.get(product_id=1).price) == 12.00
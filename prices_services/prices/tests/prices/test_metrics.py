@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.test import APIClient
+from prices.metrics import Histogram
+
+
+def sample_value(text, line_prefix):
+    """Valor de la primera muestra de la exposición que empieza por `line_prefix`."""
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    def get_price(self, application_date='2020-06-14T10:00:00'):
+        return self.client.get(
+            reverse('price-view'),
+            {'product_id': 35455, 'brand_id': 2, 'application_date': application_date}
+        )
+
+    def metrics(self):
+        response = self.client.get(reverse('metrics'))
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        return response.content.decode()
+
+    # Test 1: latencia, consultas y serialización por endpoint en /metrics
+    def test_metrics_exposition(self, create_new_prices):
+        before = self.metrics()
+        self.get_price()
+        self.get_price()
+        self.get_price(application_date='')
+        after = self.metrics()
+
+        latency = 'prices_request_duration_seconds_count{endpoint="price-view",method="GET",status="200"}'
+        queries = 'prices_request_db_queries_count{endpoint="price-view"}'
+        for prefix, expected in ((latency, 2), (queries, 3)):
+            assert sample_value(after, prefix) - (sample_value(before, prefix) or 0) == expected
+
+        # El error 400 se renderiza con DRF; los precios se miden al codificarlos
+        render = 'prices_response_render_duration_seconds_count{endpoint="price-view"}'
+        assert sample_value(after, render) - (sample_value(before, render) or 0) == 3
+
+        # Cada petición hace como mucho una consulta: el bucket le="1" las acumula todas
+        bucket = 'prices_request_db_queries_bucket{endpoint="price-view",le="1"}'
+        assert sample_value(after, bucket) - (sample_value(before, bucket) or 0) == 3
+        assert '# TYPE prices_cache_hits_total counter' in after
+
+    # Test 2: las peticiones muestreadas que superan el umbral se perfilan en el fichero
+    def test_slow_request_profile(self, create_new_prices, settings, tmp_path):
+        settings.PRICES_PROFILE_SAMPLE_RATE = 1
+        settings.PRICES_PROFILE_SLOW_MS = 0
+        settings.PRICES_PROFILE_FILE = tmp_path / 'slow.txt'
+
+        self.get_price()
+
+        profile = settings.PRICES_PROFILE_FILE.read_text()
+        assert 'GET /api/price/' in profile
+        assert 'endpoint=price-view' in profile
+        assert 'cumulative' in profile
+
+        settings.PRICES_PROFILE_SLOW_MS = 60000
+        self.get_price()
+        assert settings.PRICES_PROFILE_FILE.read_text() == profile
+
+    # Test 3: bajo ASGI, cada petición concurrente cuenta solo sus propias consultas
+    def test_concurrent_requests_count_own_queries(self, create_new_prices):
+        async def fetch_concurrently(count):
+            client = AsyncClient()
+            query = {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-14T10:00:00'}
+            await asyncio.gather(*(client.get(reverse('price-async-view'), query) for _ in range(count)))
+
+        before = self.metrics()
+        async_to_sync(fetch_concurrently)(20)
+        after = self.metrics()
+
+        queries = 'prices_request_db_queries_sum{endpoint="price-async-view"}'
+        requests = 'prices_request_db_queries_count{endpoint="price-async-view"}'
+        assert sample_value(after, requests) - (sample_value(before, requests) or 0) == 20
+        assert sample_value(after, queries) - (sample_value(before, queries) or 0) == 20
+
+
+# Test 4: los buckets del histograma son acumulativos e incluyen +Inf
+def test_histogram_buckets():
+    histogram = Histogram('latency', 'Latencia.', labels=('endpoint',), buckets=(0.1, 1.0))
+    histogram.observe(0.05, 'a')
+    histogram.observe(0.5, 'a')
+    histogram.observe(5, 'a')
+
+    assert list(histogram.samples()) == [
+        'latency_bucket{endpoint="a",le="0.1"} 1',
+        'latency_bucket{endpoint="a",le="1.0"} 2',
+        'latency_bucket{endpoint="a",le="+Inf"} 3',
+        'latency_sum{endpoint="a"} 5.55',
+        'latency_count{endpoint="a"} 3',
+    ]
@@ -0,0 +1,108 @@
+import importlib
+import pytest
+from datetime import datetime, timezone
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from rest_framework.renderers import JSONRenderer
+from prices.encoding import encode_price
+from prices.lookup import resolve_price_from_orm
+from prices.mmap_snapshot import MappedPriceSnapshot, write_snapshot
+from prices.models import Price
+from prices.views_api import price_payload
+
+START = datetime(2020, 6, 14, tzinfo=timezone.utc)
+END = datetime(2020, 12, 31, tzinfo=timezone.utc)
+
+migration = importlib.import_module('prices.migrations.0010_price_minor_units')
+
+
+def price(amount, curr, **extra):
+    fields = {'product_id': 1, 'brand_id': 1, 'price_list': 1, 'start_date': START, 'end_date': END, **extra}
+    return Price(curr=curr, price=amount, **fields)
+
+
+# Test 1: el importe se guarda en unidades menores con los decimales de la moneda
+@pytest.mark.parametrize('amount, curr, minor, exponent', [
+    ('35.5', 'EUR', 3550, 2),
+    (Decimal('1500'), 'JPY', 1500, 0),
+    ('1.234', 'KWD', 1234, 3),
+    (19.99, 'USD', 1999, 2),
+])
+def test_price_is_stored_in_minor_units(amount, curr, minor, exponent):
+    row = price(amount, curr)
+    row.clean()
+    assert (row.price_minor, row.price_exponent) == (minor, exponent)
+    assert row.price == Decimal(amount if not isinstance(amount, float) else str(amount))
+
+
+# Test 2: no se admiten más decimales de los que tiene la moneda
+def test_clean_rejects_extra_decimals():
+    with pytest.raises(ValidationError):
+        price('1.5', 'JPY').clean()
+    with pytest.raises(ValidationError):
+        price('abc', 'EUR')
+
+    row = price('100.000', 'JPY')
+    row.clean()
+    assert (row.price_minor, row.price_exponent) == (100, 0)
+
+
+# Test 3: la respuesta codificada coincide con el renderer para cualquier exponente
+@pytest.mark.parametrize('amount, curr', [('1500', 'JPY'), ('1.234', 'KWD'), ('0.10', 'EUR'), ('12345678.99', 'USD')])
+def test_encode_price_matches_json_renderer(amount, curr):
+    row = price(amount, curr)
+    assert encode_price(row) == JSONRenderer().render(price_payload(row))
+
+
+# Test 4: la migración usa los decimales de la moneda solo si el importe es exacto en ellos
+def test_migration_minor_units():
+    assert migration.minor_units(Decimal('1500.00'), 'JPY') == (1500, 0)
+    assert migration.minor_units(Decimal('1500.50'), 'JPY') == (150050, 2)
+    assert migration.minor_units(Decimal('1.23'), 'KWD') == (1230, 3)
+    assert migration.minor_units(Decimal('26.45'), 'EUR') == (2645, 2)
+
+
+# Test 5: los datos se conservan al aplicar y deshacer la migración
+@pytest.mark.django_db(transaction=True)
+def test_migration_preserves_prices():
+    executor = MigrationExecutor(connection)
+    executor.migrate([('prices', '0009_fx_rates')])
+    old_apps = executor.loader.project_state([('prices', '0009_fx_rates')]).apps
+    OldPrice = old_apps.get_model('prices', 'Price')
+    OldPrice.objects.create(product_id=1, brand_id=1, price_list=1, start_date=START, end_date=END,
+                            price=Decimal('1500.00'), curr='JPY', priority=0)
+    OldPrice.objects.create(product_id=1, brand_id=1, price_list=2, start_date=START, end_date=END,
+                            price=Decimal('26.45'), curr='EUR', priority=0)
+
+    executor = MigrationExecutor(connection)
+    executor.migrate([('prices', '0010_price_minor_units')])
+    new_apps = executor.loader.project_state([('prices', '0010_price_minor_units')]).apps
+    rows = new_apps.get_model('prices', 'Price').objects.order_by('price_list')
+    assert [(row.price_minor, row.price_exponent) for row in rows] == [(1500, 0), (2645, 2)]
+
+    executor = MigrationExecutor(connection)
+    executor.migrate([('prices', '0009_fx_rates')])
+    rows = OldPrice.objects.order_by('price_list')
+    assert [row.price for row in rows] == [Decimal('1500.00'), Decimal('26.45')]
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+
+
+# Test 6: el snapshot binario guarda el exponente de cada precio
+@pytest.mark.django_db
+def test_snapshot_keeps_exponent(tmp_path):
+    price('1500', 'JPY', product_id=7).save()
+    price('1.234', 'KWD', product_id=8).save()
+    path = tmp_path / 'prices.snapshot'
+    write_snapshot(path)
+
+    snapshot = MappedPriceSnapshot(path)
+    when = datetime(2020, 7, 1, tzinfo=timezone.utc)
+    for product_id in (7, 8):
+        expected = resolve_price_from_orm(product_id, 1, when)
+        found = snapshot.lookup(product_id, 1, when)
+        assert (found.price, found.curr) == (expected.price, expected.curr)
+        assert encode_price(found) == encode_price(expected)
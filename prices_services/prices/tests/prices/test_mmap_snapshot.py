@@ -0,0 +1,103 @@
+import io
+import os
+import pytest
+from datetime import datetime, timezone
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+from prices.lookup import resolve_price_from_orm, resolve_prices
+from prices.mmap_snapshot import InvalidSnapshot, MappedPriceSnapshot, price_snapshot, write_snapshot
+from prices.models import Price
+
+
+@pytest.fixture
+def snapshot_settings(settings, tmp_path):
+    settings.PRICES_LOOKUP_BACKEND = 'snapshot'
+    settings.PRICES_SNAPSHOT_PATH = tmp_path / 'prices.snapshot'
+    settings.PRICES_SNAPSHOT_CHECK_INTERVAL = 0
+    return settings
+
+
+@pytest.mark.django_db
+class TestMappedPriceSnapshot:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    # Test 1: el snapshot resuelve lo mismo que el ORM sin consultas a la base de datos
+    def test_matches_orm(self, snapshot_settings, application_dates, django_assert_num_queries):
+        call_command('write_price_snapshot', stdout=io.StringIO())
+        queries = [(35455, brand_id, date) for brand_id in (2, 3, 4) for date in application_dates]
+        expected = [resolve_price_from_orm(*query) for query in queries]
+
+        with django_assert_num_queries(0):
+            found = resolve_prices(queries)
+
+        for query, price, expected_price in zip(queries, found, expected):
+            assert (price and price.pk) == (expected_price and expected_price.pk), query
+            if expected_price is not None:
+                assert (price.price, price.curr, price.start_date, price.end_date) == (
+                    expected_price.price, expected_price.curr, expected_price.start_date, expected_price.end_date
+                )
+
+    # Test 2: PriceView devuelve los mismos bytes con el snapshot que con el ORM
+    def test_view_response(self, snapshot_settings, create_new_prices):
+        call_command('write_price_snapshot', stdout=io.StringIO())
+        params = {'product_id': 35455, 'brand_id': 3, 'application_date': '2020-06-15T10:00:00'}
+
+        response = self.client.get(reverse('price-view'), params)
+        snapshot_settings.PRICES_LOOKUP_BACKEND = 'orm'
+        assert response.status_code == 200
+        assert response.content == self.client.get(reverse('price-view'), params).content
+
+    # Test 3: un snapshot nuevo se publica de forma atómica y los lectores lo cambian sin reiniciar
+    def test_atomic_swap(self, snapshot_settings, create_new_prices, application_dates):
+        path = os.fspath(snapshot_settings.PRICES_SNAPSHOT_PATH)
+        write_snapshot(path)
+        old = price_snapshot.current()
+        application_date = application_dates[0].replace(month=6, day=14, hour=16)
+        assert price_snapshot.lookup(35455, 2, application_date).price_list == 2
+
+        Price.objects.get(brand_id=2, price_list=2).delete()
+        # Hasta publicar otro snapshot se sigue sirviendo el anterior
+        assert price_snapshot.lookup(35455, 2, application_date).price_list == 2
+
+        write_snapshot(path)
+        assert price_snapshot.current() is not old
+        assert price_snapshot.lookup(35455, 2, application_date).price_list == 1
+        # El mapa anterior sigue siendo legible para las consultas en curso
+        assert old.lookup(35455, 2, application_date).price_list == 2
+        assert [name for name in os.listdir(os.path.dirname(path))] == ['prices.snapshot']
+
+    # Test 4: los ids fuera del rango de la columna no se confunden con otra clave empaquetada
+    def test_out_of_range_ids(self, snapshot_settings, create_new_prices):
+        application_date = '2020-06-15T10:00:00'
+        # (0, 2 ** 32 + 2) empaquetado sería el código de (1, 2)
+        Price.objects.create(
+            product_id=1, brand_id=2, price_list=1, price='5.00', priority=0,
+            start_date='2020-06-14T00:00:00Z', end_date='2020-06-30T00:00:00Z',
+        )
+        call_command('write_price_snapshot', stdout=io.StringIO())
+
+        for product_id, brand_id in ((0, 2 ** 32 + 2), (-1, 2), (1, 2 ** 31)):
+            response = self.client.get(reverse('price-view'), {
+                'product_id': product_id, 'brand_id': brand_id, 'application_date': application_date,
+            })
+            assert response.status_code == 400, (product_id, brand_id)
+            assert price_snapshot.segment(product_id, brand_id, datetime(2020, 6, 15, 10, tzinfo=timezone.utc)) is None
+
+        response = self.client.post(reverse('price-batch-view'), [
+            {'product_id': 0, 'brand_id': 2 ** 32 + 2, 'application_date': application_date},
+        ], format='json')
+        assert response.status_code == 400
+
+    # Test 5: ficheros ausentes o que no son snapshots
+    def test_invalid_files(self, snapshot_settings, tmp_path):
+        with pytest.raises(ImproperlyConfigured):
+            price_snapshot.current()
+
+        corrupt = tmp_path / 'corrupt.snapshot'
+        corrupt.write_bytes(b'\0' * 128)
+        with pytest.raises(InvalidSnapshot):
+            MappedPriceSnapshot(corrupt)
@@ -3,85 +3,6 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 import pytz
 from datetime import datetime
-from prices.models import Price
-
-@pytest.fixture
-def create_new_prices(db):
-    # Grupo 1: product_id 35455, brand_id 2
-    Price.objects.create(
-        product_id=35455,
-        brand_id=2,
-        price_list=1,
-        start_date="2020-06-14T00:00:00Z",
-        end_date="2020-12-31T23:59:59Z",
-        price=36.50,
-        priority=0
-    )
-    Price.objects.create(
-        product_id=35455,
-        brand_id=2,
-        price_list=2,
-        start_date="2020-06-14T15:00:00Z",
-        end_date="2020-06-14T18:30:00Z",
-        price=26.45,
-        priority=1
-    )
-    Price.objects.create(
-        product_id=35455,
-        brand_id=2,
-        price_list=3,
-        start_date="2020-06-15T00:00:00Z",
-        end_date="2020-06-15T11:00:00Z",
-        price=31.50,
-        priority=1
-    )
-    Price.objects.create(
-        product_id=35455,
-        brand_id=2,
-        price_list=4,
-        start_date="2020-06-15T16:00:00Z",
-        end_date="2020-12-31T23:59:59Z",
-        price=39.95,
-        priority=1
-    )
-
-    # Grupo 2: product_id 35455, brand_id 3
-    Price.objects.create(
-        product_id=35455,
-        brand_id=3,
-        price_list=1,
-        start_date="2020-06-14T00:00:00Z",
-        end_date="2020-12-31T23:59:59Z",
-        price=37.50,
-        priority=0
-    )
-    Price.objects.create(
-        product_id=35455,
-        brand_id=3,
-        price_list=2,
-        start_date="2020-06-14T15:00:00Z",
-        end_date="2020-06-14T18:30:00Z",
-        price=27.45,
-        priority=1
-    )
-    Price.objects.create(
-        product_id=35455,
-        brand_id=3,
-        price_list=3,
-        start_date="2020-06-15T00:00:00Z",
-        end_date="2020-06-15T11:00:00Z",
-        price=32.50,
-        priority=1
-    )
-    Price.objects.create(
-        product_id=35455,
-        brand_id=3,
-        price_list=4,
-        start_date="2020-06-15T16:00:00Z",
-        end_date="2020-12-31T23:59:59Z",
-        price=40.95,
-        priority=1
-    )
 
 @pytest.mark.django_db
 class TestNewPriceAPI:
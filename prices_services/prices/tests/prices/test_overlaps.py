@@ -0,0 +1,139 @@
+import io
+import json
+import random
+import pytest
+from datetime import datetime, timedelta, timezone
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from prices.models import Price
+from prices.overlaps import OverlapRow, find_overlaps, table_overlaps
+
+CSV_HEADER = "PRODUCT_ID,BRAND_ID,PRICE_LIST,START_DATE,END_DATE,PRICE,CURR,PRIORITY\n"
+BASE = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def pairs(overlaps):
+    return sorted((o.product_id, o.brand_id, o.priority, o.price_list, o.other_price_list, o.start, o.end) for o in overlaps)
+
+
+# Test 1: el barrido encuentra los mismos solapes que comparar todas las parejas
+def test_sweep_matches_brute_force():
+    rng = random.Random(7)
+    rows = []
+    for product_id in range(1, 40):
+        for price_list in range(1, rng.randrange(2, 15)):
+            start = BASE + timedelta(hours=rng.randrange(0, 200))
+            rows.append(OverlapRow(
+                product_id, 1, price_list, start, start + timedelta(hours=rng.randrange(0, 48)), rng.randrange(0, 3),
+            ))
+
+    expected = []
+    for first in rows:
+        for second in rows:
+            if ((first.product_id, first.priority) == (second.product_id, second.priority)
+                    and (first.start_date, first.price_list) < (second.start_date, second.price_list)
+                    and second.start_date <= first.end_date):
+                expected.append((first.product_id, 1, first.priority, first.price_list, second.price_list,
+                                 second.start_date, min(first.end_date, second.end_date)))
+
+    assert expected
+    assert pairs(find_overlaps(rows)) == sorted(expected)
+
+
+@pytest.mark.django_db
+class TestPriceOverlaps:
+
+    def add(self, price_list, start_day, end_day, priority=1, product_id=35455, brand_id=2):
+        return Price.objects.create(
+            product_id=product_id, brand_id=brand_id, price_list=price_list, price='9.99', curr='EUR',
+            priority=priority, start_date=BASE + timedelta(days=start_day), end_date=BASE + timedelta(days=end_day),
+        )
+
+    def write(self, tmp_path, rows):
+        path = tmp_path / 'prices.csv'
+        path.write_text(CSV_HEADER + "".join(
+            f"35455,2,{price_list},{(BASE + timedelta(days=start)):%Y-%m-%d %H:%M:%S},"
+            f"{(BASE + timedelta(days=end)):%Y-%m-%d %H:%M:%S},5.00,EUR,{priority}\n"
+            for price_list, start, end, priority in rows
+        ))
+        return str(path)
+
+    # Test 2: recorrido de toda la tabla; los intervalos que solo se tocan en un extremo también solapan
+    def test_table_overlaps(self, create_new_prices):
+        assert list(table_overlaps()) == []
+
+        self.add(10, 0, 10)
+        self.add(11, 10, 20)
+        self.add(12, 15, 30, priority=0)
+        self.add(13, 21, 26)
+
+        assert pairs(table_overlaps(chunk_size=2)) == [
+            (35455, 2, 1, 10, 11, BASE + timedelta(days=10), BASE + timedelta(days=10)),
+        ]
+
+    # Test 3: el informe en NDJSON y el código de salida sirven de comprobación previa
+    def test_command_over_table(self, create_new_prices):
+        call_command('find_price_overlaps', stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.add(10, 0, 10)
+        self.add(11, 5, 20)
+        out = io.StringIO()
+        with pytest.raises(CommandError, match="Found 1 overlapping"):
+            call_command('find_price_overlaps', stdout=out)
+        assert [json.loads(line) for line in out.getvalue().splitlines()] == [{
+            "product_id": 35455, "brand_id": 2, "priority": 1, "price_list": 10, "other_price_list": 11,
+            "start": "2020-01-06T00:00:00Z", "end": "2020-01-11T00:00:00Z",
+        }]
+
+    # Test 4: un fichero se compara con la tabla, sustituyendo las filas con la misma clave única
+    def test_command_over_file(self, create_new_prices, tmp_path):
+        self.add(10, 0, 10)
+
+        # La lista 10 se mueve y deja de solapar; la 11 solapa con la 12 del propio
+        # fichero, que se queda con su última fila
+        path = self.write(tmp_path, [(10, 30, 40, 1), (11, 0, 5, 1), (12, 8, 9, 1), (12, 5, 6, 1)])
+        out = io.StringIO()
+        with pytest.raises(CommandError, match="Found 1 overlapping"):
+            call_command('find_price_overlaps', path, stdout=out)
+        assert json.loads(out.getvalue())['start'] == "2020-01-06T00:00:00Z"
+
+        # La lista 11 solo solapa con la 10 de la tabla
+        path = self.write(tmp_path, [(11, 0, 5, 1), (13, 0, 5, 0)])
+        with pytest.raises(CommandError, match="Found 1 overlapping"):
+            call_command('find_price_overlaps', path, stdout=io.StringIO())
+        call_command('find_price_overlaps', path, '--file-only', stdout=io.StringIO(), stderr=io.StringIO())
+
+    # Test 5: load_prices --check-overlaps rechaza la carga sin escribir nada
+    def test_load_gate(self, create_new_prices, tmp_path):
+        self.add(10, 0, 10)
+        path = self.write(tmp_path, [(11, 5, 20, 1), (14, 5, 20, 0)])
+        err = io.StringIO()
+
+        with pytest.raises(CommandError, match="1 overlapping"):
+            call_command('load_prices', path, '--check-overlaps', stdout=io.StringIO(), stderr=err)
+        assert json.loads(err.getvalue())['other_price_list'] == 11
+        assert not Price.objects.filter(price_list__in=[11, 14]).exists()
+
+        path = self.write(tmp_path, [(11, 11, 20, 1), (14, 5, 20, 0)])
+        call_command('load_prices', path, '--check-overlaps', stdout=io.StringIO())
+        assert Price.objects.filter(price_list__in=[11, 14]).count() == 2
+
+    # Test 6: un fichero sin ordenar por clave se rechaza salvo con --unsorted
+    def test_unsorted_file(self, tmp_path):
+        path = tmp_path / 'prices.csv'
+        path.write_text(CSV_HEADER + (
+            "2,1,1,2020-01-01 00:00:00,2020-01-10 00:00:00,5.00,EUR,1\n"
+            "1,1,1,2020-01-01 00:00:00,2020-01-10 00:00:00,5.00,EUR,1\n"
+            "2,1,2,2020-01-05 00:00:00,2020-01-20 00:00:00,5.00,EUR,1\n"
+        ))
+
+        with pytest.raises(CommandError, match="must be sorted"):
+            call_command('find_price_overlaps', str(path), stdout=io.StringIO())
+        with pytest.raises(CommandError, match="must be sorted"):
+            call_command('load_prices', str(path), '--check-overlaps', stdout=io.StringIO())
+        assert not Price.objects.exists()
+
+        out = io.StringIO()
+        with pytest.raises(CommandError, match="Found 1 overlapping"):
+            call_command('find_price_overlaps', str(path), '--unsorted', stdout=out)
+        assert json.loads(out.getvalue())['product_id'] == 2
@@ -0,0 +1,65 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+import pytz
+from datetime import datetime
+from prices.lookup import WINNER_ORDERING
+from prices.models import Price
+
+
+@pytest.mark.django_db
+class TestPriceQueryPlan:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    def query_plan(self, queryset):
+        """Devuelve el detalle de EXPLAIN QUERY PLAN de la consulta en SQLite."""
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    # Test 1: la consulta de PriceView usa price_lookup_idx sin ordenar con un B-tree temporal
+    def test_lookup_uses_index_without_sort(self, create_new_prices):
+        application_date = datetime(2020, 6, 14, 16, 0, 0, tzinfo=pytz.UTC)
+        queryset = Price.objects.filter(
+            product_id=35455,
+            brand_id=2,
+            start_date__lte=application_date,
+            end_date__gte=application_date
+        ).order_by(*WINNER_ORDERING)[:1]
+
+        plan = self.query_plan(queryset)
+
+        assert any('price_lookup_idx' in detail for detail in plan), plan
+        assert not any('TEMP B-TREE' in detail for detail in plan), plan
+
+    # Test 2: PriceView resuelve cada petición con una sola consulta
+    def test_view_runs_single_query(self, create_new_prices, django_assert_num_queries):
+        for application_date in ('2020-06-14T16:00:00Z', '2019-01-01T00:00:00Z'):
+            with django_assert_num_queries(1):
+                self.client.get(
+                    reverse('price-view'),
+                    {'product_id': 35455, 'brand_id': 2, 'application_date': application_date}
+                )
+
+    # Test 3: con cabeceras de caché HTTP, PriceView resuelve el segmento con dos consultas sobre price_lookup_idx
+    def test_view_segment_queries_use_index(self, create_new_prices, settings):
+        settings.PRICES_HTTP_MAX_AGE = 300
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse('price-view'),
+                {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-14T16:00:00Z'}
+            )
+        assert response['Cache-Control'] == 'public, max-age=300'
+        assert len(context.captured_queries) == 2
+
+        for query in context.captured_queries:
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {query['sql']}")
+                plan = [row[-1] for row in cursor.fetchall()]
+            assert any('price_lookup_idx' in detail for detail in plan), plan
+            assert not any(detail.startswith('SCAN') for detail in plan), plan
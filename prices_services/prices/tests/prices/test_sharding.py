@@ -0,0 +1,103 @@
+import io
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+import pytz
+from datetime import datetime
+from prices.lookup import resolve_price_from_orm, resolve_prices
+from prices.models import Price, PriceSegment
+
+SHARD_MAP = {2: 'prices_shard_1', 3: 'prices_shard_2'}
+
+
+def count_rows(model, alias, **filters):
+    return model.objects.using(alias).filter(**filters).count()
+
+
+@pytest.fixture
+def shard_map(settings):
+    settings.PRICES_SHARD_MAP = SHARD_MAP
+    return settings
+
+
+@pytest.mark.django_db(databases='__all__')
+class TestBrandSharding:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    def get_price(self, brand_id, application_date='2020-06-14T16:00:00Z'):
+        return self.client.get(
+            reverse('price-view'),
+            {'product_id': 35455, 'brand_id': brand_id, 'application_date': application_date}
+        )
+
+    # Test 1: cada fila y sus segmentos se guardan en el shard de su marca
+    def test_writes_go_to_brand_shard(self, shard_map, timeline_backend, create_new_prices):
+        assert count_rows(Price, 'prices_shard_1', brand_id=2) == 4
+        assert count_rows(Price, 'prices_shard_2', brand_id=3) == 4
+        assert count_rows(Price, 'default') == 0
+        assert count_rows(PriceSegment, 'prices_shard_1', brand_id=2) > 0
+        assert count_rows(PriceSegment, 'default') == 0
+
+    # Test 2: PriceView lee del shard de la marca con cualquier backend
+    @pytest.mark.parametrize('backend', ['orm', 'timeline', 'index'])
+    def test_view_reads_brand_shard(self, shard_map, create_new_prices, use_backend, backend):
+        use_backend(backend)
+        assert float(self.get_price(2).data['price']) == 26.45
+        assert float(self.get_price(3).data['price']) == 27.45
+        assert self.get_price(4).status_code == 404
+
+    # Test 3: el lote emite una consulta por shard y devuelve lo mismo que las consultas sueltas
+    def test_batch_queries_each_shard(self, shard_map, create_new_prices, application_dates, django_assert_num_queries):
+        queries = [(35455, brand_id, date) for brand_id in (2, 3) for date in application_dates]
+        expected = [resolve_price_from_orm(*query) for query in queries]
+
+        with django_assert_num_queries(1, using='prices_shard_1'), django_assert_num_queries(1, using='prices_shard_2'):
+            found = resolve_prices(queries)
+        assert [(price and price.pk) for price in found] == [(price and price.pk) for price in expected]
+
+    # Test 4: cambiar la marca de una fila la mueve al shard de la nueva marca
+    def test_save_moves_row_between_shards(self, shard_map, timeline_backend, create_new_prices, committed):
+        price = Price.objects.using('prices_shard_1').get(brand_id=2, price_list=1)
+        price.brand_id = 4
+        with committed():
+            price.save()
+
+        assert price._state.db == 'default'
+        assert count_rows(Price, 'prices_shard_1', brand_id=2) == 3
+        assert count_rows(Price, 'default', brand_id=4) == 1
+        assert count_rows(PriceSegment, 'default', brand_id=4) == 1
+        assert self.get_price(2, '2020-06-14T10:00:00Z').status_code == 404
+        assert float(self.get_price(4, '2020-06-14T10:00:00Z').data['price']) == 36.5
+
+    # Test 5: tras cambiar el mapa, el comando mueve las marcas y sus segmentos
+    def test_rebalance_command(self, timeline_backend, create_new_prices, committed):
+        assert count_rows(Price, 'default') == 8
+        timeline_backend.PRICES_SHARD_MAP = SHARD_MAP
+
+        out = io.StringIO()
+        call_command('rebalance_price_shards', '--dry-run', stdout=out)
+        assert 'brand 2: default -> prices_shard_1' in out.getvalue()
+        assert count_rows(Price, 'default') == 8
+
+        with committed():
+            call_command('rebalance_price_shards', '--batch-size', '3', stdout=out)
+        assert count_rows(Price, 'default') == 0
+        assert count_rows(PriceSegment, 'default') == 0
+        assert count_rows(Price, 'prices_shard_1', brand_id=2) == 4
+        assert count_rows(PriceSegment, 'prices_shard_2', brand_id=3) > 0
+
+        application_date = datetime(2020, 6, 15, 10, 0, 0, tzinfo=pytz.UTC)
+        assert resolve_price_from_orm(35455, 3, application_date).price_list == 3
+        assert float(self.get_price(2).data['price']) == 26.45
+
+    # Test 6: generate_prices --clear borra los precios de todos los shards
+    def test_generate_prices_clears_every_shard(self, shard_map, create_new_prices):
+        out = io.StringIO()
+        call_command('generate_prices', '--keys', '5', '--clear', stdout=out)
+
+        assert 'Generated' in out.getvalue()
+        assert not Price.objects.using('prices_shard_1').filter(product_id=35455).exists()
+        assert not Price.objects.using('prices_shard_2').filter(product_id=35455).exists()
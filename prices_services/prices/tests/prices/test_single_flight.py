@@ -0,0 +1,229 @@
+import asyncio
+import threading
+import time
+import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory
+from datetime import datetime, timezone
+from prices import views_api
+from prices.metrics import registry
+from prices.singleflight import AsyncSingleFlight, SingleFlight, async_price_flights, price_flights
+from prices.timeline import ResolvedPrice, Segment
+from prices.views_api import PriceView
+
+THREADS = 8
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_concurrently(flight, function, key='key'):
+    """Lanza THREADS llamadas con la misma clave y devuelve sus resultados o excepciones."""
+    results = [None] * THREADS
+
+    def call(index):
+        try:
+            results[index] = flight.do(key, function)
+        except Exception as exc:
+            results[index] = exc
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+# Test 1: las llamadas concurrentes con la misma clave ejecutan la función una vez
+def test_threads_share_one_call():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    def resolve():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    threads, results = run_concurrently(flight, resolve)
+    wait_for(lambda: flight.stats()['coalesced'] == THREADS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {'executed': 1, 'coalesced': THREADS - 1}
+
+    # Terminada la llamada, la siguiente vuelve a ejecutar la función
+    flight.do('key', resolve)
+    assert len(calls) == 2
+
+
+# Test 2: la excepción de la llamada llega a todas las que esperaban
+def test_threads_share_errors():
+    flight, release = SingleFlight(), threading.Event()
+
+    def resolve():
+        release.wait(5)
+        raise LookupError("boom")
+
+    threads, results = run_concurrently(flight, resolve)
+    wait_for(lambda: flight.stats()['coalesced'] == THREADS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(result, LookupError) for result in results)
+    assert flight.do('key', lambda: 'recovered') == 'recovered'
+
+
+# Test 3: versión asíncrona: una ejecución, errores compartidos y claves distintas por separado
+def test_async_share_one_call():
+    flight, calls = AsyncSingleFlight(), []
+
+    async def resolve(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        if value == 'error':
+            raise LookupError(value)
+        return [value]
+
+    async def main():
+        results = await asyncio.gather(
+            *(flight.do('a', resolve, 'a') for _ in range(THREADS)),
+            flight.do('b', resolve, 'b'),
+        )
+        errors = await asyncio.gather(*(flight.do('c', resolve, 'error') for _ in range(3)), return_exceptions=True)
+        return results, errors
+
+    results, errors = async_to_sync(main)()
+    assert all(result is results[0] for result in results[:THREADS])
+    assert results[THREADS] == ['b']
+    assert all(isinstance(error, LookupError) for error in errors)
+    assert sorted(calls) == ['a', 'b', 'error']
+    assert flight.stats() == {'executed': 3, 'coalesced': THREADS - 1 + 2}
+
+
+# Test 4: cancelar una de las peticiones no cancela la resolución compartida
+def test_async_cancelled_waiter():
+    flight = AsyncSingleFlight()
+
+    async def resolve():
+        await asyncio.sleep(0.02)
+        return 'price'
+
+    async def main():
+        first = asyncio.ensure_future(flight.do('key', resolve))
+        second = asyncio.ensure_future(flight.do('key', resolve))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert async_to_sync(main)() == ('price', True)
+
+
+# Test 5: PriceView agrupa las peticiones idénticas concurrentes de varios hilos
+def test_price_view_coalesces_threads(settings, monkeypatch):
+    settings.PRICES_SINGLE_FLIGHT = True
+    release, calls = threading.Event(), []
+
+    def resolve(self, product_id, brand_id, application_date, segment=False):
+        calls.append(product_id)
+        release.wait(5)
+        return None
+
+    monkeypatch.setattr(PriceView, 'resolve', resolve)
+    view = PriceView.as_view()
+    request = APIRequestFactory().get('/api/price/', {
+        'product_id': 35455, 'brand_id': 1, 'application_date': '2020-06-14T10:00:00Z',
+    })
+    statuses = []
+    threads = [threading.Thread(target=lambda: statuses.append(view(request).status_code)) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: price_flights.stats()['coalesced'] == THREADS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [35455]
+    assert statuses == [404] * THREADS
+    assert f'prices_lookup_coalesced_total {THREADS - 1}' in registry.render()
+
+
+# Test 6: AsyncPriceView responde lo mismo a todas las peticiones agrupadas
+@pytest.mark.django_db
+def test_async_view_coalesces(create_new_prices, settings):
+    settings.PRICES_SINGLE_FLIGHT = True
+    query = {'product_id': 35455, 'brand_id': 2, 'application_date': '2020-06-14T16:00:00Z'}
+
+    async def fetch():
+        client = AsyncClient()
+        return await asyncio.gather(*(client.get(reverse('price-async-view'), query) for _ in range(THREADS)))
+
+    responses = async_to_sync(fetch)()
+    assert {(response.status_code, response.content) for response in responses} == {
+        (200, responses[0].content),
+    }
+    stats = async_price_flights.stats()
+    assert stats['executed'] + stats['coalesced'] == THREADS
+    assert stats['coalesced'] > 0
+
+
+# Test 7: se agrupan las consultas de la clave con fechas distintas dentro del mismo segundo
+def test_price_view_coalesces_same_second(settings, monkeypatch):
+    settings.PRICES_SINGLE_FLIGHT = True
+    release, calls = threading.Event(), []
+    row = ResolvedPrice(1, 35455, 1, 1, datetime(2020, 6, 14, tzinfo=timezone.utc),
+                        datetime(2020, 6, 15, tzinfo=timezone.utc), 3550, 2, 'EUR', 0)
+
+    def resolve_segment(product_id, brand_id, application_date):
+        calls.append(application_date)
+        release.wait(5)
+        return Segment(row.start_date, row.end_date, row)
+
+    monkeypatch.setattr(views_api, 'resolve_segment', resolve_segment)
+    view = PriceView.as_view()
+    requests = [
+        APIRequestFactory().get('/api/price/', {
+            'product_id': 35455, 'brand_id': 1, 'application_date': f'2020-06-14T10:00:00.{index:06d}Z',
+        })
+        for index in range(THREADS)
+    ]
+    prices = []
+    threads = [threading.Thread(target=lambda request=request: prices.append(view(request).data['price']))
+               for request in requests]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: price_flights.stats()['coalesced'] == THREADS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert prices == [35.50] * THREADS
+
+
+# Test 8: en un tramo que corta una frontera de precios cada fecha recibe su precio
+@pytest.mark.django_db
+def test_async_view_coalesces_only_covered_dates(create_new_prices, settings):
+    settings.PRICES_SINGLE_FLIGHT = True
+    # El precio de prioridad alta termina a las 18:30:00 (inclusive)
+    dates = ['2020-06-14T18:30:00Z', '2020-06-14T18:30:00.500000Z'] * (THREADS // 2)
+
+    async def fetch():
+        client = AsyncClient()
+        return await asyncio.gather(*(
+            client.get(reverse('price-async-view'), {'product_id': 35455, 'brand_id': 2, 'application_date': date})
+            for date in dates
+        ))
+
+    responses = async_to_sync(fetch)()
+    assert [response.json()['price'] for response in responses] == [26.45, 36.50] * (THREADS // 2)
+    stats = async_price_flights.stats()
+    assert stats['executed'] + stats['coalesced'] == THREADS
+    assert stats['coalesced'] > 0
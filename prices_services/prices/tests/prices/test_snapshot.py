@@ -0,0 +1,88 @@
+import io
+import json
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from prices.lookup import WINNER_ORDERING, resolve_price_from_orm
+from prices.models import Price
+from prices.snapshot import snapshot_prices
+from prices.synthetic import DEFAULT_START, create_synthetic_prices
+from prices.views_api import price_payload
+
+# 40 claves sintéticas: productos 1..10 con las marcas 1..4
+KEYS = 40
+
+
+@pytest.fixture
+def synthetic_prices(db):
+    create_synthetic_prices(KEYS, seed=3)
+
+
+def expected_snapshot(brand_id, application_date):
+    """Snapshot calculado producto a producto con la consulta de PriceView."""
+    prices = (resolve_price_from_orm(product_id, brand_id, application_date) for product_id in range(1, KEYS // 4 + 1))
+    return [price for price in prices if price is not None]
+
+
+@pytest.mark.django_db
+class TestPriceSnapshot:
+
+    def setup_method(self):
+        self.client = APIClient()
+
+    # Test 1: el recorrido ordenado devuelve el mismo ganador que PriceView para cada producto
+    @pytest.mark.parametrize('days', [0, 45, 180, 364])
+    def test_snapshot_matches_point_lookups(self, synthetic_prices, days):
+        application_date = DEFAULT_START + timedelta(days=days, hours=13)
+        for brand_id in (1, 2):
+            assert list(snapshot_prices(brand_id, application_date, chunk_size=7)) == expected_snapshot(brand_id, application_date)
+
+    # Test 2: el endpoint devuelve NDJSON en streaming con el formato de PriceView
+    def test_snapshot_endpoint(self, synthetic_prices):
+        application_date = DEFAULT_START + timedelta(days=100)
+        response = self.client.get(
+            reverse('price-snapshot-view'),
+            {'brand_id': 3, 'application_date': application_date.isoformat()}
+        )
+
+        assert response.status_code == 200
+        assert response.streaming
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = b''.join(response.streaming_content).splitlines()
+        expected = expected_snapshot(3, application_date)
+        assert lines == [JSONRenderer().render(price_payload(price)) for price in expected]
+
+    # Test 3: parámetros ausentes o inválidos
+    def test_snapshot_invalid_parameters(self):
+        response = self.client.get(reverse('price-snapshot-view'), {'brand_id': 3})
+        assert response.status_code == 400
+        assert json.loads(response.content) == {"error": "Missing parameters"}
+
+    # Test 4: el recorrido usa price_lookup_idx sin ordenar en memoria
+    def test_snapshot_query_plan(self, synthetic_prices):
+        queryset = Price.objects.filter(
+            brand_id=1,
+            start_date__lte=DEFAULT_START,
+            end_date__gte=DEFAULT_START,
+        ).order_by('product_id', *WINNER_ORDERING)
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = [row[-1] for row in cursor.fetchall()]
+
+        assert any('price_lookup_idx' in detail for detail in plan), plan
+        assert not any('TEMP B-TREE' in detail for detail in plan), plan
+
+    # Test 5: el comando escribe el snapshot en un fichero
+    def test_snapshot_command(self, synthetic_prices, tmp_path):
+        output = tmp_path / 'snapshot.ndjson'
+        application_date = DEFAULT_START + timedelta(days=200)
+
+        call_command('snapshot_prices', '2', application_date.isoformat(), '--output', str(output), stdout=io.StringIO())
+
+        records = [json.loads(line) for line in output.read_text().splitlines()]
+        assert [record['product_id'] for record in records] == [price.product_id for price in expected_snapshot(2, application_date)]
@@ -0,0 +1,88 @@
+import io
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+import pytz
+from datetime import datetime
+from prices.lookup import resolve_price_from_orm, resolve_price_from_timeline
+from prices.models import Price, PriceSegment
+
+
+@pytest.mark.django_db
+class TestPriceTimeline:
+
+    @pytest.fixture(autouse=True)
+    def timeline(self, timeline_backend):
+        # Con este backend las escrituras mantienen PriceSegment
+        self.client = APIClient()
+
+    # Test 1: los segmentos de cada clave no se solapan
+    def test_segments_do_not_overlap(self, create_new_prices):
+        for brand_id in (2, 3):
+            segments = list(
+                PriceSegment.objects.filter(product_id=35455, brand_id=brand_id).order_by('segment_start')
+            )
+            assert segments
+            for previous, following in zip(segments, segments[1:]):
+                assert previous.segment_end <= following.segment_start
+
+    # Test 2: la tabla devuelve lo mismo que el ORM
+    def test_timeline_matches_orm(self, application_dates):
+        for brand_id in (2, 3, 4):
+            for application_date in application_dates:
+                expected = resolve_price_from_orm(35455, brand_id, application_date)
+                found = resolve_price_from_timeline(35455, brand_id, application_date)
+                assert (found and found.source_id) == (expected and expected.pk), application_date
+
+    # Test 3: PriceView lee de la tabla con una única consulta
+    def test_view_uses_timeline(self, create_new_prices, settings, django_assert_num_queries):
+        settings.PRICES_LOOKUP_BACKEND = 'timeline'
+
+        with django_assert_num_queries(1):
+            response = self.client.get(
+                reverse('price-view'),
+                {
+                    'product_id': 35455,
+                    'brand_id': 3,
+                    'application_date': datetime(2020, 6, 15, 10, 0, 0, tzinfo=pytz.UTC).isoformat()
+                }
+            )
+        assert response.status_code == 200
+        assert response.data['price_list'] == 3
+        assert response.data['start_date'] == datetime(2020, 6, 15, 0, 0, 0, tzinfo=pytz.UTC)
+
+    # Test 4: un cambio en Price solo reconstruye su clave
+    def test_write_rebuilds_only_its_key(self, create_new_prices, committed):
+        untouched = set(PriceSegment.objects.filter(brand_id=3).values_list('pk', flat=True))
+
+        price = Price.objects.get(product_id=35455, brand_id=2, price_list=2)
+        price.end_date = datetime(2020, 6, 14, 15, 30, 0, tzinfo=pytz.UTC)
+        with committed():
+            price.save()
+
+        assert set(PriceSegment.objects.filter(brand_id=3).values_list('pk', flat=True)) == untouched
+        application_date = datetime(2020, 6, 14, 16, 0, 0, tzinfo=pytz.UTC)
+        assert resolve_price_from_timeline(35455, 2, application_date).price_list == 1
+
+        with committed():
+            price.delete()
+        assert not PriceSegment.objects.filter(source_id=price.pk).exists()
+
+    # Test 5: el comando reconstruye la tabla completa
+    def test_rebuild_command(self, create_new_prices):
+        expected = sorted(PriceSegment.objects.values_list('product_id', 'brand_id', 'segment_start', 'segment_end', 'source_id'))
+        PriceSegment.objects.all().delete()
+
+        out = io.StringIO()
+        call_command('rebuild_price_timeline', stdout=out)
+
+        assert f"Rebuilt {len(expected)} price segments." in out.getvalue()
+
+        assert sorted(PriceSegment.objects.values_list('product_id', 'brand_id', 'segment_start', 'segment_end', 'source_id')) == expected
+
+
+# Test 6: con otros backends las escrituras no mantienen PriceSegment
+@pytest.mark.django_db
+def test_other_backends_skip_segments(create_new_prices):
+    assert not PriceSegment.objects.exists()
@@ -0,0 +1,106 @@
+import pytest
+from datetime import datetime
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+import pytz
+from prices import warmup
+from prices.index import price_index
+from prices.lookup import resolve_price, resolve_prices
+from prices.metrics import registry
+from prices.models import Price
+
+APPLICATION_DATE = datetime(2020, 6, 14, 16, 0, 0, tzinfo=pytz.UTC)
+
+
+@pytest.fixture(autouse=True)
+def reset_warmup(monkeypatch):
+    monkeypatch.setattr(warmup, 'last_warmup', None)
+    # Cerrar las conexiones rompería la transacción de cada prueba
+    monkeypatch.setattr(connections, 'close_all', lambda: None)
+
+
+@pytest.mark.django_db
+class TestWarmup:
+
+    # Test 1: con el ORM se recorre price_lookup_idx y se resuelve un precio por clave
+    def test_orm_warmup_scans_index_and_exercises_view(self, settings, create_new_prices):
+        settings.PRICES_LOOKUP_BACKEND = 'orm'
+        stats = warmup.warm_up(budget=10, requests=50)
+
+        assert stats.backend == 'orm'
+        assert stats.preload == 'pages'
+        assert stats.rows == 8
+        assert stats.requests == 2
+        assert not stats.budget_exceeded
+        assert warmup.last_warmup is stats
+        assert 'prices_warmup_requests 2' in registry.render()
+
+    # Test 2: con el índice en memoria se carga completo antes de la primera petición
+    def test_index_warmup_preloads(self, settings, create_new_prices):
+        settings.PRICES_LOOKUP_BACKEND = 'index'
+        stats = warmup.warm_up(budget=10)
+
+        assert stats.preload == 'index'
+        assert price_index.loaded
+        with CaptureQueriesContext(connection) as queries:
+            assert resolve_price(35455, 2, APPLICATION_DATE).price_list == 2
+        assert len(queries) == 0
+
+    # Test 3: agotado el presupuesto no se hacen peticiones de calentamiento
+    def test_budget_exceeded(self, settings, create_new_prices):
+        settings.PRICES_LOOKUP_BACKEND = 'orm'
+        stats = warmup.warm_up(budget=0)
+        assert stats.budget_exceeded
+        assert stats.requests == 0
+
+    # Test 4: desde ready() solo se calienta con PRICES_WARMUP y los errores no impiden arrancar
+    def test_startup_hook(self, settings, tmp_path, create_new_prices):
+        settings.PRICES_WARMUP = False
+        assert warmup.warm_up_on_startup() is None
+        assert warmup.last_warmup is None
+
+        settings.PRICES_WARMUP = True
+        settings.PRICES_LOOKUP_BACKEND = 'snapshot'
+        settings.PRICES_SNAPSHOT_PATH = tmp_path / 'missing.snapshot'
+        assert warmup.warm_up_on_startup() is None
+
+        settings.PRICES_LOOKUP_BACKEND = 'timeline'
+        assert warmup.warm_up_on_startup().requests == 2
+
+
+@pytest.mark.django_db
+class TestLazyIndex:
+
+    @pytest.fixture(autouse=True)
+    def lazy_index(self, settings):
+        settings.PRICES_LOOKUP_BACKEND = 'index'
+        settings.PRICES_INDEX_LAZY = True
+
+    # Test 5: cada clave se lee en su primera consulta y después se sirve de memoria
+    def test_lazy_loads_key_on_first_access(self, create_new_prices, django_assert_num_queries):
+        # La primera lectura anota además la revisión del registro de cambios
+        with django_assert_num_queries(2):
+            assert resolve_price(35455, 2, APPLICATION_DATE).price_list == 2
+        with django_assert_num_queries(0):
+            assert resolve_price(35455, 2, APPLICATION_DATE).price_list == 2
+        # Las claves sin precios también se recuerdan
+        with django_assert_num_queries(1):
+            assert resolve_price(1, 1, APPLICATION_DATE) is None
+        with django_assert_num_queries(0):
+            assert resolve_price(1, 1, APPLICATION_DATE) is None
+        assert not price_index.loaded
+
+    # Test 6: una escritura descarta la clave y se vuelve a leer con el valor nuevo
+    def test_lazy_key_refreshed_after_write(self, create_new_prices, committed):
+        assert resolve_price(35455, 2, APPLICATION_DATE).price_list == 2
+        with committed():
+            Price.objects.filter(brand_id=2, price_list=2).get().delete()
+        assert resolve_price(35455, 2, APPLICATION_DATE).price_list == 1
+
+    # Test 7: un lote carga juntas las claves que faltan
+    def test_lazy_batch_loads_missing_keys_together(self, create_new_prices, django_assert_num_queries):
+        resolve_price(35455, 2, APPLICATION_DATE)
+        queries = [(35455, brand_id, APPLICATION_DATE) for brand_id in (2, 3, 4)]
+        with django_assert_num_queries(1):
+            found = resolve_prices(queries)
+        assert [price and price.price_list for price in found] == [2, 2, None]
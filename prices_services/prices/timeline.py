@@ -0,0 +1,119 @@
+import heapq
+from bisect import bisect_right
+from collections import namedtuple
+from operator import attrgetter
+from datetime import datetime, timedelta, timezone
+
+from .currencies import from_minor
+
+# Un segmento es un intervalo semiabierto [start, end) en el que `row` es el
+# precio ganador (el de mayor prioridad entre los vigentes).
+Segment = namedtuple('Segment', ['start', 'end', 'row'])
+
+
+class ResolvedPrice(namedtuple(
+    'ResolvedPrice',
+    ['pk', 'product_id', 'brand_id', 'price_list', 'start_date', 'end_date',
+     'price_minor', 'price_exponent', 'curr', 'priority'],
+)):
+    """
+    Precio resuelto fuera del ORM (almacén columnar, snapshot binario), con los
+    atributos de Price que usan las respuestas.
+    """
+    __slots__ = ()
+
+    @property
+    def price(self):
+        return from_minor(self.price_minor, self.price_exponent)
+
+
+# `end_date` es inclusivo en la consulta de PriceView (end_date >= fecha), por
+# lo que el final semiabierto equivalente es el microsegundo siguiente.
+RESOLUTION = timedelta(microseconds=1)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def exclusive_end(end_date):
+    """Convierte un `end_date` inclusivo en el final de un intervalo semiabierto."""
+    return end_date + RESOLUTION
+
+
+def epoch_us(value):
+    """Microsegundos desde epoch de una fecha con zona horaria."""
+    return (value - EPOCH) // RESOLUTION
+
+
+def from_epoch_us(value):
+    """Fecha UTC a partir de microsegundos desde epoch."""
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+def priority_key(row, seq=0):
+    """
+    Clave de orden del ganador, equivalente a `WINNER_ORDERING` en lookup.py:
+    mayor prioridad, después el inicio más reciente, el final más próximo y,
+    por último, el menor id.
+    """
+    return (-row.priority, -epoch_us(row.start_date), row.end_date, row.pk if row.pk is not None else 0, seq)
+
+
+def build_segments(rows):
+    """
+    Aplana los precios de una misma clave (product_id, brand_id) en segmentos
+    no solapados mediante un barrido con un heap sobre la prioridad.
+
+    Devuelve la lista de segmentos ordenada por `start`; los huecos sin precio
+    vigente no generan segmento. El coste es O(n log n) en el número de filas.
+    """
+    rows = sorted(rows, key=lambda row: row.start_date)
+    if not rows:
+        return []
+
+    # Fronteras en las que el ganador puede cambiar: inicios y finales de cada fila
+    boundaries = sorted({row.start_date for row in rows} | {exclusive_end(row.end_date) for row in rows})
+
+    segments = []
+    heap = []
+    next_row = 0
+    for position, boundary in enumerate(boundaries[:-1]):
+        # Activa las filas que empiezan en esta frontera
+        while next_row < len(rows) and rows[next_row].start_date <= boundary:
+            row = rows[next_row]
+            heapq.heappush(heap, (priority_key(row, next_row), exclusive_end(row.end_date), row))
+            next_row += 1
+
+        # Descarta de forma perezosa las filas ya vencidas
+        while heap and heap[0][1] <= boundary:
+            heapq.heappop(heap)
+
+        if not heap:
+            continue
+
+        winner = heap[0][2]
+        following = boundaries[position + 1]
+        if segments and segments[-1].row is winner and segments[-1].end == boundary:
+            # Fusiona segmentos contiguos con el mismo ganador
+            segments[-1] = segments[-1]._replace(end=following)
+        else:
+            segments.append(Segment(boundary, following, winner))
+
+    return segments
+
+
+def find_segment(segments, application_date):
+    """Busca por bisección el segmento que contiene la fecha o devuelve None."""
+    position = bisect_right(segments, application_date, key=attrgetter('start')) - 1
+    if position >= 0 and application_date < segments[position].end:
+        return segments[position]
+    return None
+
+
+def clip_segments(segments, start, end):
+    """Recorta segmentos ordenados a la ventana semiabierta [start, end)."""
+    clipped = []
+    for segment in segments:
+        if segment.end <= start or segment.start >= end:
+            continue
+        clipped.append(Segment(max(segment.start, start), min(segment.end, end), segment.row))
+    return clipped
@@ -1,6 +1,13 @@
 from django.urls import path
-from .views_api import PriceView
+from .views_api import AsyncPriceView, PriceBatchView, PriceBulkView, PriceCacheStatsView, PriceChangesView, PriceHistoryView, PriceSnapshotView, PriceView
 
 urlpatterns = [
     path('price/', PriceView.as_view(), name='price-view'),  # endpoint API
+    path('price/async/', AsyncPriceView.as_view(), name='price-async-view'),  # versión asíncrona (ASGI)
+    path('price/batch/', PriceBatchView.as_view(), name='price-batch-view'),  # resolución por lotes
+    path('price/bulk/', PriceBulkView.as_view(), name='price-bulk-view'),  # upsert de precios en bloque
+    path('price/history/', PriceHistoryView.as_view(), name='price-history-view'),  # segmentos en una ventana [from, to)
+    path('price/snapshot/', PriceSnapshotView.as_view(), name='price-snapshot-view'),  # snapshot NDJSON de una marca
+    path('price/changes/', PriceChangesView.as_view(), name='price-changes-view'),  # registro de cambios desde una revisión
+    path('price/cache/stats/', PriceCacheStatsView.as_view(), name='price-cache-stats'),  # aciertos/fallos de la caché
 ]
@@ -0,0 +1,17 @@
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.db.models import Q
+
+
+def chunked(iterable, size):
+    """Divide un iterable en listas de como mucho `size` elementos, sin materializarlo."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def key_filter(keys):
+    """Filtro Q que selecciona las filas de un conjunto de claves (product_id, brand_id)."""
+    return reduce(or_, (Q(product_id=product_id, brand_id=brand_id) for product_id, brand_id in keys))
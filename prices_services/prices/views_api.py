@@ -1,53 +1,613 @@
+from rest_framework.permissions import IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import Price
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.views import View
+from .archive import price_archive
+from .bloom import price_key_bloom
+from .cache import PriceEntry, price_cache
+from .changes import change_lines, current_revision
+from .currencies import currency_exponent, from_minor
+from .encoding import encode_converted_payload, encoded_price, price_payload
+from .fx import UnknownCurrency, fx_rates
+from .lookup import aresolve_price, aresolve_segment, price_history, resolve_price, resolve_prices, resolve_segment
+from .metrics import registry
+from .models import MAX_KEY_ID
+from .middleware import record_serialization
+from .serializers import PriceQuerySerializer, PriceSerializer
+from .singleflight import async_price_flights, price_flights
+from .snapshot import snapshot_lines
+from .timeline import epoch_us
 from django.utils.dateparse import parse_datetime
-from django.http import Http404
+from django.utils.functional import cached_property
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+import hashlib
+import time
 import pytz
 
+# Cabeceras Accept que resuelven siempre a JSONRenderer sin negociar
+JSON_ACCEPT = frozenset(['', '*/*', 'application/json'])
+
+
+class InvalidPriceQuery(ValueError):
+    """Parámetros de consulta de precio ausentes o mal formados."""
+
+
+def parse_price_query(params):
+    """Valida los parámetros de PriceView y devuelve (product_id, brand_id, application_date)."""
+    # Obtener parámetros de la URL
+    product_id = params.get('product_id')
+    brand_id = params.get('brand_id')
+    application_date = params.get('application_date')
+
+    # Valida que los parámetros estén presentes
+    if not product_id or not brand_id or not application_date:
+        raise InvalidPriceQuery("Missing parameters")
+
+    application_date = parse_application_date(application_date)
+    return parse_key_id(product_id), parse_key_id(brand_id), application_date
+
+
+def parse_key_id(value):
+    """Valida un product_id o brand_id: un entero en el rango de la columna (0..MAX_KEY_ID)."""
+    try:
+        value = int(value)
+    except ValueError:
+        raise InvalidPriceQuery("Invalid parameters")
+    if not 0 <= value <= MAX_KEY_ID:
+        raise InvalidPriceQuery("Invalid parameters")
+    return value
+
+
+def parse_snapshot_query(params):
+    """Valida los parámetros de PriceSnapshotView y devuelve (brand_id, application_date)."""
+    brand_id = params.get('brand_id')
+    application_date = params.get('application_date')
+
+    if not brand_id or not application_date:
+        raise InvalidPriceQuery("Missing parameters")
+
+    application_date = parse_application_date(application_date)
+    return parse_key_id(brand_id), application_date
+
+
+def parse_history_query(params):
+    """Valida los parámetros de PriceHistoryView y devuelve (product_id, brand_id, from, to)."""
+    product_id = params.get('product_id')
+    brand_id = params.get('brand_id')
+    date_from = params.get('from')
+    date_to = params.get('to')
+
+    if not product_id or not brand_id or not date_from or not date_to:
+        raise InvalidPriceQuery("Missing parameters")
+
+    date_from = parse_application_date(date_from)
+    date_to = parse_application_date(date_to)
+    if date_from >= date_to:
+        raise InvalidPriceQuery("Invalid date range")
+    return parse_key_id(product_id), parse_key_id(brand_id), date_from, date_to
+
+
+def parse_changes_query(params):
+    """Valida los parámetros de PriceChangesView y devuelve (since, limit)."""
+    since = params.get('since')
+    if since is None or since == '':
+        raise InvalidPriceQuery("Missing parameters")
+
+    max_items = getattr(settings, 'PRICES_CHANGES_MAX_ITEMS', 10000)
+    try:
+        since = int(since)
+        limit = min(int(params.get('limit', max_items)), max_items)
+    except ValueError:
+        raise InvalidPriceQuery("Invalid parameters")
+    if since < 0 or limit < 1:
+        raise InvalidPriceQuery("Invalid parameters")
+    return since, limit
+
+
+def parse_target_currency(params):
+    """Moneda a la que convertir los precios (`target_currency`) o None si no se pide conversión."""
+    currency = params.get('target_currency')
+    if not currency:
+        return None
+    currency = currency.upper()
+    if len(currency) != 3 or not currency.isalpha():
+        raise InvalidPriceQuery("Invalid currency")
+    return currency
+
+
+def fx_table_for(currency):
+    """Tabla de tipos vigente; falla si no hay tipo de cambio para la moneda de destino."""
+    table = fx_rates.current()
+    if currency not in table:
+        raise UnknownCurrency(currency)
+    return table
+
+
+def parse_application_date(value):
+    """Parsea la fecha de aplicación; sin zona horaria se interpreta en UTC."""
+    application_date = parse_datetime(value)
+    if not application_date:
+        raise InvalidPriceQuery("Invalid date format")
+
+    # Asegurar de que la fecha tenga zona horaria
+    if application_date.tzinfo is None:
+        application_date = application_date.replace(tzinfo=pytz.UTC)
+    return application_date
+
+
+class PriceJSONResponse(HttpResponse):
+    """
+    Respuesta JSON de un PriceEntry con el cuerpo ya codificado. Expone en
+    `data` los datos de la respuesta, igual que la Response de DRF, pero solo
+    se construyen (con el precio como Decimal) si alguien los lee.
+    """
+
+    def __init__(self, entry, **kwargs):
+        super().__init__(entry_body(entry), content_type='application/json', **kwargs)
+        self._entry = entry
+
+    @cached_property
+    def data(self):
+        return entry_payload(self._entry)
+
+
 class PriceView(APIView):
     """Vista para gestionar los precios según la marca, producto y fecha de aplicación."""
 
+    def perform_content_negotiation(self, request, force=False):
+        # Los clientes JSON, la inmensa mayoría, no necesitan negociación
+        if request.META.get('HTTP_ACCEPT', '') in JSON_ACCEPT and api_settings.URL_FORMAT_OVERRIDE not in request.query_params:
+            return JSONRenderer(), JSONRenderer.media_type
+        return super().perform_content_negotiation(request, force)
+
     def get(self, request, *args, **kwargs):
-        # Obtener parámetros de la URL
-        product_id = request.query_params.get('product_id')
-        brand_id = request.query_params.get('brand_id')
-        application_date = request.query_params.get('application_date')
-
-        # Valida que los parámetros estén presentes
-        if not product_id or not brand_id or not application_date:
-            return Response({"error": "Missing parameters"}, status=400)
-
-        # Parsea la fecha de aplicación
-        application_date = parse_datetime(application_date)
-        if not application_date:
-            return Response({"error": "Invalid date format"}, status=400)
-
-        # Asegurar de que la fecha tenga zona horaria
-        if application_date.tzinfo is None:
-            application_date = application_date.replace(tzinfo=pytz.UTC)
-
-        # Buscar precios por producto y marca, ordenados por prioridad
-        prices = Price.objects.filter(
-            product_id=int(product_id),
-            brand_id=int(brand_id),
-            start_date__lte=application_date,
-            end_date__gte=application_date
-        ).order_by('-priority')
-
-        if not prices.exists():
+        try:
+            product_id, brand_id, application_date = parse_price_query(request.query_params)
+            target_currency = parse_target_currency(request.query_params)
+            fx_table = fx_table_for(target_currency) if target_currency else None
+        except (InvalidPriceQuery, UnknownCurrency) as exc:
+            return Response({"error": str(exc)}, status=400)
+
+        # Clave sin ningún precio: 404 sin consultar la base de datos (el filtro
+        # no conoce las claves que solo tienen precios archivados)
+        historical = archived_date(application_date)
+        if not historical and use_key_bloom() and not price_key_bloom.might_contain(product_id, brand_id):
+            return Response({"detail": "No price found"}, status=404)
+
+        shared = False
+        if coalesce_lookups():
+            # Las consultas concurrentes de la clave en el mismo tramo de fechas
+            # comparten la resolución del segmento si este contiene su fecha
+            flight_date, entry = price_flights.do(
+                flight_key(product_id, brand_id, application_date, historical),
+                self.resolve_flight, product_id, brand_id, application_date,
+            )
+            shared = flight_covers(flight_date, entry, application_date)
+        if not shared:
+            entry = self.resolve(product_id, brand_id, application_date)
+        if entry is None:
             raise Http404("No price found")
 
-        highest_priority_price = prices.first()
+        if target_currency:
+            try:
+                entry = converted_entry(entry, target_currency, fx_table)
+            except UnknownCurrency as exc:
+                return Response({"error": str(exc)}, status=400)
+
+        if entry.end is None or http_max_age() <= 0:
+            return price_response(request, entry)
+
+        # Validación condicional: si el cliente ya tiene esta respuesta no se codifica
+        etag = entry_etag(entry)
+        response = get_conditional_response(request, etag=etag) or price_response(request, entry)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=validity_max_age(entry, application_date))
+        return response
+
+    def resolve(self, product_id, brand_id, application_date, segment=False):
+        """
+        Resuelve la respuesta como PriceEntry: desde la caché si está activada
+        y, si hacen falta las cabeceras de caché HTTP o `segment`, con el
+        segmento completo. Las fechas anteriores al horizonte del archivo se
+        resuelven entre Price y el archivo, sin caché ni segmento.
+        """
+        if archived_date(application_date):
+            historical_price = price_archive.resolve(product_id, brand_id, application_date)
+            return None if historical_price is None else price_entry(historical_price)
+
+        if price_cache.enabled:
+            entry, generation = price_cache.get(product_id, brand_id, application_date)
+            if entry is None:
+                entry = segment_entry(resolve_segment(product_id, brand_id, application_date))
+                if entry is not None:
+                    # Se guarda ya codificada: los aciertos no vuelven a codificar
+                    entry = entry._replace(body=entry_body(entry))
+                    price_cache.set(product_id, brand_id, entry, generation)
+            return entry
+
+        if segment or http_max_age() > 0:
+            # Se resuelve el segmento completo para saber hasta cuándo vale la respuesta
+            return segment_entry(resolve_segment(product_id, brand_id, application_date))
+
+        # Resolver el precio de mayor prioridad con el backend configurado
+        highest_priority_price = resolve_price(product_id, brand_id, application_date)
+        if highest_priority_price is None:
+            return None
+        return price_entry(highest_priority_price)
+
+    def resolve_flight(self, product_id, brand_id, application_date):
+        """Resolución compartida por las consultas agrupadas: la fecha resuelta y su respuesta con el segmento."""
+        return application_date, self.resolve(product_id, brand_id, application_date, segment=True)
+
+
+class PriceCacheStatsView(APIView):
+    """Contadores de aciertos y fallos de la caché de respuestas de PriceView."""
+
+    def get(self, request, *args, **kwargs):
+        return Response(price_cache.stats())
+
+
+class MetricsView(View):
+    """Métricas del proceso (latencias, consultas, serialización y caché) en formato de texto de Prometheus."""
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class AsyncPriceView(View):
+    """
+    Versión asíncrona de PriceView para el despliegue ASGI: se ejecuta en el
+    bucle de eventos sin pasar por un hilo y consulta con el ORM asíncrono.
+    Devuelve exactamente los mismos bytes que PriceView para la misma consulta.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            product_id, brand_id, application_date = parse_price_query(request.GET)
+            target_currency = parse_target_currency(request.GET)
+            # La tabla de tipos solo consulta la base de datos al comprobar su versión
+            fx_table = (fx_rates.fresh() or await sync_to_async(fx_rates.current)()) if target_currency else None
+            if target_currency and target_currency not in fx_table:
+                raise UnknownCurrency(target_currency)
+        except (InvalidPriceQuery, UnknownCurrency) as exc:
+            return json_response({"error": str(exc)}, status=400)
+
+        historical = False
+        if use_archive():
+            # El horizonte solo se lee de la base de datos cuando caduca
+            historical = (price_archive.covers(application_date) if price_archive.fresh()
+                          else await sync_to_async(price_archive.covers)(application_date))
+
+        if not historical and use_key_bloom():
+            # El filtro solo consulta la base de datos al ponerse al día con el registro de cambios
+            bloom = price_key_bloom.fresh() or await sync_to_async(price_key_bloom.current)()
+            if not price_key_bloom.contains(bloom, product_id, brand_id):
+                return json_response({"detail": "No price found"}, status=404)
+
+        shared = False
+        if coalesce_lookups():
+            flight_date, entry = await async_price_flights.do(
+                flight_key(product_id, brand_id, application_date, historical),
+                aresolve_flight, historical, product_id, brand_id, application_date,
+            )
+            shared = flight_covers(flight_date, entry, application_date)
+        if not shared:
+            resolve = price_archive.aresolve if historical else aresolve_price
+            highest_priority_price = await resolve(product_id, brand_id, application_date)
+            entry = None if highest_priority_price is None else price_entry(highest_priority_price)
+
+        if entry is None:
+            return json_response({"detail": "No price found"}, status=404)
+
+        if target_currency:
+            try:
+                entry = converted_entry(entry, target_currency, fx_table)
+            except UnknownCurrency as exc:
+                return json_response({"error": str(exc)}, status=400)
+        return PriceJSONResponse(entry)
+
+
+class PriceSnapshotView(View):
+    """
+    Precio vigente de todos los productos de una marca en una fecha, en NDJSON
+    (una línea por producto, mismo formato que PriceView). La respuesta se
+    genera en streaming a partir de un único recorrido ordenado de la tabla
+    (y del archivo, mezclados, si la fecha es anterior a su horizonte).
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            brand_id, application_date = parse_snapshot_query(request.GET)
+            target_currency = parse_target_currency(request.GET)
+            fx_table = fx_table_for(target_currency) if target_currency else None
+        except (InvalidPriceQuery, UnknownCurrency) as exc:
+            return json_response({"error": str(exc)}, status=400)
+
+        prices = price_archive.snapshot(brand_id, application_date) if archived_date(application_date) else None
+        return StreamingHttpResponse(
+            snapshot_lines(brand_id, application_date, target_currency=target_currency, fx_table=fx_table, prices=prices),
+            content_type='application/x-ndjson',
+        )
+
+
+class PriceChangesView(View):
+    """
+    Cambios de Price posteriores a la revisión `since`, en NDJSON y en orden de
+    revisión (como mucho `limit`). La cabecera X-Price-Revision indica la
+    última revisión al empezar la respuesta: si la última línea recibida es
+    anterior, quedan cambios y se vuelve a pedir desde esa línea.
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            since, limit = parse_changes_query(request.GET)
+        except InvalidPriceQuery as exc:
+            return json_response({"error": str(exc)}, status=400)
+
+        # Se fija la revisión final antes de leer para que la respuesta sea un rango cerrado
+        head = current_revision()
+        response = StreamingHttpResponse(
+            change_lines(since, until=head, limit=limit),
+            content_type='application/x-ndjson',
+        )
+        response['X-Price-Revision'] = str(head)
+        return response
+
+
+def json_response(data, status=200):
+    """Respuesta JSON renderizada igual que las de DRF, sin negociación de contenido."""
+    return HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+class PriceBatchView(APIView):
+    """Vista para resolver en una sola petición una lista de consultas de precio."""
+
+    def post(self, request, *args, **kwargs):
+        # El cuerpo es una lista de {product_id, brand_id, application_date}
+        if not isinstance(request.data, list):
+            return Response({"error": "Expected a list of queries"}, status=400)
+
+        max_items = getattr(settings, 'PRICES_BATCH_MAX_ITEMS', 1000)
+        if len(request.data) > max_items:
+            return Response({"error": f"Too many queries (max {max_items})"}, status=400)
+
+        try:
+            target_currency = parse_target_currency(request.query_params)
+            fx_table = fx_table_for(target_currency) if target_currency else None
+        except (InvalidPriceQuery, UnknownCurrency) as exc:
+            return Response({"error": str(exc)}, status=400)
+
+        serializer = PriceQuerySerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        queries = [
+            (item['product_id'], item['brand_id'], item['application_date'])
+            for item in serializer.validated_data
+        ]
+
+        # Se resuelve el lote completo de una vez, con las mismas reglas que PriceView
+        prices = resolve_prices(queries)
+        if use_archive():
+            # Las fechas anteriores al horizonte del archivo también leen ArchivedPrice
+            prices = price_archive.resolve_batch(queries, prices)
+        if target_currency:
+            # Conversión vectorizada de todos los precios encontrados
+            found = [price for price in prices if price is not None]
+            amounts = iter(fx_table.convert_many(
+                [price.price_minor for price in found], [price.price_exponent for price in found],
+                [price.curr for price in found], target_currency,
+            ))
+            exponent = currency_exponent(target_currency)
+
+        results = []
+        for query, price in zip(queries, prices):
+            if price is None:
+                results.append({
+                    "product_id": query[0],
+                    "brand_id": query[1],
+                    "application_date": query[2],
+                    "error": "No price found",
+                })
+            elif target_currency is None:
+                results.append(price_payload(price))
+            else:
+                amount = next(amounts)
+                if amount is None:
+                    results.append({
+                        "product_id": query[0],
+                        "brand_id": query[1],
+                        "application_date": query[2],
+                        "error": str(UnknownCurrency(price.curr)),
+                    })
+                else:
+                    results.append({**price_payload(price), "price": from_minor(amount, exponent), "curr": target_currency})
+
+        return Response(results)
+
+
+class PriceBulkView(APIView):
+    """
+    Vista de escritura de precios en bloque: valida la lista con PriceSerializer
+    y la aplica como un upsert sobre (product_id, brand_id, price_list), sin
+    consultas por fila. Solo para usuarios del staff.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        # El cuerpo es una lista de precios con los campos de PriceSerializer
+        if not isinstance(request.data, list):
+            return Response({"error": "Expected a list of prices"}, status=400)
+
+        max_items = getattr(settings, 'PRICES_BULK_MAX_ITEMS', 5000)
+        if len(request.data) > max_items:
+            return Response({"error": f"Too many prices (max {max_items})"}, status=400)
+
+        serializer = PriceSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response({"written": serializer.written})
+
+
+class PriceHistoryView(APIView):
+    """
+    Historial de precios de un producto y marca en la ventana [from, to): la
+    secuencia de segmentos en los que cada precio es el ganador, recortados a
+    la ventana. Los huecos sin precio vigente no aparecen. Si la ventana
+    empieza antes del horizonte del archivo, incluye los precios archivados.
+    """
+
+    def get(self, request, *args, **kwargs):
+        try:
+            product_id, brand_id, date_from, date_to = parse_history_query(request.query_params)
+        except InvalidPriceQuery as exc:
+            return Response({"error": str(exc)}, status=400)
+
+        if archived_date(date_from):
+            segments = price_archive.history(product_id, brand_id, date_from, date_to)
+        else:
+            segments = price_history(product_id, brand_id, date_from, date_to)
+        return Response([
+            {
+                "segment_start": segment.start,
+                "segment_end": segment.end,
+                **price_payload(segment.row),
+            }
+            for segment in segments
+        ])
+
+
+def segment_entry(segment):
+    """Respuesta de un segmento resuelto, con su intervalo de validez."""
+    if segment is None:
+        return None
+    return price_entry(segment.row, segment.start, segment.end)
+
+
+def price_entry(row, start=None, end=None):
+    """Respuesta de un precio resuelto, válida en [start, end) si se conoce el segmento (sin codificar)."""
+    return PriceEntry(start, end, row, row.curr, row.price_minor, row.price_exponent)
+
+
+def converted_entry(entry, target_currency, fx_table):
+    """Respuesta con el precio de `entry` convertido a `target_currency` y la moneda en "curr"."""
+    minor = fx_table.convert(entry.price_minor, entry.price_exponent, entry.curr, target_currency)
+    exponent = currency_exponent(target_currency)
+    return entry._replace(
+        curr=target_currency, price_minor=minor, price_exponent=exponent, converted=True, body=None,
+    )
+
+
+def entry_payload(entry):
+    """Datos de la respuesta de `entry`, con el precio convertido y "curr" si se convirtió."""
+    payload = price_payload(entry.row)
+    if entry.converted:
+        payload.update(price=from_minor(entry.price_minor, entry.price_exponent), curr=entry.curr)
+    return payload
+
+
+def entry_body(entry):
+    """Cuerpo JSON de la respuesta de `entry`, codificado solo cuando se envía."""
+    if entry.body is not None:
+        return entry.body
+    started = time.perf_counter()
+    body = encode_converted_payload(entry_payload(entry)) if entry.converted else encoded_price(entry.row)
+    # Los cuerpos ya codificados no pasan por ningún renderer: se mide aquí
+    record_serialization(time.perf_counter() - started)
+    return body
+
+
+def use_archive():
+    """Si las consultas anteriores al horizonte del archivo leen también ArchivedPrice (`PRICES_ARCHIVE_LOOKUPS`)."""
+    return getattr(settings, 'PRICES_ARCHIVE_LOOKUPS', False)
+
+
+def archived_date(application_date):
+    """Si la consulta de esa fecha tiene que leer también el archivo."""
+    return use_archive() and price_archive.covers(application_date)
+
+
+def use_key_bloom():
+    """Si PriceView descarta con el filtro de Bloom las claves sin precios (`PRICES_KEY_BLOOM`)."""
+    return getattr(settings, 'PRICES_KEY_BLOOM', False)
+
+
+def coalesce_lookups():
+    """Si las consultas concurrentes de una misma clave se agrupan en una (`PRICES_SINGLE_FLIGHT`)."""
+    return getattr(settings, 'PRICES_SINGLE_FLIGHT', False)
+
+
+def flight_key(product_id, brand_id, application_date, historical):
+    """
+    Clave de agrupación de una consulta: la clave del precio, el tramo de
+    PRICES_SINGLE_FLIGHT_GRANULARITY segundos que contiene la fecha y si es
+    anterior al horizonte del archivo (0 agrupa solo fechas idénticas).
+    """
+    granularity = int(getattr(settings, 'PRICES_SINGLE_FLIGHT_GRANULARITY', 1.0) * 1_000_000)
+    slot = epoch_us(application_date) // granularity if granularity > 0 else application_date
+    return product_id, brand_id, slot, historical
+
+
+def flight_covers(flight_date, entry, application_date):
+    """
+    Si la respuesta resuelta para `flight_date` vale para `application_date`:
+    la fecha es la misma o el segmento de la respuesta la contiene. Con un
+    tramo que corta una frontera de precios, el resto se resuelve aparte.
+    """
+    if flight_date == application_date:
+        return True
+    return entry is not None and entry.end is not None and entry.start <= application_date < entry.end
+
+
+async def aresolve_flight(historical, product_id, brand_id, application_date):
+    """Resolución compartida por AsyncPriceView: la fecha resuelta y su respuesta con el segmento."""
+    if historical:
+        historical_price = await price_archive.aresolve(product_id, brand_id, application_date)
+        return application_date, None if historical_price is None else price_entry(historical_price)
+    return application_date, segment_entry(await aresolve_segment(product_id, brand_id, application_date))
+
+
+def http_max_age():
+    """Máximo de `Cache-Control: max-age` de PriceView; 0 desactiva las cabeceras de caché HTTP."""
+    return getattr(settings, 'PRICES_HTTP_MAX_AGE', 0)
+
+
+def validity_max_age(entry, application_date):
+    """Segundos que la respuesta sigue siendo la ganadora desde la fecha consultada, acotados."""
+    remaining = int((entry.end - application_date).total_seconds())
+    return max(0, min(remaining, http_max_age()))
+
+
+def entry_etag(entry):
+    """
+    ETag fuerte de la respuesta sin codificarla: se calcula de la fila ganadora
+    (identidad y campos de la respuesta), el precio y la moneda que se envían
+    y el segmento, que determinan el cuerpo.
+    """
+    row = entry.row
+    identity = (
+        f"{row.pk}:{row.price_list}:{epoch_us(row.start_date)}:{epoch_us(row.end_date)}:"
+        f"{entry.price_minor}:{entry.price_exponent}:{entry.curr}:{entry.converted:d}:"
+        f"{epoch_us(entry.start)}:{epoch_us(entry.end)}"
+    )
+    return quote_etag(hashlib.blake2b(identity.encode(), digest_size=12).hexdigest())
 
-        # Formato de la respuesta
-        result = {
-            "product_id": highest_priority_price.product_id,
-            "brand_id": highest_priority_price.brand_id,
-            "price_list": highest_priority_price.price_list,
-            "start_date": highest_priority_price.start_date,
-            "end_date": highest_priority_price.end_date,
-            "price": highest_priority_price.price,
-        }
 
-        return Response(result)
+def price_response(request, entry):
+    """
+    Respuesta de un precio resuelto: con JSONRenderer y su formato por defecto se
+    envían directamente los bytes ya codificados de la entrada, que son idénticos
+    a los que produciría el renderer; solo los demás renderers, que pasan por
+    Response, necesitan los datos de la respuesta.
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    if (type(renderer) is JSONRenderer and request.accepted_media_type == JSONRenderer.media_type
+            and api_settings.COMPACT_JSON):
+        return PriceJSONResponse(entry)
+    return Response(entry_payload(entry))
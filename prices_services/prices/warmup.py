@@ -0,0 +1,183 @@
+import logging
+import time
+import warnings
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError, connections
+from django.test import RequestFactory
+from django.utils import timezone
+
+from .columnar import price_store
+from .index import price_index
+from .lookup import lookup_backend
+from .mmap_snapshot import price_snapshot
+from .models import Price, PriceSegment
+from .sharding import price_databases
+
+logger = logging.getLogger(__name__)
+
+# Resultado del último calentamiento del proceso (None si no se ha hecho)
+WarmupStats = namedtuple('WarmupStats', [
+    'backend',          # backend de consulta calentado
+    'preload',          # paso de precarga: 'index', 'columnar', 'snapshot', 'pages' o 'lazy'
+    'rows',             # filas de índice leídas para calentar las páginas de la base de datos
+    'requests',         # peticiones de calentamiento a PriceView
+    'duration',         # segundos desde el inicio hasta el final del calentamiento
+    'budget_exceeded',  # si se agotó PRICES_WARMUP_BUDGET antes de terminar
+])
+
+last_warmup = None
+
+# Filas leídas entre comprobaciones del tiempo restante al recorrer índices
+SCAN_CHUNK = 2000
+
+
+class Deadline:
+    """Presupuesto de tiempo del calentamiento."""
+
+    def __init__(self, seconds):
+        self.started = time.perf_counter()
+        self.seconds = seconds
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def expired(self):
+        return self.elapsed >= self.seconds
+
+
+def preload(backend, deadline):
+    """
+    Carga el estado del que depende el backend. Las estructuras en memoria se
+    cargan completas (la carga no se interrumpe a mitad aunque se agote el
+    presupuesto); con los backends que consultan la base de datos se recorre
+    su índice para traer sus páginas a memoria. Devuelve (paso, filas leídas).
+    """
+    if backend == 'index':
+        if getattr(settings, 'PRICES_INDEX_LAZY', False):
+            # Cada clave se carga en su primera consulta (también las de calentamiento)
+            return 'lazy', 0
+        price_index.load()
+        return 'index', 0
+    if backend == 'columnar':
+        price_store.load()
+        return 'columnar', 0
+    if backend == 'snapshot':
+        price_snapshot.current().prefetch()
+        return 'snapshot', 0
+    if backend == 'timeline':
+        return 'pages', scan_index(PriceSegment, ('product_id', 'brand_id', 'segment_end'), deadline)
+    return 'pages', scan_index(Price, ('brand_id', 'product_id', '-priority', '-start_date', 'end_date'), deadline)
+
+
+def scan_index(model, ordering, deadline):
+    """Recorre un índice (solo sus columnas) en cada shard hasta terminar o agotar el presupuesto."""
+    columns = [field.lstrip('-') for field in ordering]
+    rows = 0
+    for alias in price_databases():
+        queryset = model.objects.using(alias).order_by(*ordering).values_list(*columns)
+        for _ in queryset.iterator(chunk_size=SCAN_CHUNK):
+            rows += 1
+            if rows % SCAN_CHUNK == 0 and deadline.expired:
+                return rows
+    return rows
+
+
+def sample_keys(count):
+    """Hasta `count` claves (product_id, brand_id) existentes, repartidas entre los shards."""
+    keys = []
+    for alias in price_databases():
+        remaining = count - len(keys)
+        if remaining <= 0:
+            break
+        keys.extend(Price.objects.using(alias).order_by().values_list('product_id', 'brand_id').distinct()[:remaining])
+    return keys
+
+
+def exercise_lookups(keys, deadline):
+    """
+    Resuelve el precio actual de cada clave a través de PriceView completo
+    (parseo, backend, codificación de la respuesta) para cargar módulos y
+    cachés del proceso. Devuelve el número de peticiones hechas.
+    """
+    # Importación diferida: las vistas importan todo el camino de consulta
+    from .views_api import PriceView
+
+    view = PriceView.as_view()
+    factory = RequestFactory()
+    application_date = timezone.now().isoformat()
+    requests = 0
+    for product_id, brand_id in keys:
+        if deadline.expired:
+            break
+        view(factory.get('/api/price/', {
+            'product_id': product_id,
+            'brand_id': brand_id,
+            'application_date': application_date,
+        }))
+        requests += 1
+    return requests
+
+
+def warm_up(budget=None, requests=None):
+    """
+    Precarga los datos del backend configurado y calienta el camino de
+    consulta con peticiones a PriceView, dentro de un presupuesto de `budget`
+    segundos. Guarda y devuelve un WarmupStats.
+    """
+    global last_warmup
+    budget = getattr(settings, 'PRICES_WARMUP_BUDGET', 10.0) if budget is None else budget
+    requests = getattr(settings, 'PRICES_WARMUP_REQUESTS', 200) if requests is None else requests
+
+    deadline = Deadline(budget)
+    backend = lookup_backend()
+    step, rows = preload(backend, deadline)
+    done = exercise_lookups(sample_keys(requests), deadline) if not deadline.expired else 0
+
+    last_warmup = WarmupStats(
+        backend=backend,
+        preload=step,
+        rows=rows,
+        requests=done,
+        duration=deadline.elapsed,
+        budget_exceeded=deadline.expired,
+    )
+    log = logger.warning if last_warmup.budget_exceeded else logger.info
+    log(
+        "Price warm-up (%s, %s) finished in %.3fs: %d index rows, %d requests%s",
+        backend, step, last_warmup.duration, rows, done,
+        " (budget exceeded)" if last_warmup.budget_exceeded else "",
+    )
+    return last_warmup
+
+
+def warm_up_on_startup():
+    """
+    Calentamiento desde `PricesConfig.ready()` si PRICES_WARMUP está activo.
+
+    Se ejecuta antes de que el worker atienda peticiones. Django desaconseja
+    acceder a la base de datos durante la inicialización de las aplicaciones
+    (porque en los tests aún no existe la base de datos de prueba), así que
+    solo se hace con el ajuste activo y se silencia ese aviso. Si la base de
+    datos no está disponible o no está migrada, se registra y se sigue
+    arrancando (igual si falta el snapshot o NumPy del backend). Al terminar
+    se cierran las conexiones para no heredarlas en los workers creados con
+    fork.
+    """
+    if not getattr(settings, 'PRICES_WARMUP', False):
+        return None
+    try:
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                'ignore', message='Accessing the database during app initialization', category=RuntimeWarning,
+            )
+            return warm_up()
+    except (DatabaseError, ImproperlyConfigured) as exc:
+        logger.warning("Price warm-up skipped: %s", exc)
+        return None
+    finally:
+        connections.close_all()
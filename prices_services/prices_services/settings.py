@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'prices.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,6 +83,41 @@ DATABASES = {
     }
 }
 
+# Shards de precios: Price y PriceSegment se reparten por brand_id entre la
+# base de datos por defecto y estas, según PRICES_SHARD_MAP (brand_id -> alias;
+# las marcas que no aparecen van a PRICES_DEFAULT_SHARD). Cada shard se migra
+# con `migrate --database=<alias>` y, tras cambiar el mapa, los datos se mueven
+# con `manage.py rebalance_price_shards`.
+PRICES_SHARD_DATABASES = ['prices_shard_1', 'prices_shard_2']
+PRICES_DEFAULT_SHARD = 'default'
+PRICES_SHARD_MAP = {}
+
+for alias in PRICES_SHARD_DATABASES:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'{alias}.sqlite3',
+    }
+
+DATABASE_ROUTERS = ['prices.sharding.BrandShardRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# 'prices' guarda las respuestas de PriceView; en despliegues con varios procesos
+# debe ser un backend compartido (Redis, Memcached) para que la invalidación
+# por señales llegue a todos los workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'prices': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'prices',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -123,3 +159,104 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Price lookups
+# Backend usado por PriceView para resolver precios:
+#   'orm'      -> consulta la tabla Price en cada petición
+#   'index'    -> índice en memoria por (product_id, brand_id), sincronizado por señales
+#   'timeline' -> consulta puntual sobre la tabla derivada PriceSegment
+#                 (solo se mantiene con este backend: al activarlo hay que
+#                 ejecutar `manage.py rebuild_price_timeline`)
+#   'columnar' -> arrays de NumPy con búsquedas vectorizadas (requiere NumPy);
+#                 se descarta con cada escritura, pensado para lecturas masivas
+#   'snapshot' -> snapshot binario de PRICES_SNAPSHOT_PATH abierto con mmap,
+#                 compartido por todos los workers; no sigue las escrituras, se
+#                 regenera con `manage.py write_price_snapshot`
+
+PRICES_LOOKUP_BACKEND = 'orm'
+
+# Snapshot binario del backend 'snapshot' y cada cuántos segundos comprueba
+# cada worker si se ha publicado uno nuevo
+PRICES_SNAPSHOT_PATH = BASE_DIR / 'prices.snapshot'
+PRICES_SNAPSHOT_CHECK_INTERVAL = 1.0
+
+# Número máximo de consultas aceptadas por petición en /api/price/batch/
+PRICES_BATCH_MAX_ITEMS = 1000
+
+# Máximo de precios por petición de escritura en bloque (POST /api/price/bulk/)
+PRICES_BULK_MAX_ITEMS = 5000
+
+# Máximo de cambios por respuesta de /api/price/changes/
+PRICES_CHANGES_MAX_ITEMS = 10000
+
+# Calentamiento al arrancar (PricesConfig.ready): precarga los datos del backend
+# y resuelve hasta PRICES_WARMUP_REQUESTS precios con PriceView, en como mucho
+# PRICES_WARMUP_BUDGET segundos. Pensado para los procesos que sirven la API:
+# con el ajuste activo también se ejecuta en los comandos de manage.py.
+PRICES_WARMUP = False
+PRICES_WARMUP_BUDGET = 10.0
+PRICES_WARMUP_REQUESTS = 200
+
+# Con el backend 'index', carga cada clave en su primera consulta en lugar de la tabla completa
+PRICES_INDEX_LAZY = False
+
+# El índice ('index') y el almacén columnar ('columnar') de cada proceso se
+# ponen al día con las escrituras de otros procesos leyendo el registro de
+# cambios como mucho cada tantos segundos (las del propio proceso, al momento)
+PRICES_INDEX_CHECK_INTERVAL = 1.0
+PRICES_COLUMNAR_CHECK_INTERVAL = 1.0
+
+# Tipos de cambio (tabla FxRate) para el parámetro target_currency: cada proceso
+# los guarda en memoria y comprueba como mucho cada tantos segundos si ha
+# cambiado su versión
+PRICES_FX_CHECK_INTERVAL = 5.0
+
+# Agrupa las consultas de una misma clave (producto y marca) que PriceView y su
+# versión asíncrona reciben a la vez, con fechas dentro del mismo tramo de
+# PRICES_SINGLE_FLIGHT_GRANULARITY segundos, en una sola resolución del segmento
+# ganador; la comparten las consultas cuya fecha contiene (0: solo fechas idénticas)
+PRICES_SINGLE_FLIGHT = False
+PRICES_SINGLE_FLIGHT_GRANULARITY = 1.0
+
+# Filtro de Bloom de las claves (product_id, brand_id) con precios: PriceView y
+# su versión asíncrona responden 404 sin consultar la base de datos a las que
+# seguro que no tienen ninguno. Con la capacidad (mínima; crece si la tabla
+# tiene más claves) y la tasa de falsos positivos, el filtro ocupa unos
+# 1,2 MB por millón de claves al 1%. Las altas de otros procesos se leen del
+# registro de cambios como mucho cada tantos segundos
+PRICES_KEY_BLOOM = False
+PRICES_KEY_BLOOM_CAPACITY = 1_000_000
+PRICES_KEY_BLOOM_ERROR_RATE = 0.01
+PRICES_KEY_BLOOM_CHECK_INTERVAL = 1.0
+
+# Archivo de precios vencidos: `manage.py archive_prices` mueve a ArchivedPrice
+# (en la base de datos PRICES_ARCHIVE_DATABASE, que se migra con
+# `migrate --database=<alias>` si no es la de por defecto) las filas de Price
+# que terminaron hace más de tantos días; sin PRICES_ARCHIVE_LOOKUPS el comando
+# no archiva. Con él, PriceView, los lotes y los snapshots resuelven las fechas
+# anteriores al horizonte del archivo entre las dos tablas; el horizonte se
+# vuelve a leer como mucho cada tantos segundos
+PRICES_ARCHIVE_DATABASE = 'default'
+PRICES_ARCHIVE_RETENTION_DAYS = 365
+PRICES_ARCHIVE_LOOKUPS = False
+PRICES_ARCHIVE_CHECK_INTERVAL = 1.0
+
+# Caché de respuestas de PriceView (alias de CACHES); cada entrada caduca al
+# terminar su segmento y se invalida por señales al escribir en Price
+PRICES_CACHE_ENABLED = False
+PRICES_CACHE_ALIAS = 'prices'
+
+# Cabeceras ETag/Last-Modified/Cache-Control de PriceView: max-age es el tiempo
+# que el precio devuelto sigue siendo el ganador, acotado a este valor en
+# segundos (también limita cuánto tarda en verse una edición). 0 las desactiva;
+# activarlas añade una segunda consulta por petición para acotar el segmento.
+PRICES_HTTP_MAX_AGE = 0
+
+# Perfilado de peticiones lentas: RequestMetricsMiddleware ejecuta bajo cProfile
+# esta fracción de las peticiones (0 lo desactiva) y añade al fichero las
+# funciones con más tiempo acumulado de las que superan el umbral en ms
+PRICES_PROFILE_SAMPLE_RATE = 0
+PRICES_PROFILE_SLOW_MS = 250
+PRICES_PROFILE_TOP_FUNCTIONS = 30
+PRICES_PROFILE_FILE = BASE_DIR / 'slow_requests.prof.txt'
@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.urls import path, include
+from prices.views_api import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('prices.urls')),  # Enlace al archivo urls.py de la aplicación 'prices'
+    path('metrics', MetricsView.as_view(), name='metrics'),  # métricas en formato Prometheus
 ]